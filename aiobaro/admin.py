@@ -1,5 +1,8 @@
 import functools
 
+from .hooks import RequestHooks
+from .models import HttpVerbs, MatrixResponse
+from .routing import RoutingTable
 from .tools import matrix_client
 
 
@@ -9,19 +12,39 @@ class MatrixAdminClient:
         homeserver: str,
         access_token: str = None,
         client=matrix_client,
+        hooks: RequestHooks = None,
+        router: RoutingTable = None,
     ):
         self.homeserver = homeserver
         self.access_token = access_token
+        self.router = router
         self.client = functools.partial(
-            matrix_client,
-            self.admin_path,
+            self.routed_client,
             access_token=self.access_token,
+            hooks=hooks,
         )
 
     @property
     def admin_path(self):
         return f"{self.homeserver.strip('/')}/_synapse/admin/v2/"
 
+    async def routed_client(
+        self, verb: HttpVerbs, path: str, **kwargs
+    ) -> MatrixResponse:
+        """Send to the "admin" route of ``router`` if there is one."""
+        upstream = None
+        if self.router is not None:
+            upstream = self.router.pick(path, self.admin_path)
+        if upstream is None:
+            return await matrix_client(self.admin_path, verb, path, **kwargs)
+        base_url = (
+            upstream.base_url
+            + self.admin_path[len(self.homeserver.strip("/")) :]
+        )
+        return await matrix_client(
+            base_url, verb, path, http_client=upstream.http_client, **kwargs
+        )
+
     async def reset_password(self, user_id: str, password: str, **kwargs):
         return await self.client(
             "POST",
@@ -0,0 +1,111 @@
+import asyncio
+from typing import Any, Dict, Iterable, Optional
+
+from .cache import TTLCache
+from .core import MatrixClient
+from .sync import iter_events
+
+_MISSING = object()
+
+
+class AliasCache:
+    """Room aliases resolved with ``room_resolve_alias``, kept in memory.
+
+    Resolved aliases are cached for ``ttl`` seconds and unknown ones,
+    answered with a 404, for ``negative_ttl`` seconds; other failures are
+    not cached. Concurrent lookups of an alias share one request, and
+    ``resolve_many()`` runs at most ``concurrency`` requests at once.
+
+    ``update()`` drops the cached aliases of rooms whose
+    ``m.room.canonical_alias`` changed in a sync response, as well as the
+    aliases that event names, which may point to that room now.
+
+        aliases = AliasCache(client)
+        async for body in SyncLoop(client.sync):
+            aliases.update(body)
+        room_id = await aliases.resolve("#ops:baro")
+    """
+
+    def __init__(
+        self,
+        client: MatrixClient,
+        ttl: float = 3600.0,
+        negative_ttl: float = 60.0,
+        maxsize: int = 10_000,
+        concurrency: int = 10,
+    ):
+        self.client = client
+        self.negative_ttl = negative_ttl
+        self.concurrency = concurrency
+        # room id of each alias, None for the unknown ones
+        self.cache: TTLCache[Optional[str]] = TTLCache(ttl, maxsize)
+        self.inflight: Dict[str, "asyncio.Future[Optional[str]]"] = {}
+        self.queries = 0
+
+    def update(self, body: Dict[str, Any]):
+        """Invalidate the aliases a sync response body changed."""
+        for room_id, _, event in iter_events(body):
+            if (
+                event.get("type") != "m.room.canonical_alias"
+                or room_id is None
+            ):
+                continue
+            self.invalidate_room(room_id)
+            content = event.get("content", {})
+            for alias in [
+                content.get("alias"),
+                *content.get("alt_aliases", ()),
+            ]:
+                if alias:
+                    self.invalidate(alias)
+
+    def invalidate(self, alias: str):
+        self.cache.pop(alias)
+
+    def invalidate_room(self, room_id: str):
+        for alias in [
+            alias
+            for alias, (_, cached) in self.cache.entries.items()
+            if cached == room_id
+        ]:
+            self.cache.pop(alias)
+
+    async def resolve(self, alias: str) -> Optional[str]:
+        """Room id of ``alias``, ``None`` if it does not resolve."""
+        room_id = self.cache.get(alias, _MISSING)
+        if room_id is not _MISSING:
+            return room_id
+        if alias not in self.inflight:
+            self.inflight[alias] = asyncio.ensure_future(self.query(alias))
+        return await asyncio.shield(self.inflight[alias])
+
+    async def query(self, alias: str) -> Optional[str]:
+        try:
+            self.queries += 1
+            response = await self.client.room_resolve_alias(alias)
+            if response.ok:
+                room_id = response.json()["room_id"]
+                self.cache.set(alias, room_id)
+                return room_id
+            if response.status_code == 404:
+                self.cache.set(alias, None, self.negative_ttl)
+            return None
+        finally:
+            self.inflight.pop(alias, None)
+
+    async def resolve_many(
+        self, aliases: Iterable[str]
+    ) -> Dict[str, Optional[str]]:
+        """Room ids of many aliases, querying the uncached ones concurrently."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        found: Dict[str, Optional[str]] = {}
+
+        async def resolve(alias: str):
+            room_id = self.cache.get(alias, _MISSING)
+            if room_id is _MISSING:
+                async with semaphore:
+                    room_id = await self.resolve(alias)
+            found[alias] = room_id
+
+        await asyncio.gather(*(resolve(alias) for alias in set(aliases)))
+        return found
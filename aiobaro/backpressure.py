@@ -0,0 +1,162 @@
+import asyncio
+import json
+import os
+import tempfile
+from collections import deque
+from typing import IO, Any, Deque, Dict, Optional
+
+from .dispatch import Dispatcher
+from .events import Event
+from .models import OverflowPolicy
+from .sync import SyncEvent, iter_events
+
+EPHEMERAL_SECTIONS = frozenset(("presence", "join.ephemeral"))
+EPHEMERAL_TYPES = frozenset(("m.typing", "m.receipt", "m.presence"))
+
+
+def is_ephemeral(item: SyncEvent) -> bool:
+    """Whether an event can be dropped without losing room history."""
+    if item.section in EPHEMERAL_SECTIONS:
+        return True
+    event = item.event
+    event_type = event.get("type") if isinstance(event, dict) else event.type
+    return event_type in EPHEMERAL_TYPES
+
+
+class EventQueue:
+    """Bounded queue of sync events between the sync loop and handlers.
+
+    At most ``maxsize`` events are held in memory; past that, ``policy``
+    decides what ``put()`` does, see ``OverflowPolicy``. With the "spill"
+    policy, overflowing events are appended as JSON lines to
+    ``spill_path`` (a temporary file by default) and replayed by ``get()``
+    once the events in memory are consumed, keeping their order. The log
+    is emptied once fully replayed; a log left over by a previous run is
+    replayed first, from its start, so some events may be handled twice,
+    which a ``Deduplicator`` takes care of. Spilled ``Event`` objects come
+    back as dicts.
+
+        queue = EventQueue(10_000, OverflowPolicy.spill, "events.log")
+        asyncio.ensure_future(queue.pump(dispatcher))
+        async for body in SyncLoop(client.sync):
+            await queue.put_body(body)
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10_000,
+        policy: OverflowPolicy = OverflowPolicy.block,
+        spill_path: Optional[str] = None,
+        replay_batch: int = 1000,
+    ):
+        self.maxsize = maxsize
+        self.policy = OverflowPolicy(policy)
+        self.spill_path = spill_path
+        self.replay_batch = replay_batch
+        self.items: Deque[SyncEvent] = deque()
+        self.dropped = 0
+        self.spill_file: Optional[IO[bytes]] = None
+        self.spill_offset = 0
+        self.spilled = 0
+        if spill_path is not None and os.path.exists(spill_path):
+            self.open_spill()
+            self.spilled = sum(1 for _ in self.spill_file)
+        # created on first use, inside the running event loop
+        self.not_empty: Optional[asyncio.Event] = None
+        self.not_full: Optional[asyncio.Event] = None
+
+    def __len__(self) -> int:
+        return len(self.items) + self.spilled
+
+    def open_spill(self):
+        if self.spill_path is None:
+            self.spill_file = tempfile.TemporaryFile()
+        else:
+            self.spill_file = open(self.spill_path, "a+b")
+        self.spill_file.seek(0)
+
+    def init_events(self):
+        if self.not_empty is None:
+            self.not_empty = asyncio.Event()
+            self.not_full = asyncio.Event()
+
+    def spill(self, item: SyncEvent):
+        if self.spill_file is None:
+            self.open_spill()
+        room_id, section, event = item
+        if isinstance(event, Event):
+            event = event.to_dict()
+        # replay() leaves the position where it stopped reading
+        self.spill_file.seek(0, os.SEEK_END)
+        self.spill_file.write(
+            json.dumps([room_id, section, event]).encode() + b"\n"
+        )
+        self.spilled += 1
+        self.not_empty.set()
+
+    def replay(self):
+        """Move the oldest spilled events back to memory."""
+        self.spill_file.flush()
+        self.spill_file.seek(self.spill_offset)
+        for _ in range(min(self.replay_batch, self.spilled, self.maxsize)):
+            line = self.spill_file.readline()
+            self.items.append(SyncEvent(*json.loads(line)))
+            self.spilled -= 1
+        self.spill_offset = self.spill_file.tell()
+        if not self.spilled:
+            # everything was replayed, start the log over
+            self.spill_file.truncate(0)
+            self.spill_offset = 0
+
+    async def put(self, item: SyncEvent):
+        self.init_events()
+        while True:
+            if self.spilled:
+                # behind events already spilled, to keep the order
+                self.spill(item)
+                return
+            if len(self.items) < self.maxsize:
+                self.items.append(item)
+                self.not_empty.set()
+                return
+            if self.policy == OverflowPolicy.spill:
+                self.spill(item)
+                return
+            if self.policy == OverflowPolicy.drop_ephemeral and is_ephemeral(
+                item
+            ):
+                self.dropped += 1
+                return
+            self.not_full.clear()
+            await self.not_full.wait()
+
+    async def put_body(self, body: Dict[str, Any]):
+        """Queue every event of a sync response body."""
+        for item in iter_events(body):
+            await self.put(item)
+
+    async def get(self) -> SyncEvent:
+        self.init_events()
+        while not self.items:
+            if self.spilled:
+                self.replay()
+                continue
+            self.not_empty.clear()
+            await self.not_empty.wait()
+        item = self.items.popleft()
+        self.not_full.set()
+        return item
+
+    async def pump(self, dispatcher: Dispatcher, max_pending: int = 1000):
+        """Feed ``dispatcher`` forever, keeping at most ``max_pending``
+        events queued in it, so that the backlog stays in this queue.
+        """
+        while True:
+            room_id, _, event = await self.get()
+            await dispatcher.wait_pending(max_pending)
+            dispatcher.dispatch(room_id, event)
+
+    def close(self):
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
@@ -0,0 +1,188 @@
+import asyncio
+import functools
+import json
+import uuid
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .core import MatrixClient
+from .models import MatrixResponse
+
+Messages = Dict[str, Dict[str, Dict[str, Any]]]
+
+# bytes around a message in the request body: quotes, colons and commas
+MESSAGE_OVERHEAD = 8
+
+
+class Pending:
+    """The messages of one ``ToDeviceBatcher.send()`` call."""
+
+    __slots__ = ("messages", "future", "requests", "results")
+
+    def __init__(self, messages: List[Tuple[str, str, Dict[str, Any]]]):
+        self.messages = messages
+        self.future: "asyncio.Future[MatrixResponse]" = (
+            asyncio.get_event_loop().create_future()
+        )
+        # requests carrying these messages that are not answered yet
+        self.requests = 0
+        self.results: List[MatrixResponse] = []
+
+    def resolve(self, result: Any):
+        if self.future.done():
+            return
+        if isinstance(result, BaseException):
+            self.future.set_exception(result)
+            return
+        self.results.append(result)
+        self.requests -= 1
+        if not self.requests:
+            failed = [response for response in self.results if not response.ok]
+            self.future.set_result(failed[0] if failed else result)
+
+
+class ToDeviceBatcher:
+    """Coalesce ``to_device`` messages into few ``sendToDevice`` requests.
+
+    Messages of the same event type sent within ``window`` seconds are
+    merged into one request body, split into several requests when it
+    would exceed ``max_bytes``, or when a device already has a message in
+    the request. Each ``send()`` returns the response of the requests that
+    carried its messages, the first failed one if any.
+
+        batcher = ToDeviceBatcher(client)
+        await asyncio.gather(*(
+            batcher.send("m.room_key", {user: {device: key}})
+            for user, device, key in shares
+        ))
+    """
+
+    def __init__(
+        self,
+        client: MatrixClient,
+        window: float = 0.05,
+        max_bytes: int = 60_000,
+    ):
+        self.client = client
+        self.window = window
+        self.max_bytes = max_bytes
+        self.pending: Dict[str, List[Pending]] = {}
+        self.sizes: Dict[str, int] = {}
+        self.timers: Dict[str, asyncio.TimerHandle] = {}
+        self.tasks: Set["asyncio.Future[None]"] = set()
+        # latest batch of each event type, the next one waits for it
+        self.latest: Dict[str, "asyncio.Future[None]"] = {}
+        self.requests = 0
+
+    async def send(
+        self, event_type: str, messages: Messages
+    ) -> Optional[MatrixResponse]:
+        """Queue ``messages``, a map of user ids to device ids to content,
+        and wait for the request that sends them; ``None`` if there is no
+        message to send.
+        """
+        flat = []
+        size = 0
+        for user_id, devices in messages.items():
+            for device_id, content in devices.items():
+                flat.append((user_id, device_id, content))
+                size += message_size(user_id, device_id, content)
+        if not flat:
+            return None
+        pending = Pending(flat)
+        self.pending.setdefault(event_type, []).append(pending)
+        self.sizes[event_type] = self.sizes.get(event_type, 0) + size
+        if self.sizes[event_type] >= self.max_bytes:
+            self.flush(event_type)
+        elif event_type not in self.timers:
+            self.timers[event_type] = asyncio.get_event_loop().call_later(
+                self.window, self.flush, event_type
+            )
+        return await pending.future
+
+    def flush(self, event_type: Optional[str] = None):
+        """Send the queued messages now, of ``event_type`` or all of them."""
+        for flushed in [event_type] if event_type else list(self.pending):
+            timer = self.timers.pop(flushed, None)
+            if timer is not None:
+                timer.cancel()
+            batch = self.pending.pop(flushed, [])
+            self.sizes.pop(flushed, None)
+            if batch:
+                task = asyncio.ensure_future(
+                    self.send_batch(flushed, batch, self.latest.get(flushed))
+                )
+                self.latest[flushed] = task
+                self.tasks.add(task)
+                task.add_done_callback(functools.partial(self.done, flushed))
+
+    def done(self, event_type: str, task: "asyncio.Future[None]"):
+        self.tasks.discard(task)
+        if self.latest.get(event_type) is task:
+            del self.latest[event_type]
+
+    async def aclose(self):
+        """Flush and wait for every request in flight."""
+        self.flush()
+        while self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def split(
+        self, batch: List[Pending]
+    ) -> List[Tuple[Messages, List[Pending]]]:
+        """Request bodies of a batch, with the calls each one serves."""
+        bodies: List[Messages] = []
+        sizes: List[int] = []
+        served: List[Dict[int, Pending]] = []
+        # request of the latest message to each device, to keep their order
+        latest: Dict[Tuple[str, str], int] = {}
+        for pending in batch:
+            for user_id, device_id, content in pending.messages:
+                size = message_size(user_id, device_id, content)
+                index = latest.get((user_id, device_id), -1) + 1
+                while index < len(bodies) and (
+                    sizes[index] + size > self.max_bytes
+                ):
+                    index += 1
+                if index == len(bodies):
+                    bodies.append({})
+                    sizes.append(0)
+                    served.append({})
+                bodies[index].setdefault(user_id, {})[device_id] = content
+                sizes[index] += size
+                latest[user_id, device_id] = index
+                if id(pending) not in served[index]:
+                    served[index][id(pending)] = pending
+                    pending.requests += 1
+        return [
+            (body, list(calls.values())) for body, calls in zip(bodies, served)
+        ]
+
+    async def send_batch(
+        self,
+        event_type: str,
+        batch: List[Pending],
+        previous: Optional["asyncio.Future[None]"] = None,
+    ):
+        # batches and their requests are sent in order, a device gets its
+        # messages in order
+        if previous is not None:
+            await asyncio.wait([previous])
+        for body, served in self.split(batch):
+            self.requests += 1
+            try:
+                result: Any = await self.client.to_device(
+                    event_type, {"messages": body}, uuid.uuid4()
+                )
+            except Exception as error:
+                result = error
+            for pending in served:
+                pending.resolve(result)
+
+
+def message_size(user_id: str, device_id: str, content: Any) -> int:
+    return (
+        len(user_id)
+        + len(device_id)
+        + len(json.dumps(content, separators=(",", ":")))
+        + MESSAGE_OVERHEAD
+    )
@@ -0,0 +1,248 @@
+import asyncio
+import time
+from typing import Awaitable, Dict, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+import httpcore
+import httpx
+
+from .exceptions import CircuitOpenError
+from .metrics import ClientMetrics
+from .models import CircuitState, MatrixResponse
+from .routing import endpoint_family
+
+CircuitKey = Tuple[str, str]
+
+STATE_VALUES = {
+    CircuitState.closed: 0,
+    CircuitState.half_open: 1,
+    CircuitState.open: 2,
+}
+
+# cheap requests telling whether an endpoint family is served again; any
+# answer but a 5xx will do, a 401 included
+PROBE_PATHS = {
+    "media": "/_matrix/media/r0/config",
+    "admin": "/_synapse/admin/v1/server_version",
+}
+DEFAULT_PROBE_PATH = "/_matrix/client/versions"
+
+
+class Circuit:
+    """Health of the requests of one endpoint family to one host."""
+
+    __slots__ = ("state", "failures", "opened", "probing", "origin", "timer")
+
+    def __init__(self):
+        self.state = CircuitState.closed
+        # consecutive failures
+        self.failures = 0
+        self.opened = 0.0
+        self.probing = False
+        # scheme and host of the latest request, for the timed probes
+        self.origin = ""
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class CircuitBreaker:
+    """Fail fast the requests to a host and endpoint family that keeps
+    failing, instead of waiting for each of them to time out.
+
+    After ``failure_threshold`` consecutive failures, 5xx responses,
+    timeouts or connection errors, the circuit opens and its requests
+    raise ``CircuitOpenError`` right away. Every ``reset_timeout``
+    seconds, the breaker probes the host with a cheap request of the
+    family, such as ``GET /_matrix/client/versions``, or lets the next
+    request through as the probe if one comes first: the success of the
+    probe, and only of the probe, closes the circuit, its failure keeps
+    it open. Other circuits, such as the other endpoint families of the
+    same homeserver, are not affected. Probes are sent with
+    ``transport``, the default one if ``None``.
+
+    With ``metrics``, circuit states are exported as a gauge, 0 for
+    closed, 1 for half open and 2 for open, and refused requests are
+    counted.
+
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+        client = MatrixClient(homeserver, token, breaker=breaker)
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        metrics: Optional[ClientMetrics] = None,
+        transport: httpcore.AsyncHTTPTransport = None,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.transport = transport
+        self.circuits: Dict[CircuitKey, Circuit] = {}
+        self.probes: Set["asyncio.Future[None]"] = set()
+        self.state_gauge = self.rejected = None
+        if metrics is not None:
+            self.state_gauge = metrics.registry.gauge(
+                "aiobaro_circuit_state",
+                "Circuit breaker state: 0 closed, 1 half open, 2 open.",
+                ["host", "family"],
+            )
+            self.rejected = metrics.registry.counter(
+                "aiobaro_circuit_rejected_total",
+                "Requests refused by an open circuit breaker.",
+                ["host", "family"],
+            )
+
+    def key(self, path: str, base_url: str) -> CircuitKey:
+        return urlsplit(base_url).netloc, endpoint_family(path, base_url)
+
+    def state(self, key: CircuitKey) -> CircuitState:
+        circuit = self.circuits.get(key)
+        return CircuitState.closed if circuit is None else circuit.state
+
+    def set_state(
+        self, key: CircuitKey, circuit: Circuit, state: CircuitState
+    ):
+        circuit.state = state
+        if self.state_gauge is not None:
+            self.state_gauge.set(*key, value=STATE_VALUES[state])
+
+    def check(
+        self, key: CircuitKey, base_url: str = ""
+    ) -> Tuple[Circuit, bool]:
+        """Circuit of ``key`` and whether the request is its probe, if it
+        may go, else raise.
+        """
+        circuit = self.circuits.get(key)
+        if circuit is None:
+            circuit = self.circuits[key] = Circuit()
+        if base_url:
+            parts = urlsplit(base_url)
+            circuit.origin = f"{parts.scheme}://{parts.netloc}"
+        if circuit.state is CircuitState.closed:
+            return circuit, False
+        retry_in = circuit.opened + self.reset_timeout - time.monotonic()
+        if circuit.state is CircuitState.open and retry_in <= 0:
+            self.set_state(key, circuit, CircuitState.half_open)
+        if circuit.state is CircuitState.half_open and not circuit.probing:
+            circuit.probing = True
+            return circuit, True
+        if self.rejected is not None:
+            self.rejected.inc(*key)
+        raise CircuitOpenError(*key, max(retry_in, 0.0))
+
+    def success(self, key: CircuitKey, circuit: Circuit, probe: bool):
+        if probe:
+            circuit.probing = False
+            circuit.failures = 0
+            self.set_state(key, circuit, CircuitState.closed)
+            if circuit.timer is not None:
+                circuit.timer.cancel()
+                circuit.timer = None
+        elif circuit.state is CircuitState.closed:
+            circuit.failures = 0
+
+    def failure(self, key: CircuitKey, circuit: Circuit, probe: bool):
+        if probe:
+            circuit.probing = False
+            self.trip(key, circuit)
+        elif circuit.state is CircuitState.closed:
+            circuit.failures += 1
+            if circuit.failures >= self.failure_threshold:
+                self.trip(key, circuit)
+
+    def trip(self, key: CircuitKey, circuit: Circuit):
+        """Open the circuit, and schedule its next probe."""
+        circuit.opened = time.monotonic()
+        self.set_state(key, circuit, CircuitState.open)
+        if circuit.timer is not None:
+            circuit.timer.cancel()
+            circuit.timer = None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # outside of a loop, the next request is the probe
+            return
+        circuit.timer = loop.call_later(
+            self.reset_timeout, self.start_probe, key, circuit
+        )
+
+    def start_probe(self, key: CircuitKey, circuit: Circuit):
+        circuit.timer = None
+        if circuit.state is CircuitState.closed or circuit.probing:
+            return
+        self.set_state(key, circuit, CircuitState.half_open)
+        if not circuit.origin:
+            return
+        circuit.probing = True
+        task = asyncio.ensure_future(self.probe(key, circuit))
+        self.probes.add(task)
+        task.add_done_callback(self.probes.discard)
+
+    async def probe(self, key: CircuitKey, circuit: Circuit):
+        url = circuit.origin + PROBE_PATHS.get(key[1], DEFAULT_PROBE_PATH)
+        timeout = min(self.reset_timeout, 10.0)
+        try:
+            async with httpx.AsyncClient(transport=self.transport) as client:
+                response = await client.get(url, timeout=timeout)
+        except httpx.HTTPError:
+            self.failure(key, circuit, True)
+            return
+        except BaseException:
+            circuit.probing = False
+            raise
+        if response.status_code >= 500:
+            self.failure(key, circuit, True)
+        else:
+            self.success(key, circuit, True)
+
+    async def aclose(self):
+        """Cancel the scheduled and running probes."""
+        for circuit in self.circuits.values():
+            if circuit.timer is not None:
+                circuit.timer.cancel()
+                circuit.timer = None
+        probes = list(self.probes)
+        for task in probes:
+            task.cancel()
+        await asyncio.gather(*probes, return_exceptions=True)
+
+    async def run(
+        self,
+        key: CircuitKey,
+        request: Awaitable[MatrixResponse],
+        base_url: str = "",
+    ) -> MatrixResponse:
+        """Send ``request`` unless the circuit of ``key`` is open."""
+        try:
+            circuit, probe = self.check(key, base_url)
+        except CircuitOpenError:
+            if asyncio.iscoroutine(request):
+                request.close()
+            raise
+        return await self.watch(key, circuit, request, probe)
+
+    async def watch(
+        self,
+        key: CircuitKey,
+        circuit: Circuit,
+        request: Awaitable[MatrixResponse],
+        probe: bool = False,
+    ) -> MatrixResponse:
+        """Await ``request``, let through by ``check()``, and record how
+        it went.
+        """
+        try:
+            response = await request
+        except (httpx.TimeoutException, httpx.NetworkError):
+            self.failure(key, circuit, probe)
+            raise
+        except BaseException:
+            if probe:
+                # tells nothing about the upstream, let another probe go
+                circuit.probing = False
+            raise
+        if response.status_code >= 500:
+            self.failure(key, circuit, probe)
+        else:
+            self.success(key, circuit, probe)
+        return response
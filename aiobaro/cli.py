@@ -0,0 +1,63 @@
+import asyncio
+from typing import List
+
+import typer
+
+from . import loadtest
+
+app = typer.Typer(help="aiobaro command line tools.")
+
+
+@app.callback()
+def main():
+    """aiobaro command line tools."""
+
+
+@app.command()
+def load(
+    homeserver: str = typer.Option(
+        None, help="Homeserver URL. Uses a local stand-in when omitted."
+    ),
+    accounts: int = typer.Option(10, help="Number of simulated accounts."),
+    password: str = typer.Option("loadtest", help="Accounts password."),
+    prefix: str = typer.Option("loadtest_", help="Accounts name prefix."),
+    concurrency: List[int] = typer.Option(
+        [1, 10, 50], help="Concurrency levels to sweep, repeatable."
+    ),
+    duration: float = typer.Option(10.0, help="Seconds per level."),
+    mix: List[str] = typer.Option(
+        [f"{name}={weight}" for name, weight in loadtest.DEFAULT_MIX.items()],
+        help="Operation weights as name=weight, repeatable.",
+    ),
+    latency: float = typer.Option(
+        0.005, help="Stand-in server latency in seconds."
+    ),
+    seed: int = typer.Option(0, help="Random seed for the operation mix."),
+):
+    """Sweep concurrency levels and report per-endpoint latencies."""
+    try:
+        weights = loadtest.parse_mix(mix)
+    except ValueError as error:
+        raise typer.BadParameter(str(error), param_hint="--mix")
+
+    async def run():
+        transport = None
+        server = homeserver
+        if server is None:
+            transport = loadtest.local_homeserver(latency)
+            server = "http://loadtest.local"
+        typer.echo(f"Setting up {accounts} accounts on {server}")
+        pool = await loadtest.setup_accounts(
+            server, accounts, password, prefix=prefix, transport=transport
+        )
+        for level in concurrency:
+            stats = await loadtest.run_level(
+                pool, weights, level, duration, seed=seed
+            )
+            typer.echo(loadtest.format_level(level, stats))
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    app()
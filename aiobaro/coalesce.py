@@ -0,0 +1,136 @@
+import asyncio
+import functools
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Set, Tuple
+
+from .core import MatrixClient
+from .models import MatrixResponse
+
+Key = Tuple[str, str, str]
+
+
+class MarkerCoalescer:
+    """Send typing notices, receipts and read markers at most every
+    ``interval`` seconds, keeping only the latest value of each.
+
+    Updates are recorded without waiting; the first one arms a timer and
+    when it fires, the latest value of every (room, marker) pair is sent,
+    the values it replaced never are. A value equal to the one last sent
+    is skipped, except typing notices, which refresh their timeout. A
+    pending ``m.read`` receipt rides along a pending read markers update of
+    the same room. Failed requests are kept in ``errors``.
+
+        markers = MarkerCoalescer(client)
+        for event in timeline:
+            markers.receipt(room_id, event["event_id"])
+        await markers.aclose()
+    """
+
+    def __init__(self, client: MatrixClient, interval: float = 1.0):
+        self.client = client
+        self.interval = interval
+        self.pending: Dict[Key, Any] = {}
+        self.sent: Dict[Key, Any] = {}
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.tasks: Set["asyncio.Future[None]"] = set()
+        # latest request of each key, the next one waits for it
+        self.latest: Dict[Key, "asyncio.Future[None]"] = {}
+        self.updates = 0
+        self.requests = 0
+        self.errors: Deque[Tuple[Key, Any]] = deque(maxlen=1000)
+
+    def update(self, key: Key, value: Any):
+        self.updates += 1
+        self.pending[key] = value
+        if self.timer is None:
+            self.timer = asyncio.get_event_loop().call_later(
+                self.interval, self.flush
+            )
+
+    def typing(
+        self,
+        room_id: str,
+        user_id: str,
+        typing_state: bool = True,
+        timeout: int = 30000,
+    ):
+        self.update((room_id, "typing", user_id), (typing_state, timeout))
+
+    def receipt(
+        self, room_id: str, event_id: str, receipt_type: str = "m.read"
+    ):
+        self.update((room_id, "receipt", receipt_type), event_id)
+
+    def read_markers(
+        self,
+        room_id: str,
+        fully_read_event: str,
+        read_event: Optional[str] = None,
+    ):
+        self.update(
+            (room_id, "read_markers", ""), (fully_read_event, read_event)
+        )
+
+    def flush(self):
+        """Send the pending values now."""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        pending, self.pending = self.pending, {}
+        for key in [key for key in pending if key[1] == "read_markers"]:
+            fully_read, read = pending[key]
+            if read is None:
+                receipt = pending.pop((key[0], "receipt", "m.read"), None)
+                pending[key] = (fully_read, receipt)
+        for key, value in pending.items():
+            if key[1] != "typing" and self.sent.get(key) == value:
+                continue
+            task = asyncio.ensure_future(
+                self.send(key, value, self.latest.get(key))
+            )
+            self.latest[key] = task
+            self.tasks.add(task)
+            task.add_done_callback(functools.partial(self.done, key))
+
+    def done(self, key: Key, task: "asyncio.Future[None]"):
+        self.tasks.discard(task)
+        if self.latest.get(key) is task:
+            del self.latest[key]
+
+    async def send(
+        self,
+        key: Key,
+        value: Any,
+        previous: Optional["asyncio.Future[None]"] = None,
+    ):
+        # one request per key at a time, so values land in order
+        if previous is not None:
+            await asyncio.wait([previous])
+        room_id, kind, name = key
+        self.requests += 1
+        try:
+            response: MatrixResponse
+            if kind == "typing":
+                response = await self.client.room_typing(room_id, name, *value)
+            elif kind == "receipt":
+                response = await self.client.update_receipt_marker(
+                    room_id, value, name
+                )
+            else:
+                response = await self.client.room_read_markers(room_id, *value)
+        except Exception as error:
+            self.errors.append((key, error))
+            return
+        if response.ok:
+            self.sent[key] = value
+            if kind == "read_markers" and value[1] is not None:
+                # the m.read receipt went along
+                self.sent[room_id, "receipt", "m.read"] = value[1]
+        else:
+            self.errors.append((key, response))
+
+    async def aclose(self):
+        """Flush and wait for every request in flight."""
+        self.flush()
+        while self.tasks:
+            await asyncio.gather(*self.tasks)
@@ -1,8 +1,24 @@
+import asyncio
 import functools
 import json
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+from urllib.parse import quote
 from uuid import UUID
 
+import httpcore
 import httpx
 from httpx._models import (
     ByteStream,
@@ -14,6 +30,11 @@ from httpx._models import (
     RequestFiles,
 )
 
+from .circuit import CircuitBreaker
+from .exceptions import CircuitOpenError, LoginRequiredException
+from .hooks import RequestHooks
+from .limiter import AdaptiveLimiter
+from .metrics import CLIENT_METRICS, ClientMetrics
 from .models import (
     EventFormat,
     FilterT,
@@ -27,16 +48,54 @@ from .models import (
     RoomVisibility,
     UserKind,
 )
-from .tools import auth_required, jsonable_encoder
+from .routing import RoutingTable
+from .serializers import SERIALIZER, Serializer
+from .streaming import StreamingParser, SyncSection
+from .timeouts import (
+    TIMEOUTS,
+    TimeoutPolicy,
+    check_deadline,
+    within_deadline,
+)
+from .tools import (
+    auth_required,
+    jsonable_encoder,
+    open_request,
+    send_request,
+    sync_params,
+)
 
 
 class BaseMatrixClient:
     def __init__(
-        self, homeserver: str, access_token: str = None, version: str = "r0"
+        self,
+        homeserver: str,
+        access_token: str = None,
+        version: str = "r0",
+        transport: httpcore.AsyncHTTPTransport = None,
+        hooks: RequestHooks = None,
+        metrics: ClientMetrics = CLIENT_METRICS,
+        http_client: httpx.AsyncClient = None,
+        router: RoutingTable = None,
+        timeouts: TimeoutPolicy = TIMEOUTS,
+        limiter: AdaptiveLimiter = None,
+        breaker: CircuitBreaker = None,
+        serializer: Serializer = SERIALIZER,
     ):
         self.version = version
         self.homeserver = homeserver
         self.access_token = access_token
+        self.transport = transport
+        self.http_client = http_client
+        if metrics is not None:
+            hooks = metrics.attach(hooks or RequestHooks())
+        self.hooks = hooks
+        self.metrics = metrics
+        self.router = router
+        self.timeouts = timeouts
+        self.limiter = limiter
+        self.breaker = breaker
+        self.serializer = serializer
 
     async def client(
         self,
@@ -52,6 +111,7 @@ class BaseMatrixClient:
         files: RequestFiles = None,
         json: Any = None,
         stream: ByteStream = None,
+        base_path: str = None,
     ) -> MatrixResponse:
         """DOC:"""
         if access_token is not None:
@@ -59,35 +119,145 @@ class BaseMatrixClient:
                 params.setdefault("access_token", access_token)
             else:
                 params = dict(access_token=access_token)
-        async with httpx.AsyncClient() as client:
-            client_config = {
-                "params": params,
-                "headers": headers,
-                "cookies": cookies,
-                "content": content,
-                "data": data,
-                "files": files,
-                "json": jsonable_encoder(json)
-                if isinstance(json, (dict, list))
-                else json,
-                "stream": stream,
-            }
-            request = httpx.Request(
-                verb.upper(),
-                f"{self.client_path.strip('/')}/{path.lstrip('/')}",
-                **dict(filter(lambda x: x[1], client_config.items())),
+        base_url, http_client = self.target(path, base_path)
+        timeout = self.timeouts.timeout(path, base_url, params)
+        # before creating any coroutine, that would be left unawaited
+        check_deadline()
+        client = http_client or httpx.AsyncClient(transport=self.transport)
+        try:
+            # sent right away rather than through a partial, whose merged
+            # keywords weigh on every request
+            request = send_request(
+                client,
+                verb,
+                base_url,
+                path,
+                params=params,
+                headers=headers,
+                cookies=cookies,
+                content=content,
+                data=data,
+                files=files,
+                json=json,
+                stream=stream,
+                hooks=self.hooks,
+                timeout=timeout,
+                serializer=self.serializer,
             )
-            response: httpx.Response = await client.send(request)
-        return MatrixResponse(response)
+            if self.limiter is not None or self.breaker is not None:
+                request = self.guarded(request, path, base_url)
+            return await within_deadline(request)
+        finally:
+            if http_client is None:
+                await client.aclose()
+
+    async def guarded(
+        self, request: Awaitable[MatrixResponse], path: str, base_url: str
+    ) -> MatrixResponse:
+        """Send through the circuit breaker and the limiter, if any; an
+        open circuit fails before waiting for the limiter.
+        """
+        if self.breaker is not None:
+            key = self.breaker.key(path, base_url)
+            try:
+                circuit, probe = self.breaker.check(key, base_url)
+            except CircuitOpenError:
+                if asyncio.iscoroutine(request):
+                    request.close()
+                raise
+        if self.limiter is not None and self.limiter.applies(path, base_url):
+            request = self.limiter.run(request)
+        if self.breaker is not None:
+            request = self.breaker.watch(key, circuit, request, probe)
+        return await request
 
     @auth_required
     async def auth_client(self, *args, **kwargs):
         return await self.client(*args, **kwargs)
 
+    @asynccontextmanager
+    async def stream(
+        self,
+        verb: HttpVerbs,
+        path: str,
+        *,
+        access_token: str = None,
+        params: QueryParamTypes = None,
+        headers: HeaderTypes = None,
+        json: Any = None,
+        base_path: str = None,
+    ) -> AsyncIterator[httpx.Response]:
+        """Like ``client``, but yield the response before its body is read,
+        for ``aiter_bytes()``; the response is closed on exit. The limiter,
+        the circuit breaker and the deadline apply until the response
+        headers are received.
+        """
+        if access_token is not None:
+            if isinstance(params, dict):
+                params.setdefault("access_token", access_token)
+            else:
+                params = dict(access_token=access_token)
+        base_url, http_client = self.target(path, base_path)
+        open_ = functools.partial(
+            open_request,
+            verb=verb,
+            base_url=base_url,
+            path=path,
+            params=params,
+            headers=headers,
+            json=json,
+            hooks=self.hooks,
+            timeout=self.timeouts.timeout(path, base_url, params),
+            serializer=self.serializer,
+        )
+        check_deadline()
+        async with AsyncExitStack() as stack:
+            if http_client is None:
+                http_client = await stack.enter_async_context(
+                    httpx.AsyncClient(transport=self.transport)
+                )
+            request = stack.enter_async_context(open_(http_client))
+            if self.limiter is not None or self.breaker is not None:
+                request = self.guarded(request, path, base_url)
+            yield await within_deadline(request)
+
+    def target(
+        self, path: str, base_path: str = None
+    ) -> Tuple[str, Optional[httpx.AsyncClient]]:
+        """Base URL and connections for a request, as routed by ``router``."""
+        base_url = base_path or self.client_path
+        if self.router is not None:
+            upstream = self.router.pick(path, base_url)
+            if upstream is not None:
+                homeserver = self.homeserver.strip("/")
+                if base_url.startswith(homeserver):
+                    base_url = upstream.base_url + base_url[len(homeserver) :]
+                    return base_url, upstream.http_client
+        return base_url, self.http_client
+
+    def encode(self, body: Any) -> bytes:
+        """Encode a request body once, to send it many times, such as the
+        ``body`` of ``room_send`` to many rooms.
+        """
+        return self.serializer.dumps(jsonable_encoder(body))
+
+    def body_args(self, body: Union[Any, bytes]) -> Dict[str, Any]:
+        """Request arguments sending ``body``, already encoded if bytes."""
+        if isinstance(body, bytes):
+            return {
+                "content": body,
+                "headers": {"Content-Type": self.serializer.content_type},
+            }
+        return {"json": body}
+
     @property
     def client_path(self):
         return f"{self.homeserver.strip('/')}/_matrix/client/{self.version}/"
 
+    @property
+    def media_path(self):
+        return f"{self.homeserver.strip('/')}/_matrix/media/{self.version}/"
+
     async def __call__(self, *args, **kwargs) -> MatrixResponse:
         return await self.client(*args, **kwargs)
 
@@ -103,6 +273,31 @@ class MatrixClient(BaseMatrixClient):
         """
         return await self.client("GET", "login")
 
+    async def versions(self) -> MatrixResponse:
+        """Get the versions of the specification supported by the server.
+
+        * Matrix Spec
+        2.1   GET /_matrix/client/versions
+        Rate-limited:   No.
+        Requires auth:  No.
+        """
+        return await self.client(
+            "GET",
+            "versions",
+            base_path=f"{self.homeserver.strip('/')}/_matrix/client/",
+        )
+
+    async def capabilities(self) -> MatrixResponse:
+        """Get information about the server's supported feature set and
+        other relevant capabilities.
+
+        * Matrix Spec
+        5.10.1   GET /_matrix/client/r0/capabilities
+        Rate-limited:   Yes.
+        Requires auth:  Yes.
+        """
+        return await self.auth_client("GET", "capabilities")
+
     async def login(
         self,
         user: str,
@@ -273,29 +468,62 @@ class MatrixClient(BaseMatrixClient):
         return await self.auth_client(
             "GET",
             "sync",
-            params=dict(
-                filter(
-                    lambda x: x[1],
-                    {
-                        "filter": json.dumps(
-                            data_filter, separators=(",", ":")
-                        )
-                        if isinstance(data_filter, dict)
-                        else data_filter,
-                        "since": since,
-                        "full_state": full_state,
-                        "set_presence": set_presence,
-                        "timeout": timeout,
-                    }.items(),
-                )
+            params=sync_params(
+                since, timeout, data_filter, full_state, set_presence
             ),
         )
 
+    async def sync_stream(
+        self,
+        since: Optional[str] = None,
+        timeout: Optional[int] = None,
+        data_filter: FilterT = None,
+        full_state: Optional[bool] = None,
+        set_presence: Optional[str] = None,
+    ) -> AsyncIterator[SyncSection]:
+        """Like ``sync``, but yield the body in sections as it is received.
+
+        Top level keys such as ``next_batch``, ``to_device`` or
+        ``presence`` come out whole, and ``rooms`` one room at a time as
+        ``("rooms", "join", room_id)``, so a large initial sync is never
+        held in memory at once. Error responses raise
+        ``httpx.HTTPStatusError``, or ``LoginRequiredException`` for 401.
+
+            async for path, value in client.sync_stream(timeout=0):
+                if path[0] == "rooms":
+                    membership, room_id = path[1:]
+        """
+        if not self.access_token:
+            raise LoginRequiredException(
+                status_code=401, message="Invalid access_token"
+            )
+        async with self.stream(
+            "GET",
+            "sync",
+            access_token=self.access_token,
+            params=sync_params(
+                since, timeout, data_filter, full_state, set_presence
+            ),
+        ) as response:
+            if response.status_code == 401:
+                raise LoginRequiredException(
+                    status_code=401, message="Invalid access_token"
+                )
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+            parser = StreamingParser()
+            async for chunk in response.aiter_bytes():
+                for section in parser.feed(chunk):
+                    yield section
+            for section in parser.close():
+                yield section
+
     async def room_send(
         self,
         room_id: str,
         event_type: str,
-        body: Dict[Any, Any],
+        body: Union[Dict[Any, Any], bytes],
         tx_id: Union[str, UUID],
     ) -> MatrixResponse:
         """Send a message event to a room.
@@ -304,7 +532,8 @@ class MatrixClient(BaseMatrixClient):
                 to.
             event_type (str): The type of the message that will be sent.
             body(Dict): The body of the event. The fields in this
-                object will vary depending on the type of event.
+                object will vary depending on the type of event. Bytes are
+                sent as is, see ``encode``.
             tx_id (str): The transaction ID for this event.
 
         * Matrix Spec
@@ -321,13 +550,14 @@ class MatrixClient(BaseMatrixClient):
         return await self.auth_client(
             "PUT",
             f"rooms/{room_id}/send/{event_type}/{tx_id}",
-            json=body,
+            **self.body_args(body),
         )
 
     async def room_get_event(
         self, room_id: str, event_id: str
     ) -> MatrixResponse:
         """Get a single event based on roomId/eventId.
+        ``MatrixResponse.event()`` decodes it as an ``Event``.
         Args:
             room_id (str): The room id of the room where the event is in.
             event_id (str): The event id to get.
@@ -350,7 +580,7 @@ class MatrixClient(BaseMatrixClient):
         self,
         room_id: str,
         event_type: str,
-        body: Dict[Any, Any],
+        body: Union[Dict[Any, Any], bytes],
         state_key: str = "",
     ) -> MatrixResponse:
         """Send a state event.
@@ -361,7 +591,8 @@ class MatrixClient(BaseMatrixClient):
                 to.
             event_type (str): The type of the event that will be sent.
             body(Dict): The body of the event. The fields in this
-                object will vary depending on the type of event.
+                object will vary depending on the type of event. Bytes are
+                sent as is, see ``encode``.
             state_key: The key of the state to look up. Defaults to an empty
                 string.
 
@@ -380,7 +611,7 @@ class MatrixClient(BaseMatrixClient):
         return await self.auth_client(
             "PUT",
             f"rooms/{room_id}/state/{event_type}/{state_key}",
-            json=body,
+            **self.body_args(body),
         )
 
     async def room_get_state_event(
@@ -487,7 +718,7 @@ class MatrixClient(BaseMatrixClient):
         """
         return await self.auth_client(
             "POST",
-            f"rooms{room_id}/kick",
+            f"rooms/{room_id}/kick",
             json=dict(
                 filter(
                     lambda x: x[1],
@@ -514,7 +745,7 @@ class MatrixClient(BaseMatrixClient):
         """
         return await self.auth_client(
             "POST",
-            f"rooms{room_id}/ban",
+            f"rooms/{room_id}/ban",
             json=dict(
                 filter(
                     lambda x: x[1],
@@ -539,7 +770,7 @@ class MatrixClient(BaseMatrixClient):
         """
         return await self.auth_client(
             "POST",
-            f"rooms{room_id}/unban",
+            f"rooms/{room_id}/unban",
             json=dict(
                 filter(
                     lambda x: x[1],
@@ -560,7 +791,7 @@ class MatrixClient(BaseMatrixClient):
         """
         return await self.auth_client(
             "POST",
-            f"rooms{room_id}/invite",
+            f"rooms/{room_id}/invite",
             json=dict(
                 filter(
                     lambda x: x[1],
@@ -732,8 +963,32 @@ class MatrixClient(BaseMatrixClient):
                 request.
 
         * Matrix Spec
+        9.5.4   GET /_matrix/client/r0/rooms/{roomId}/messages
+        params = {
+            "from": "s345_678_333",
+            "to": "t3356-1234",
+            "dir": "b",
+            "limit": 10,
+            "filter": "{\"contains_url\":true}"
+        }
+
+        Rate-limited:   No.
+        Requires auth:  Yes.
         """
-        return MatrixResponse(httpx.Response(status_code=404, json={}))
+        params = {
+            "from": start,
+            "dir": "b" if direction == MessageDirection.back else "f",
+            "limit": limit,
+        }
+        if end:
+            params["to"] = end
+        if message_filter:
+            params["filter"] = json.dumps(
+                message_filter, separators=(",", ":")
+            )
+        return await self.auth_client(
+            "GET", f"rooms/{room_id}/messages", params=params
+        )
 
     async def keys_upload(self, key_dict: Dict[str, Any]) -> MatrixResponse:
         """Publish end-to-end encryption keys.
@@ -747,7 +1002,10 @@ class MatrixClient(BaseMatrixClient):
         return MatrixResponse(httpx.Response(status_code=404, json={}))
 
     async def keys_query(
-        self, user_set: Iterable[str], token: Optional[str] = None
+        self,
+        user_set: Iterable[str],
+        token: Optional[str] = None,
+        timeout: int = 10000,
     ) -> MatrixResponse:
         """Query the current devices and identity keys for the given users.
         Returns the HTTP method, HTTP path and data for the request.
@@ -758,22 +1016,73 @@ class MatrixClient(BaseMatrixClient):
                 of a device update received in a sync request, this should be
                 the 'since' token of that sync request, or any later sync
                 token.
+            timeout (int): The time in milliseconds to wait for remote
+                homeservers.
 
         * Matrix Spec
+        14.11.5.2.2   POST /_matrix/client/r0/keys/query
+        Content-Type: application/json
+        body = {
+            "timeout": 10000,
+            "device_keys": {
+                "@alice:example.com": []
+            },
+            "token": "string"
+        }
+
+        Rate-limited:   No.
+        Requires auth:  Yes.
         """
-        return MatrixResponse(httpx.Response(status_code=404, json={}))
+        body: Dict[str, Any] = {
+            "timeout": timeout,
+            "device_keys": {user: [] for user in user_set},
+        }
+        if token:
+            body["token"] = token
+        return await self.auth_client("POST", "keys/query", json=body)
 
-    async def keys_claim(self, user_set: Dict[str, Iterable[str]]):
+    async def keys_claim(
+        self,
+        user_set: Dict[str, Iterable[str]],
+        algorithm: str = "signed_curve25519",
+        timeout: int = 10000,
+    ) -> MatrixResponse:
         """Claim one-time keys for use in Olm pre-key messages.
         Returns the HTTP method, HTTP path and data for the request.
         Args:
             user_set (Dict[str, List[str]]): The users and devices for which to
                 claim one-time keys to be claimed. A map from user ID, to a
                 list of device IDs.
+            algorithm (str): The algorithm of the keys to claim.
+            timeout (int): The time in milliseconds to wait for remote
+                homeservers.
 
         * Matrix Spec
+        14.11.5.2.3   POST /_matrix/client/r0/keys/claim
+        Content-Type: application/json
+        body = {
+            "timeout": 10000,
+            "one_time_keys": {
+                "@alice:example.com": {
+                    "JLAFKJWSCS": "signed_curve25519"
+                }
+            }
+        }
+
+        Rate-limited:   No.
+        Requires auth:  Yes.
         """
-        return MatrixResponse(httpx.Response(status_code=404, json={}))
+        return await self.auth_client(
+            "POST",
+            "keys/claim",
+            json={
+                "timeout": timeout,
+                "one_time_keys": {
+                    user: {device: algorithm for device in devices}
+                    for user, devices in user_set.items()
+                },
+            },
+        )
 
     async def to_device(
         self,
@@ -936,8 +1245,14 @@ class MatrixClient(BaseMatrixClient):
             room_alias (str): The alias to resolve
 
         * Matrix Spec
+        10.2.2   GET /_matrix/client/r0/directory/room/{roomAlias}
+
+        Rate-limited:   No.
+        Requires auth:  No.
         """
-        return MatrixResponse(httpx.Response(status_code=404, json={}))
+        return await self.client(
+            "GET", f"directory/room/{quote(room_alias, safe='')}"
+        )
 
     async def room_typing(
         self,
@@ -959,8 +1274,22 @@ class MatrixClient(BaseMatrixClient):
                 valid for in milliseconds.
 
         * Matrix Spec
+        13.4.2.1   PUT /_matrix/client/r0/rooms/{roomId}/typing/{userId}
+        Content-Type: application/json
+        body = {
+            "typing": true,
+            "timeout": 30000
+        }
+
+        Rate-limited:   Yes.
+        Requires auth:  Yes.
         """
-        return MatrixResponse(httpx.Response(status_code=404, json={}))
+        body: Dict[str, Any] = {"typing": typing_state}
+        if typing_state:
+            body["timeout"] = timeout
+        return await self.auth_client(
+            "PUT", f"rooms/{room_id}/typing/{user_id}", json=body
+        )
 
     async def update_receipt_marker(
         self,
@@ -978,8 +1307,20 @@ class MatrixClient(BaseMatrixClient):
                 `m.read` is supported by the Matrix specification.
 
         * Matrix Spec
+        13.5.2.1   POST /_matrix/client/r0/rooms/{roomId}/receipt/{receiptType}/{eventId}
+        Content-Type: application/json
+        body = {}
+
+        Rate-limited:   Yes.
+        Requires auth:  Yes.
         """
-        return MatrixResponse(httpx.Response(status_code=404, json={}))
+        return await self.auth_client(
+            "POST",
+            f"rooms/{room_id}/receipt/{receipt_type}/{event_id}",
+            # an empty json body would be dropped, the server wants one
+            content=b"{}",
+            headers={"Content-Type": "application/json"},
+        )
 
     async def room_read_markers(
         self,
@@ -1000,20 +1341,42 @@ class MatrixClient(BaseMatrixClient):
                 location at.
 
         * Matrix Spec
+        13.6.2.1   POST /_matrix/client/r0/rooms/{roomId}/read_markers
+        Content-Type: application/json
+        body = {
+            "m.fully_read": "$somewhere:example.org",
+            "m.read": "$elsewhere:example.org"
+        }
+
+        Rate-limited:   Yes.
+        Requires auth:  Yes.
         """
-        return MatrixResponse(httpx.Response(status_code=404, json={}))
+        body = {"m.fully_read": fully_read_event}
+        if read_event:
+            body["m.read"] = read_event
+        return await self.auth_client(
+            "POST", f"rooms/{room_id}/read_markers", json=body
+        )
 
     async def content_repository_config(self) -> MatrixResponse:
         """Get the content repository configuration, such as upload limits.
         Returns the HTTP method and HTTP path for the request.
 
         * Matrix Spec
+        13.8.2.6   GET /_matrix/media/r0/config
+
+        Rate-limited:   Yes.
+        Requires auth:  Yes.
         """
-        return MatrixResponse(httpx.Response(status_code=404, json={}))
+        return await self.auth_client(
+            "GET", "config", base_path=self.media_path
+        )
 
     async def upload(
         self,
         filename: Optional[str] = None,
+        content: RequestContent = b"",
+        content_type: str = "application/octet-stream",
     ) -> MatrixResponse:
         """Upload a file's content to the content repository.
         Returns the HTTP method, HTTP path and empty data for the request.
@@ -1021,10 +1384,28 @@ class MatrixClient(BaseMatrixClient):
         Note: This requests also requires the Content-Type http header to be
         set.
             filename (str): The name of the file being uploaded
+            content (bytes): The content of the file being uploaded.
+            content_type (str): The content type of the file being uploaded.
 
         * Matrix Spec
+        13.8.2.1   POST /_matrix/media/r0/upload
+        Content-Type: application/pdf
+
+        <bytes>
+
+        Rate-limited:   Yes.
+        Requires auth:  Yes.
         """
-        return MatrixResponse(httpx.Response(status_code=404, json={}))
+        return await self.auth_client(
+            "POST",
+            "upload",
+            params=dict(
+                filter(lambda x: x[1], {"filename": filename}.items())
+            ),
+            headers={"Content-Type": content_type},
+            content=content,
+            base_path=self.media_path,
+        )
 
     async def download(
         self,
@@ -1047,8 +1428,21 @@ class MatrixClient(BaseMatrixClient):
                 itself.
 
         * Matrix Spec
+        13.8.2.2   GET /_matrix/media/r0/download/{serverName}/{mediaId}
+        13.8.2.3   GET /_matrix/media/r0/download/{serverName}/{mediaId}/{fileName}
+
+        Rate-limited:   Yes.
+        Requires auth:  No.
         """
-        return MatrixResponse(httpx.Response(status_code=404, json={}))
+        path = f"download/{server_name}/{media_id}"
+        if filename:
+            path = f"{path}/{filename}"
+        return await self.client(
+            "GET",
+            path,
+            params={"allow_remote": "true" if allow_remote else "false"},
+            base_path=self.media_path,
+        )
 
     async def thumbnail(
         self,
@@ -1074,8 +1468,22 @@ class MatrixClient(BaseMatrixClient):
                 itself.
 
         * Matrix Spec
+        13.8.2.4   GET /_matrix/media/r0/thumbnail/{serverName}/{mediaId}
+
+        Rate-limited:   Yes.
+        Requires auth:  No.
         """
-        return MatrixResponse(httpx.Response(status_code=404, json={}))
+        return await self.client(
+            "GET",
+            f"thumbnail/{server_name}/{media_id}",
+            params={
+                "width": width,
+                "height": height,
+                "method": ResizingMethod(method).value,
+                "allow_remote": "true" if allow_remote else "false",
+            },
+            base_path=self.media_path,
+        )
 
     async def profile_get(self, user_id: str) -> MatrixResponse:
         """Get the combined profile information for a user.
@@ -1244,8 +1652,19 @@ class MatrixClient(BaseMatrixClient):
             limit(int, optional): The maximum number of events to request.
 
         * Matrix Spec
+        10.9.1   GET /_matrix/client/r0/rooms/{roomId}/context/{eventId}
+        params = {
+            "limit": 10
+        }
+
+        Rate-limited:   No.
+        Requires auth:  Yes.
         """
-        return MatrixResponse(httpx.Response(status_code=404, json={}))
+        return await self.auth_client(
+            "GET",
+            f"rooms/{room_id}/context/{event_id}",
+            params={"limit": limit} if limit else None,
+        )
 
     async def upload_filter(
         self,
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import pickle
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, List, Optional, Tuple
+
+Pieces = Tuple[bytes, List[Tuple[str, str, bytes]]]
+
+
+def decode_pieces(content: bytes) -> Pieces:
+    """Decode a JSON body and pickle it back in pieces, one per room.
+
+    Runs in the executor. Unpickling is several times cheaper than JSON
+    decoding and, done room by room, lets the event loop run in between.
+    """
+    body = json.loads(content)
+    rooms = body.get("rooms") if isinstance(body, dict) else None
+    pieces = []
+    if isinstance(rooms, dict):
+        # rooms are loaded back into these emptied memberships
+        body["rooms"] = {membership: {} for membership in rooms}
+        for membership, by_id in rooms.items():
+            for room_id, room in by_id.items():
+                pieces.append(
+                    (
+                        membership,
+                        room_id,
+                        pickle.dumps(room, pickle.HIGHEST_PROTOCOL),
+                    )
+                )
+    return pickle.dumps(body, pickle.HIGHEST_PROTOCOL), pieces
+
+
+class DecodePolicy:
+    """Decode JSON bodies larger than ``threshold`` bytes off the loop.
+
+    JSON decoding holds the GIL, so a thread does not free the event loop
+    for long: large bodies are decoded in a worker process instead, which
+    returns the rooms of a sync body as separate pickles. Those are loaded
+    back in slices of at most ``slice`` seconds, yielding to the event loop
+    in between, so a sync of tens of MB never blocks other coroutines for
+    more than a single room.
+
+    ``executor`` defaults to a one-process ``ProcessPoolExecutor`` created
+    on first use; a ``ThreadPoolExecutor`` works too for a decoder that
+    releases the GIL.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 1 << 20,
+        executor: Optional[Executor] = None,
+        slice: float = 0.005,
+    ):
+        self.threshold = threshold
+        self.executor = executor
+        self.slice = slice
+
+    def offloaded(self, content: bytes) -> bool:
+        return len(content) > self.threshold
+
+    async def decode(self, content: bytes) -> Any:
+        if not self.offloaded(content):
+            return json.loads(content)
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=1)
+        head, pieces = await asyncio.get_event_loop().run_in_executor(
+            self.executor, decode_pieces, content
+        )
+        body = pickle.loads(head)
+        deadline = time.perf_counter() + self.slice
+        for membership, room_id, room in pieces:
+            body["rooms"][membership][room_id] = pickle.loads(room)
+            if time.perf_counter() > deadline:
+                await asyncio.sleep(0)
+                deadline = time.perf_counter() + self.slice
+        return body
+
+    def shutdown(self, wait: bool = True):
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait)
+            self.executor = None
+
+
+DECODE_POLICY = DecodePolicy()
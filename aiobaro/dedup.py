@@ -0,0 +1,183 @@
+import hashlib
+import math
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Protocol,
+)
+
+
+class SeenSet(Protocol):
+    def add(self, key: str) -> bool:
+        """Add ``key``, returning whether it was not seen before."""
+
+    def __contains__(self, key: object) -> bool:
+        """Whether ``key`` was seen, maybe."""
+
+
+class LRUSet:
+    """Set of the ``capacity`` most recently seen keys.
+
+    ``add()`` returns whether the key is new; seeing a key again makes it
+    the most recent one.
+    """
+
+    def __init__(self, capacity: int = 100_000):
+        self.capacity = capacity
+        self.keys: "OrderedDict[str, None]" = OrderedDict()
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.keys
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: str) -> bool:
+        if key in self.keys:
+            self.keys.move_to_end(key)
+            return False
+        self.keys[key] = None
+        if len(self.keys) > self.capacity:
+            self.keys.popitem(last=False)
+        return True
+
+
+class BloomFilter:
+    """Bloom filter sized for ``capacity`` keys at ``error_rate``.
+
+    Answers "maybe seen" with a false positive probability of
+    ``error_rate`` once full, and never forgets a key.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 1e-6):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(
+            int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8
+        )
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, key: str) -> Iterator[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def __contains__(self, key: object) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self.positions(str(key))
+        )
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, key: str) -> bool:
+        new = False
+        for position in self.positions(key):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                new = True
+        self.count += new
+        return new
+
+
+class RotatingBloomFilter:
+    """Two ``BloomFilter`` generations of ``capacity`` keys each.
+
+    When the current generation is full it becomes the previous one and
+    the oldest is dropped, so memory stays bounded however long the process
+    runs, and at least the last ``capacity`` keys are always remembered.
+    The false positive rate is at most twice ``error_rate``.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 1e-6):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.current = BloomFilter(capacity, error_rate)
+        self.previous: Optional[BloomFilter] = None
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.current or (
+            self.previous is not None and key in self.previous
+        )
+
+    def __len__(self) -> int:
+        return len(self.current) + len(self.previous or ())
+
+    def add(self, key: str) -> bool:
+        # keys seen again are carried over to the current generation
+        seen = self.previous is not None and key in self.previous
+        new = self.current.add(key) and not seen
+        if self.current.count >= self.capacity:
+            self.previous = self.current
+            self.current = BloomFilter(self.capacity, self.error_rate)
+        return new
+
+
+def event_id_of(event: Any) -> Optional[str]:
+    """Event id of an event dict or ``Event``, if it has one."""
+    if isinstance(event, dict):
+        return event.get("event_id")
+    return getattr(event, "event_id", None)
+
+
+def response_events(body: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Events of a ``room_messages``, ``room_context`` or
+    ``room_get_event`` response body.
+    """
+    if "event_id" in body:
+        yield body
+    if "event" in body:
+        yield body["event"]
+    for key in ("events_before", "chunk", "events_after", "state"):
+        yield from body.get(key, ())
+
+
+class Deduplicator:
+    """Drop events already seen, by event id.
+
+    Events reach a client through sync timelines, ``room_messages``
+    backfill, ``room_context`` and ``room_get_event``; pass them all
+    through one ``Deduplicator`` so each is handled once. ``seen`` defaults
+    to an exact ``LRUSet`` of the last 100 000 ids; a
+    ``RotatingBloomFilter`` remembers many more ids in the same memory, at
+    the cost of rarely dropping an event never seen. Events without an id,
+    such as ephemeral ones, always pass.
+
+        dedup = Deduplicator()
+        for room_id, section, event in iter_events(body):
+            if dedup.first_seen(event.get("event_id")):
+                ...
+    """
+
+    def __init__(self, seen: Optional[SeenSet] = None):
+        self.seen = LRUSet() if seen is None else seen
+        self.duplicates = 0
+
+    def first_seen(self, event_id: Optional[str]) -> bool:
+        if event_id is None:
+            return True
+        if self.seen.add(event_id):
+            return True
+        self.duplicates += 1
+        return False
+
+    def filter(
+        self,
+        events: Iterable[Any],
+        key: Callable[[Any], Optional[str]] = event_id_of,
+    ) -> Iterator[Any]:
+        """Events, dicts or ``Event``, not seen before."""
+        for event in events:
+            if self.first_seen(key(event)):
+                yield event
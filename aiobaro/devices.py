@@ -0,0 +1,154 @@
+import asyncio
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .core import MatrixClient
+
+DeviceKeys = Dict[str, Dict[str, Any]]
+
+CACHE_VERSION = 1
+
+
+class DeviceListCache:
+    """Device keys of the users we share rooms with, kept up to date.
+
+    Users are queried with ``keys_query`` the first time they are asked
+    for, in requests of up to ``batch_size`` users, and then served from
+    the cache until a sync reports their devices changed in
+    ``device_lists``: ``update()`` only marks them outdated, and the next
+    ``get()`` re-queries just those users. Concurrent ``get()`` calls share
+    the requests in flight.
+
+    With a ``path``, the cache is saved there as JSON by ``save()`` and
+    loaded back on creation, outdated users included, so a restart only
+    re-queries users whose devices changed.
+
+        cache = DeviceListCache(client, "devices.json")
+        async for body in SyncLoop(client.sync):
+            cache.update(body)
+            devices = await cache.get(room_members)
+    """
+
+    def __init__(
+        self,
+        client: MatrixClient,
+        path: Optional[str] = None,
+        batch_size: int = 100,
+    ):
+        self.client = client
+        self.path = path
+        self.batch_size = batch_size
+        self.devices: Dict[str, DeviceKeys] = {}
+        self.outdated: Set[str] = set()
+        self.token: Optional[str] = None
+        self.queries = 0
+        self.inflight: Dict[str, "asyncio.Future[None]"] = {}
+        # changes seen per user being queried, to tell a query answered
+        # before a change
+        self.changes: Dict[str, int] = {}
+        # users who left while being queried, whose answer is dropped
+        self.left: Set[str] = set()
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self.devices
+
+    def update(self, body: Dict[str, Any]):
+        """Apply the ``device_lists`` of a sync response body."""
+        device_lists = body.get("device_lists", {})
+        for user_id in device_lists.get("changed", ()):
+            if user_id in self.inflight:
+                self.changes[user_id] = self.changes.get(user_id, 0) + 1
+            if user_id in self.devices or user_id in self.inflight:
+                self.outdated.add(user_id)
+        for user_id in device_lists.get("left", ()):
+            # no shared room left, updates for this user stop
+            self.devices.pop(user_id, None)
+            self.outdated.discard(user_id)
+            if user_id in self.inflight:
+                self.left.add(user_id)
+        self.token = body.get("next_batch", self.token)
+
+    def stale(self, user_ids: Iterable[str]) -> List[str]:
+        return [
+            user_id
+            for user_id in user_ids
+            if user_id not in self.devices or user_id in self.outdated
+        ]
+
+    async def get(self, user_ids: Iterable[str]) -> Dict[str, DeviceKeys]:
+        """Device keys of ``user_ids``, querying the missing or outdated."""
+        user_ids = list(user_ids)
+        await self.refresh(user_ids)
+        return {
+            user_id: self.devices[user_id]
+            for user_id in user_ids
+            if user_id in self.devices
+        }
+
+    async def refresh(self, user_ids: Optional[Iterable[str]] = None):
+        """Query ``user_ids`` if stale, all the outdated users by default."""
+        stale = self.stale(self.outdated if user_ids is None else user_ids)
+        waiting = {self.inflight[u] for u in stale if u in self.inflight}
+        query = [u for u in stale if u not in self.inflight]
+        tasks = [
+            self.query(query[i : i + self.batch_size])
+            for i in range(0, len(query), self.batch_size)
+        ]
+        if tasks or waiting:
+            await asyncio.gather(*tasks, *waiting)
+
+    def query(self, user_ids: List[str]) -> "asyncio.Future[None]":
+        """Start querying ``user_ids``, for other callers to wait on too."""
+        changes = {
+            user_id: self.changes.get(user_id, 0) for user_id in user_ids
+        }
+        task = asyncio.ensure_future(self.run_query(user_ids, changes))
+        for user_id in user_ids:
+            self.inflight[user_id] = task
+        return task
+
+    async def run_query(self, user_ids: List[str], changes: Dict[str, int]):
+        try:
+            self.queries += 1
+            response = await self.client.keys_query(user_ids, self.token)
+            if not response.ok:
+                return
+            device_keys = response.json().get("device_keys", {})
+            for user_id in user_ids:
+                if user_id not in device_keys or user_id in self.left:
+                    # unreachable server, queried again next time, or no
+                    # longer tracked
+                    continue
+                self.devices[user_id] = device_keys[user_id]
+                if self.changes.get(user_id, 0) == changes[user_id]:
+                    self.outdated.discard(user_id)
+        finally:
+            for user_id in user_ids:
+                self.inflight.pop(user_id, None)
+                self.changes.pop(user_id, None)
+                self.left.discard(user_id)
+
+    def load(self):
+        with open(self.path) as cache:
+            data = json.load(cache)
+        if data.get("version") != CACHE_VERSION:
+            return
+        self.devices = data["devices"]
+        self.outdated = set(data["outdated"])
+        self.token = data["token"]
+
+    def save(self):
+        """Write the cache to ``path``, atomically."""
+        data = {
+            "version": CACHE_VERSION,
+            "token": self.token,
+            "devices": self.devices,
+            "outdated": sorted(self.outdated),
+        }
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as cache:
+            json.dump(data, cache, separators=(",", ":"))
+        os.replace(temporary, self.path)
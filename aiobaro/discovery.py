@@ -0,0 +1,153 @@
+import json
+import os
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import httpcore
+import httpx
+
+from .core import MatrixClient
+
+CACHE_VERSION = 1
+
+# path prefix of the client and media APIs, newest first, with the
+# specification versions that introduced them
+API_VERSIONS = (("v3", "v1."), ("r0", "r0."))
+
+
+class ServerInfo(NamedTuple):
+    """What discovery learnt about a homeserver."""
+
+    homeserver: str
+    versions: List[str]
+    unstable_features: Dict[str, bool]
+    capabilities: Dict[str, Any]
+    fetched: float
+
+    @property
+    def version(self) -> str:
+        """Newest API path prefix the server supports, ``"r0"`` if none."""
+        for version, spec in API_VERSIONS:
+            if any(supported.startswith(spec) for supported in self.versions):
+                return version
+        return "r0"
+
+    def supports(self, feature: str) -> bool:
+        return self.unstable_features.get(feature, False)
+
+
+async def discover(
+    server: str,
+    path: Optional[str] = None,
+    ttl: float = 86400.0,
+    access_token: str = None,
+    transport: httpcore.AsyncHTTPTransport = None,
+) -> ServerInfo:
+    """Discover ``server``, a server name or URL.
+
+    Follows ``/.well-known/matrix/client`` to the homeserver URL, then
+    fetches the supported versions and, with an ``access_token``, the
+    capabilities. With a ``path``, results are cached there as JSON for
+    ``ttl`` seconds, shared by all the servers discovered with that path,
+    and an expired entry is still used when discovery fails.
+    """
+    cached = load(path).get(server) if path is not None else None
+    if cached is not None and time.time() - cached.fetched < ttl:
+        return cached
+    try:
+        info = await fetch(server, access_token, transport)
+    except httpx.HTTPError:
+        if cached is not None:
+            return cached
+        raise
+    if path is not None:
+        save(path, server, info)
+    return info
+
+
+async def fetch(
+    server: str,
+    access_token: str = None,
+    transport: httpcore.AsyncHTTPTransport = None,
+) -> ServerInfo:
+    base_url = server if "://" in server else f"https://{server}"
+    base_url = base_url.rstrip("/")
+    async with httpx.AsyncClient(transport=transport) as http:
+        response = await http.get(f"{base_url}/.well-known/matrix/client")
+    if response.status_code == 200:
+        try:
+            base_url = response.json()["m.homeserver"]["base_url"]
+            base_url = base_url.rstrip("/")
+        except (ValueError, KeyError, TypeError):
+            pass
+    client = MatrixClient(
+        base_url, access_token, transport=transport, metrics=None
+    )
+    versions = await client.versions()
+    versions.response.raise_for_status()
+    info = ServerInfo(
+        base_url,
+        versions.json().get("versions", []),
+        versions.json().get("unstable_features", {}),
+        {},
+        time.time(),
+    )
+    if access_token is not None:
+        client.version = info.version
+        capabilities = await client.capabilities()
+        if capabilities.ok:
+            info = info._replace(
+                capabilities=capabilities.json().get("capabilities", {})
+            )
+    return info
+
+
+async def connect(
+    server: str,
+    path: Optional[str] = None,
+    ttl: float = 86400.0,
+    access_token: str = None,
+    transport: httpcore.AsyncHTTPTransport = None,
+    **kwargs: Any,
+) -> MatrixClient:
+    """A ``MatrixClient`` for ``server`` using the newest API it supports.
+
+    ``kwargs`` are passed on to ``MatrixClient``.
+
+        client = await connect("baro.org", "servers.json", access_token=t)
+    """
+    info = await discover(server, path, ttl, access_token, transport)
+    return MatrixClient(
+        info.homeserver,
+        access_token,
+        version=info.version,
+        transport=transport,
+        **kwargs,
+    )
+
+
+def load(path: str) -> Dict[str, ServerInfo]:
+    try:
+        with open(path) as cache:
+            data = json.load(cache)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != CACHE_VERSION:
+        return {}
+    return {
+        server: ServerInfo(**info) for server, info in data["servers"].items()
+    }
+
+
+def save(path: str, server: str, info: ServerInfo):
+    """Add ``info`` to the cache at ``path``, atomically."""
+    servers = {name: cached._asdict() for name, cached in load(path).items()}
+    servers[server] = info._asdict()
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as cache:
+        json.dump(
+            {"version": CACHE_VERSION, "servers": servers},
+            cache,
+            separators=(",", ":"),
+        )
+    os.replace(temporary, path)
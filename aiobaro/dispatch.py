@@ -0,0 +1,227 @@
+import asyncio
+import inspect
+import itertools
+from collections import deque
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .dedup import Deduplicator, event_id_of
+from .sync import iter_events
+
+Handler = Callable[[Optional[str], Any], Union[None, Awaitable[None]]]
+Key = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+def event_fields(event: Any) -> Tuple[Optional[str], Optional[str]]:
+    """Type and sender of an event dict or ``Event``."""
+    if isinstance(event, dict):
+        return event.get("type"), event.get("sender")
+    return event.type, event.sender
+
+
+class Dispatcher:
+    """Route sync events to handlers registered by type, room and sender.
+
+    Handlers are indexed by their ``(event_type, room_id, sender)``
+    predicate, ``None`` matching anything, so an event is matched with one
+    dict lookup per combination of predicates in use, at most eight,
+    however many handlers there are. Matched handlers run in registration
+    order on a worker per room: the events of a room are handled one at a
+    time, in the order they were dispatched, while rooms are handled
+    concurrently, up to ``concurrency`` handlers at once.
+
+        dispatcher = Dispatcher()
+
+        @dispatcher.on("m.room.message", room_id="!room:baro")
+        async def on_message(room_id, event):
+            ...
+
+        async for body in SyncLoop(client.sync):
+            dispatcher.feed(body)
+
+    Handlers take the room id, ``None`` for events outside rooms, and the
+    event, a dict or an ``Event``. They may be plain functions. Exceptions
+    are kept in ``errors`` and do not stop the worker. With a
+    ``Deduplicator``, events already seen are not dispatched again.
+    """
+
+    def __init__(
+        self, concurrency: int = 100, dedup: Optional[Deduplicator] = None
+    ):
+        self.concurrency = concurrency
+        self.dedup = dedup
+        self.index: Dict[Key, List[Tuple[int, Handler]]] = {}
+        # how many keys use each combination of predicates
+        self.shapes: Dict[Tuple[bool, bool, bool], int] = {}
+        self.counter = itertools.count()
+        self.queues: Dict[Optional[str], Deque[Tuple[Any, List[Handler]]]] = {}
+        self.workers: Dict[Optional[str], asyncio.Task] = {}
+        # created on first dispatch, inside the running event loop
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.progress: Optional[asyncio.Event] = None
+        self.pending = 0
+        self.errors: Deque[Tuple[Any, BaseException]] = deque(maxlen=1000)
+
+    def add_handler(
+        self,
+        handler: Handler,
+        event_type: Optional[str] = None,
+        room_id: Optional[str] = None,
+        sender: Optional[str] = None,
+    ):
+        key = (event_type, room_id, sender)
+        shape = (
+            event_type is not None,
+            room_id is not None,
+            sender is not None,
+        )
+        if key not in self.index:
+            self.index[key] = []
+            self.shapes[shape] = self.shapes.get(shape, 0) + 1
+        self.index[key].append((next(self.counter), handler))
+
+    def remove_handler(
+        self,
+        handler: Handler,
+        event_type: Optional[str] = None,
+        room_id: Optional[str] = None,
+        sender: Optional[str] = None,
+    ):
+        key = (event_type, room_id, sender)
+        handlers = [
+            entry for entry in self.index.get(key, ()) if entry[1] != handler
+        ]
+        if handlers:
+            self.index[key] = handlers
+        elif self.index.pop(key, None) is not None:
+            shape = tuple(value is not None for value in key)
+            self.shapes[shape] -= 1
+            if not self.shapes[shape]:
+                del self.shapes[shape]
+
+    def on(
+        self,
+        event_type: Optional[str] = None,
+        room_id: Optional[str] = None,
+        sender: Optional[str] = None,
+    ) -> Callable[[Handler], Handler]:
+        """Decorator form of ``add_handler``."""
+
+        def decorator(handler: Handler) -> Handler:
+            self.add_handler(handler, event_type, room_id, sender)
+            return handler
+
+        return decorator
+
+    def match(
+        self,
+        event_type: Optional[str],
+        room_id: Optional[str],
+        sender: Optional[str],
+    ) -> List[Handler]:
+        """Handlers of an event, in registration order."""
+        matched: List[Tuple[int, Handler]] = []
+        for by_type, by_room, by_sender in self.shapes:
+            if (
+                (by_type and event_type is None)
+                or (by_room and room_id is None)
+                or (by_sender and sender is None)
+            ):
+                # the key of another shape, which is matched on its own
+                continue
+            entries = self.index.get(
+                (
+                    event_type if by_type else None,
+                    room_id if by_room else None,
+                    sender if by_sender else None,
+                )
+            )
+            if entries:
+                matched.extend(entries)
+        if len(matched) > 1:
+            matched.sort(key=lambda entry: entry[0])
+        return [handler for _, handler in matched]
+
+    def dispatch(self, room_id: Optional[str], event: Any) -> bool:
+        """Queue ``event`` on the worker of its room; call from the loop.
+
+        Returns whether any handler matched.
+        """
+        event_type, sender = event_fields(event)
+        handlers = self.match(event_type, room_id, sender)
+        if not handlers:
+            return False
+        if self.dedup is not None:
+            if not self.dedup.first_seen(event_id_of(event)):
+                return False
+        queue = self.queues.get(room_id)
+        if queue is None:
+            queue = self.queues[room_id] = deque()
+        queue.append((event, handlers))
+        self.pending += 1
+        if room_id not in self.workers:
+            if self.semaphore is None:
+                self.semaphore = asyncio.Semaphore(self.concurrency)
+                self.progress = asyncio.Event()
+            self.workers[room_id] = asyncio.ensure_future(self.run(room_id))
+        return True
+
+    def feed(self, body: Dict[str, Any]) -> int:
+        """Dispatch every event of a sync response body.
+
+        Returns the number of events queued.
+        """
+        return sum(
+            self.dispatch(room_id, event)
+            for room_id, _, event in iter_events(body)
+        )
+
+    async def run(self, room_id: Optional[str]):
+        queue = self.queues[room_id]
+        try:
+            while queue:
+                event, handlers = queue.popleft()
+                for handler in handlers:
+                    async with self.semaphore:
+                        try:
+                            result = handler(room_id, event)
+                            if inspect.isawaitable(result):
+                                await result
+                        except Exception as error:
+                            self.errors.append((event, error))
+                self.pending -= 1
+                self.progress.set()
+        finally:
+            # the worker exits once its room is idle
+            del self.workers[room_id]
+            if not queue:
+                del self.queues[room_id]
+
+    async def wait_pending(self, limit: int):
+        """Wait until fewer than ``limit`` events are queued."""
+        while self.pending >= limit:
+            self.progress.clear()
+            await self.progress.wait()
+
+    async def join(self):
+        """Wait until every queued event is handled."""
+        while self.workers:
+            await asyncio.gather(*self.workers.values())
+
+    async def close(self):
+        """Cancel the workers, dropping the events still queued."""
+        workers = list(self.workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self.queues.clear()
+        self.pending = 0
@@ -0,0 +1,154 @@
+import json
+import sys
+from typing import Any, Dict, Optional
+
+_encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+TOP_LEVEL = frozenset(
+    (
+        "event_id",
+        "type",
+        "sender",
+        "origin_server_ts",
+        "state_key",
+        "room_id",
+        "content",
+    )
+)
+
+
+def _pack(value: Any) -> bytes:
+    return _encoder.encode(value).encode()
+
+
+class Event:
+    """A room or to-device event, compact enough to cache by the million.
+
+    The identifying fields are plain attributes; ``content`` and any other
+    top level key (``unsigned``, ``redacts``...) are kept apart, and
+    ``compact()`` swaps them for compact JSON bytes, decoded again on
+    first access. Event types, senders and room ids are interned, so the
+    copies repeated across events are shared.
+
+    Build events with ``from_dict()``, which does no validation and
+    does not copy the content, or get them from
+    ``iter_events(body, typed=True)`` and ``MatrixResponse.event()``:
+
+        event = Event.from_dict(raw, room_id)
+        if event.type == "m.room.message":
+            print(event.content["body"])
+        cache[event.event_id] = event.compact()
+    """
+
+    __slots__ = (
+        "event_id",
+        "type",
+        "sender",
+        "origin_server_ts",
+        "state_key",
+        "room_id",
+        "_content",
+        "_extra",
+    )
+
+    def __init__(
+        self,
+        event_id: Optional[str],
+        type: str,
+        sender: Optional[str],
+        origin_server_ts: Optional[int] = None,
+        state_key: Optional[str] = None,
+        room_id: Optional[str] = None,
+        content: Optional[Dict[str, Any]] = None,
+        extra: Optional[Dict[str, Any]] = None,
+    ):
+        self.event_id = event_id
+        self.type = type
+        self.sender = sender
+        self.origin_server_ts = origin_server_ts
+        self.state_key = state_key
+        self.room_id = room_id
+        self._content = content if content else b"{}"
+        self._extra = extra if extra else None
+
+    @classmethod
+    def from_dict(
+        cls, event: Dict[str, Any], room_id: Optional[str] = None
+    ) -> "Event":
+        """Build an event from its decoded JSON, as found in a sync body."""
+        self = cls.__new__(cls)
+        get = event.get
+        self.event_id = get("event_id")
+        self.type = sys.intern(event["type"])
+        sender = get("sender")
+        self.sender = sys.intern(sender) if sender else sender
+        self.origin_server_ts = get("origin_server_ts")
+        self.state_key = get("state_key")
+        room_id = get("room_id", room_id)
+        self.room_id = sys.intern(room_id) if room_id else room_id
+        content = get("content")
+        self._content = content if content else b"{}"
+        extra = {k: v for k, v in event.items() if k not in TOP_LEVEL}
+        self._extra = extra if extra else None
+        return self
+
+    def compact(self) -> "Event":
+        """Encode the content and the other keys, for events kept long."""
+        if not isinstance(self._content, bytes):
+            self._content = _pack(self._content)
+        if isinstance(self._extra, dict):
+            self._extra = _pack(self._extra)
+        return self
+
+    @property
+    def content(self) -> Dict[str, Any]:
+        content = self._content
+        if isinstance(content, bytes):
+            content = self._content = json.loads(content)
+        return content
+
+    @property
+    def extra(self) -> Dict[str, Any]:
+        """Top level keys other than the attributes, such as ``unsigned``."""
+        extra = self._extra
+        if extra is None:
+            return {}
+        if isinstance(extra, bytes):
+            extra = self._extra = json.loads(extra)
+        return extra
+
+    @property
+    def is_state(self) -> bool:
+        return self.state_key is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The event as JSON, without the keys it did not have."""
+        event = {
+            key: getattr(self, key)
+            for key in (
+                "event_id",
+                "type",
+                "sender",
+                "origin_server_ts",
+                "state_key",
+                "room_id",
+            )
+            if getattr(self, key) is not None
+        }
+        event["content"] = self.content
+        event.update(self.extra)
+        return event
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Event):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __hash__(self) -> int:
+        return hash((self.event_id, self.type, self.room_id))
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}({self.event_id!r}, {self.type!r}, "
+            f"{self.sender!r})"
+        )
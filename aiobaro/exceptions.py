@@ -3,3 +3,20 @@ class LoginRequiredException(Exception):
         self.status_code = status_code
         self.message = message
         super().__init__(message)
+
+
+class DeadlineExceeded(Exception):
+    """The deadline set with ``aiobaro.timeouts.deadline`` ran out."""
+
+
+class CircuitOpenError(Exception):
+    """A request was refused because its circuit breaker is open."""
+
+    def __init__(self, host: str, family: str, retry_in: float):
+        self.host = host
+        self.family = family
+        self.retry_in = retry_in
+        super().__init__(
+            f"circuit open for {family} requests to {host}, "
+            f"next probe in {retry_in:.1f}s"
+        )
@@ -0,0 +1,168 @@
+import re
+import time
+from typing import Callable, Dict, List, Optional
+
+ENDPOINT_TEMPLATES = (
+    # Client-Server API
+    "login",
+    "register",
+    "logout",
+    "logout/all",
+    "sync",
+    "versions",
+    "capabilities",
+    "createRoom",
+    "joined_rooms",
+    "join/{roomIdOrAlias}",
+    "rooms/{roomId}/send/{eventType}/{txnId}",
+    "rooms/{roomId}/event/{eventId}",
+    "rooms/{roomId}/state",
+    "rooms/{roomId}/state/{eventType}",
+    "rooms/{roomId}/state/{eventType}/{stateKey}",
+    "rooms/{roomId}/redact/{eventId}/{txnId}",
+    "rooms/{roomId}/kick",
+    "rooms/{roomId}/ban",
+    "rooms/{roomId}/unban",
+    "rooms/{roomId}/invite",
+    "rooms/{roomId}/leave",
+    "rooms/{roomId}/forget",
+    "rooms/{roomId}/messages",
+    "rooms/{roomId}/context/{eventId}",
+    "rooms/{roomId}/joined_members",
+    "rooms/{roomId}/typing/{userId}",
+    "rooms/{roomId}/receipt/{receiptType}/{eventId}",
+    "rooms/{roomId}/read_markers",
+    "directory/room/{roomAlias}",
+    "keys/upload",
+    "keys/query",
+    "keys/claim",
+    "keys/changes",
+    "sendToDevice/{eventType}/{txnId}",
+    "devices",
+    "devices/{deviceId}",
+    "delete_devices",
+    "profile/{userId}",
+    "profile/{userId}/displayname",
+    "profile/{userId}/avatar_url",
+    "presence/{userId}/status",
+    "account/whoami",
+    "user/{userId}/filter",
+    "user/{userId}/filter/{filterId}",
+    # Media repository
+    "config",
+    "upload",
+    "download/{serverName}/{mediaId}",
+    "download/{serverName}/{mediaId}/{fileName}",
+    "thumbnail/{serverName}/{mediaId}",
+    # Synapse admin API
+    "reset_password/{userId}",
+    "users",
+)
+
+_ENDPOINT_PATTERN = re.compile(
+    "|".join(
+        "(?P<t%d>%s)" % (i, re.sub(r"\\{\w+\\}", "[^/]*", re.escape(template)))
+        for i, template in enumerate(ENDPOINT_TEMPLATES)
+    )
+)
+
+
+def endpoint_template(path: str) -> str:
+    """Map a request path to its endpoint template.
+
+    >>> endpoint_template("rooms/!abc:baro/send/m.room.message/1")
+    'rooms/{roomId}/send/{eventType}/{txnId}'
+
+    Unknown paths are reported as ``"other"`` so that templates stay a
+    bounded set, usable as a metrics label.
+    """
+    match = _ENDPOINT_PATTERN.fullmatch(path.lstrip("/"))
+    if match is None:
+        return "other"
+    return ENDPOINT_TEMPLATES[int(match.lastgroup[1:])]
+
+
+class RequestTrace:
+    """Timings and sizes of a single request.
+
+    ``phases`` holds durations in seconds:
+        encode: building the request, including JSON encoding.
+        wait: from sending the request until the response headers are in.
+            httpx does not expose its connection pool internals, so this
+            covers queueing for a connection, connect, TLS, upload and
+            server time.
+        read: reading the response body.
+        decode: decoding the JSON body, filled in by
+            ``MatrixResponse.json()`` when the body is first decoded.
+    """
+
+    __slots__ = (
+        "method",
+        "endpoint",
+        "url",
+        "status_code",
+        "request_bytes",
+        "response_bytes",
+        "phases",
+        "error",
+        "started",
+        "context",
+    )
+
+    def __init__(self, method: str, endpoint: str, url: str):
+        self.method = method
+        self.endpoint = endpoint
+        self.url = url
+        self.status_code: Optional[int] = None
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.phases: Dict[str, float] = {}
+        self.error: Optional[BaseException] = None
+        self.started = time.time()
+        self.context: Dict[str, object] = {}
+
+    def __repr__(self):
+        return (
+            f"<RequestTrace {self.method} {self.endpoint} "
+            f"status={self.status_code} duration={self.duration:.4f}>"
+        )
+
+    @property
+    def duration(self) -> float:
+        return sum(self.phases.values())
+
+
+class RequestHooks:
+    """Callbacks run over the lifecycle of every request.
+
+    on_request_start: the request is about to be sent.
+    on_request_end: the response body was read, or the request failed
+        with ``trace.error`` set.
+    on_response_decoded: the response JSON body was decoded.
+
+    Callbacks receive the ``RequestTrace`` and must not block, they run
+    inline on the event loop. ``trace.context`` is free for callbacks to
+    carry their own state, such as a tracing span, across events.
+    """
+
+    def __init__(
+        self,
+        on_request_start: List[Callable[[RequestTrace], None]] = None,
+        on_request_end: List[Callable[[RequestTrace], None]] = None,
+        on_response_decoded: List[Callable[[RequestTrace], None]] = None,
+    ):
+        self.on_request_start = list(on_request_start or ())
+        self.on_request_end = list(on_request_end or ())
+        self.on_response_decoded = list(on_response_decoded or ())
+
+    def request_start(self, trace: RequestTrace):
+        for callback in self.on_request_start:
+            callback(trace)
+
+    def request_end(self, trace: RequestTrace):
+        for callback in self.on_request_end:
+            callback(trace)
+
+    def response_decoded(self, trace: RequestTrace):
+        for callback in self.on_response_decoded:
+            callback(trace)
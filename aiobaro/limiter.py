@@ -0,0 +1,148 @@
+import asyncio
+import time
+from typing import Awaitable, Collection, Optional
+
+import httpx
+
+from .metrics import ClientMetrics
+from .models import MatrixResponse
+from .priority import PriorityScheduler
+from .routing import endpoint_family
+
+
+class AdaptiveLimiter:
+    """Limit requests in flight, adapting the limit to the server's health.
+
+    The limit grows by one each time a full limit of requests completed
+    while latency stayed within ``tolerance`` times the baseline, the
+    fastest request of the last ``window`` ones, and shrinks by
+    ``backoff`` when latency climbs above it or on a 429, a 5xx, or a
+    timeout or connection error, at most once per baseline latency so a
+    burst of failures counts once. Requests over the limit wait for a
+    slot, served by ``scheduler`` in order of their priority class, see
+    ``priority.priority()``. A fixed limit is ``min_limit == max_limit``.
+
+    Endpoint families in ``exclude`` are not limited: a sync long-poll
+    takes as long as it asked to, whatever the server's health.
+
+        limiter = AdaptiveLimiter(initial=10, max_limit=200)
+        client = MatrixClient(homeserver, token, limiter=limiter)
+    """
+
+    def __init__(
+        self,
+        initial: int = 20,
+        min_limit: int = 1,
+        max_limit: int = 1000,
+        tolerance: float = 2.0,
+        backoff: float = 0.9,
+        window: int = 500,
+        exclude: Collection[str] = ("sync",),
+        metrics: Optional[ClientMetrics] = None,
+        scheduler: Optional[PriorityScheduler] = None,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.window = window
+        self.exclude = frozenset(exclude)
+        self.inflight = 0
+        self.waiters = scheduler or PriorityScheduler()
+        self.baseline: Optional[float] = None
+        # fastest request and samples of the window being measured
+        self.window_min = float("inf")
+        self.samples = 0
+        self.decreased = 0.0
+        self.gauge = None
+        if metrics is not None:
+            self.gauge = metrics.registry.gauge(
+                "aiobaro_concurrency_limit",
+                "Requests in flight allowed by the adaptive limiter.",
+            )
+            self.gauge.set(value=self.limit)
+
+    def applies(self, path: str, base_url: str = "") -> bool:
+        return not self.exclude or (
+            endpoint_family(path, base_url) not in self.exclude
+        )
+
+    async def acquire(self):
+        if self.inflight < int(self.limit) and not self.waiters:
+            self.inflight += 1
+            return
+        waiter = asyncio.get_event_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # granted a slot just before being cancelled
+                self.inflight -= 1
+                self.wake()
+            else:
+                # unless wake() already dropped it
+                self.waiters.remove(waiter)
+            raise
+
+    def wake(self):
+        while self.waiters and self.inflight < int(self.limit):
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.inflight += 1
+                waiter.set_result(None)
+
+    def release(self, latency: Optional[float], overloaded: bool = False):
+        """Free a slot; ``latency`` is ``None`` if it tells nothing."""
+        self.inflight -= 1
+        if latency is not None:
+            self.sample(latency, overloaded)
+        self.wake()
+
+    def sample(self, latency: float, overloaded: bool):
+        self.window_min = min(self.window_min, latency)
+        self.samples += 1
+        if self.baseline is None or self.samples >= self.window:
+            # follow the server getting faster or durably slower
+            self.baseline = self.window_min
+            self.window_min = float("inf")
+            self.samples = 0
+        if overloaded or latency > self.tolerance * self.baseline:
+            now = time.monotonic()
+            if now - self.decreased >= self.baseline:
+                self.decreased = now
+                self.set_limit(self.limit * self.backoff)
+        elif self.inflight + 1 >= self.limit / 2:
+            # only grow a limit that is being used
+            self.set_limit(self.limit + 1 / self.limit)
+
+    def set_limit(self, limit: float):
+        self.limit = min(max(limit, self.min_limit), self.max_limit)
+        if self.gauge is not None:
+            self.gauge.set(value=self.limit)
+
+    async def run(self, request: Awaitable[MatrixResponse]) -> MatrixResponse:
+        """Send ``request`` once a slot is free."""
+        try:
+            await self.acquire()
+        except BaseException:
+            if asyncio.iscoroutine(request):
+                request.close()
+            raise
+        start = time.monotonic()
+        latency: Optional[float] = None
+        overloaded = False
+        try:
+            response = await request
+            latency = time.monotonic() - start
+            overloaded = (
+                response.status_code == 429 or response.status_code >= 500
+            )
+            return response
+        except (httpx.TimeoutException, httpx.NetworkError):
+            latency = time.monotonic() - start
+            overloaded = True
+            raise
+        finally:
+            self.release(latency, overloaded)
@@ -0,0 +1,249 @@
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from .core import MatrixClient
+from .models import MatrixResponse
+
+DEFAULT_MIX = {
+    "room_send": 5,
+    "sync": 2,
+    "profile_get": 3,
+    "upload": 1,
+    "download": 1,
+}
+
+
+def parse_mix(entries: Sequence[str]) -> Dict[str, int]:
+    """Parse ``name=weight`` entries into an operation mix; a weight of 0
+    leaves the operation out.
+    """
+    mix = {}
+    for entry in entries:
+        name, _, weight = entry.partition("=")
+        if name not in OPERATIONS:
+            raise ValueError(
+                f"Unknown operation {name!r}, "
+                f"expected one of {', '.join(sorted(OPERATIONS))}"
+            )
+        mix[name] = int(weight or 1)
+        if mix[name] < 0:
+            raise ValueError(f"Negative weight for {name!r}")
+    if entries and not any(mix.values()):
+        raise ValueError("Every operation has a weight of 0")
+    return mix
+
+
+def percentile(ordered: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not ordered:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class Account:
+    __slots__ = ("client", "user", "room_id", "next_batch", "media")
+
+    def __init__(self, client: MatrixClient, user: str):
+        self.client = client
+        self.user = user
+        self.room_id: Optional[str] = None
+        self.next_batch: Optional[str] = None
+        self.media: Optional[Tuple[str, str]] = None
+
+
+async def op_room_send(account: Account) -> MatrixResponse:
+    return await account.client.room_send(
+        account.room_id,
+        "m.room.message",
+        {"msgtype": "m.text", "body": "aiobaro load test"},
+        uuid.uuid4(),
+    )
+
+
+async def op_sync(account: Account) -> MatrixResponse:
+    response = await account.client.sync(since=account.next_batch, timeout=0)
+    if response.ok:
+        account.next_batch = response.json().get("next_batch")
+    return response
+
+
+async def op_profile_get(account: Account) -> MatrixResponse:
+    return await account.client.profile_get(account.user)
+
+
+async def op_upload(account: Account) -> MatrixResponse:
+    response = await account.client.upload(
+        "loadtest.txt", content=b"x" * 1024, content_type="text/plain"
+    )
+    if response.ok:
+        server_name, _, media_id = response.json()["content_uri"][
+            len("mxc://") :
+        ].partition("/")
+        account.media = (server_name, media_id)
+    return response
+
+
+async def op_download(account: Account) -> MatrixResponse:
+    if account.media is None:
+        return await op_upload(account)
+    return await account.client.download(*account.media)
+
+
+OPERATIONS: Dict[str, Callable] = {
+    "room_send": op_room_send,
+    "sync": op_sync,
+    "profile_get": op_profile_get,
+    "upload": op_upload,
+    "download": op_download,
+}
+
+
+def local_homeserver(
+    latency: float = 0.005, server_name: str = "loadtest.local"
+) -> httpx.MockTransport:
+    """In-process stand-in for a homeserver.
+
+    Answers every endpoint used by the load test after ``latency`` seconds,
+    which is enough to measure the client side without a real Synapse.
+    """
+
+    counter = iter(range(1, 1 << 62))
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        path = request.url.path
+        n = next(counter)
+        if path.endswith(("/login", "/register")):
+            user = json.loads(request.read() or b"{}")
+            user = user.get("username") or user.get("identifier", {}).get(
+                "user", "user"
+            )
+            body = {
+                "access_token": f"token_{user}",
+                "user_id": f"@{user}:{server_name}",
+                "device_id": "LOADTEST",
+            }
+        elif path.endswith("/createRoom"):
+            body = {"room_id": f"!room{n}:{server_name}"}
+        elif "/send/" in path:
+            body = {"event_id": f"$event{n}"}
+        elif path.endswith("/sync"):
+            body = {"next_batch": f"s{n}", "rooms": {"join": {}}}
+        elif "/profile/" in path:
+            body = {"displayname": "load test", "avatar_url": None}
+        elif path.endswith("/upload"):
+            body = {"content_uri": f"mxc://{server_name}/media{n}"}
+        elif "/download/" in path:
+            return httpx.Response(200, content=b"x" * 1024)
+        else:
+            body = {}
+        return httpx.Response(200, json=body)
+
+    return httpx.MockTransport(handler)
+
+
+async def setup_accounts(
+    homeserver: str,
+    count: int,
+    password: str,
+    prefix: str = "loadtest_",
+    transport: httpx.MockTransport = None,
+) -> List[Account]:
+    """Register (or log into) ``count`` accounts, each with its own room."""
+
+    async def setup(i: int) -> Account:
+        user = f"{prefix}{i}"
+        client = MatrixClient(homeserver, transport=transport)
+        response = await client.register(user, password=password)
+        if not response.ok:
+            response = await client.login(user, password=password)
+        if not response.ok:
+            raise RuntimeError(f"Unable to log in {user}: {response}")
+        account = Account(client, response.json()["user_id"])
+        room = await client.room_create(name=f"{user} load test")
+        account.room_id = room.json()["room_id"]
+        return account
+
+    return list(await asyncio.gather(*(setup(i) for i in range(count))))
+
+
+async def run_level(
+    accounts: List[Account],
+    mix: Dict[str, int],
+    concurrency: int,
+    duration: float,
+    seed: int = 0,
+) -> Dict[str, Dict[str, float]]:
+    """Hammer ``accounts`` with ``concurrency`` workers for ``duration``s.
+
+    Any exception of an operation counts as an error of the operation,
+    the worker goes on.
+    """
+    names = [name for name, weight in mix.items() if weight > 0]
+    if not names:
+        raise ValueError("the mix has no operation with a positive weight")
+    weights = [mix[name] for name in names]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int):
+        rng = random.Random(seed * 1_000_003 + worker_id)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            account = rng.choice(accounts)
+            start = time.perf_counter()
+            try:
+                response = await OPERATIONS[name](account)
+                ok = response.ok
+            except Exception:
+                # unexpected bodies too, such as an upload without
+                # content_uri
+                ok = False
+            latencies[name].append(time.perf_counter() - start)
+            if not ok:
+                errors[name] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    stats = {}
+    for name in names:
+        ordered = sorted(latencies[name])
+        stats[name] = {
+            "requests": len(ordered),
+            "errors": errors[name],
+            "throughput": len(ordered) / elapsed,
+            "p50": percentile(ordered, 50),
+            "p95": percentile(ordered, 95),
+            "p99": percentile(ordered, 99),
+        }
+    return stats
+
+
+def format_level(concurrency: int, stats: Dict[str, Dict[str, float]]) -> str:
+    lines = [
+        f"concurrency={concurrency}",
+        f"  {'endpoint':<14}{'requests':>9}{'errors':>8}{'req/s':>10}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}",
+    ]
+    total = 0.0
+    for name, row in stats.items():
+        total += row["throughput"]
+        lines.append(
+            f"  {name:<14}{row['requests']:>9}{row['errors']:>8}"
+            f"{row['throughput']:>10.1f}{row['p50'] * 1e3:>9.1f}"
+            f"{row['p95'] * 1e3:>9.1f}{row['p99'] * 1e3:>9.1f}"
+        )
+    lines.append(f"  {'total':<14}{'':>9}{'':>8}{total:>10.1f}")
+    return "\n".join(lines)
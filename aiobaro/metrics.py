@@ -0,0 +1,289 @@
+import bisect
+import math
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .hooks import RequestHooks, RequestTrace
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+def _escape(value: str) -> str:
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\n", "\\n")
+        .replace('"', '\\"')
+    )
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+    return f"{{{pairs}}}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values: Dict[Tuple[str, ...], Any] = {}
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        for values, value in self.values.items():
+            yield self.name, _format_labels(self.labels, values), value
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, *labels: str, value: float):
+        self.values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str],
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels: str, value: float):
+        state = self.values.get(labels)
+        if state is None:
+            # bucket counts, +Inf included, then sum
+            state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        names = self.labels + ("le",)
+        for values, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    _format_labels(names, values + (_format_value(bound),)),
+                    cumulative,
+                )
+            labels = _format_labels(self.labels, values)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class MetricsRegistry:
+    """In-process metrics, rendered in the Prometheus text format.
+
+    Metrics are plain dicts updated from the event loop, without locking.
+
+    >>> registry = MetricsRegistry()
+    >>> sent = registry.counter("sent_total", "Messages sent.", ["room"])
+    >>> sent.inc("!room:baro")
+    >>> print(registry.render(), end="")
+    # HELP sent_total Messages sent.
+    # TYPE sent_total counter
+    sent_total{room="!room:baro"} 1
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        existing = self.metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric):
+                raise ValueError(f"Metric {metric.name} already registered")
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labels: Sequence[str] = ()
+    ) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(
+        self, name: str, documentation: str, labels: Sequence[str] = ()
+    ) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    __call__ = render
+
+
+def status_class(trace: RequestTrace) -> str:
+    if trace.status_code is None:
+        return "error"
+    return f"{trace.status_code // 100}xx"
+
+
+def sync_lag(body: Dict[str, Any], now: Optional[float] = None) -> float:
+    """Seconds between ``now`` and the newest timeline event of a sync.
+
+    Returns 0.0 when the sync body has no timeline events.
+    """
+    newest = 0
+    for room in body.get("rooms", {}).get("join", {}).values():
+        for event in room.get("timeline", {}).get("events", ()):
+            newest = max(newest, event.get("origin_server_ts", 0))
+    if not newest:
+        return 0.0
+    return max((now or time.time()) - newest / 1000, 0.0)
+
+
+class ClientMetrics:
+    """Request metrics for ``MatrixClient``, fed from ``RequestHooks``."""
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.requests = registry.counter(
+            "aiobaro_requests_total",
+            "Requests sent, by endpoint template and status class.",
+            ["endpoint", "method", "status"],
+        )
+        self.duration = registry.histogram(
+            "aiobaro_request_duration_seconds",
+            "Time from building a request until its body is read.",
+            ["endpoint", "status"],
+        )
+        self.decode = registry.histogram(
+            "aiobaro_response_decode_seconds",
+            "Time spent decoding JSON response bodies.",
+            ["endpoint"],
+        )
+        self.request_bytes = registry.counter(
+            "aiobaro_request_bytes_total",
+            "Request body bytes sent.",
+            ["endpoint"],
+        )
+        self.response_bytes = registry.counter(
+            "aiobaro_response_bytes_total",
+            "Response body bytes received.",
+            ["endpoint"],
+        )
+        self.in_flight = registry.gauge(
+            "aiobaro_requests_in_flight",
+            "Requests currently waiting on the connection pool or server.",
+            ["endpoint"],
+        )
+        self.rate_limit_wait = registry.histogram(
+            "aiobaro_rate_limit_wait_seconds",
+            "Time spent waiting because of rate limiting, by source: the "
+            "client side limiter or the server asking to retry later.",
+            ["source"],
+        )
+        self.sync_lag = registry.gauge(
+            "aiobaro_sync_lag_seconds",
+            "Age of the newest timeline event of the latest sync response.",
+        )
+
+    def attach(self, hooks: RequestHooks) -> RequestHooks:
+        """Register the metrics callbacks on ``hooks``, once."""
+        for callbacks, callback in (
+            (hooks.on_request_start, self.request_start),
+            (hooks.on_request_end, self.request_end),
+            (hooks.on_response_decoded, self.response_decoded),
+        ):
+            if callback not in callbacks:
+                callbacks.append(callback)
+        return hooks
+
+    def request_start(self, trace: RequestTrace):
+        self.in_flight.inc(trace.endpoint)
+
+    def request_end(self, trace: RequestTrace):
+        status = status_class(trace)
+        self.in_flight.dec(trace.endpoint)
+        self.requests.inc(trace.endpoint, trace.method, status)
+        self.duration.observe(trace.endpoint, status, value=trace.duration)
+        self.request_bytes.inc(trace.endpoint, amount=trace.request_bytes)
+        self.response_bytes.inc(trace.endpoint, amount=trace.response_bytes)
+
+    def response_decoded(self, trace: RequestTrace):
+        self.decode.observe(trace.endpoint, value=trace.phases["decode"])
+
+    def observe_rate_limit_wait(self, source: str, seconds: float):
+        self.rate_limit_wait.observe(source, value=seconds)
+
+    def observe_sync(self, body: Dict[str, Any]):
+        self.sync_lag.set(value=sync_lag(body))
+
+
+REGISTRY = MetricsRegistry()
+CLIENT_METRICS = ClientMetrics(REGISTRY)
+
+
+def exposition() -> str:
+    """Prometheus text exposition of the default registry."""
+    return REGISTRY.render()
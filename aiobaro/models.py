@@ -1,6 +1,7 @@
 import json
+import time
 from enum import Enum, unique
-from typing import Any, Dict, Union
+from typing import TYPE_CHECKING, Any, Dict, Optional, Union
 
 import httpx
 from httpx._models import (
@@ -13,8 +14,16 @@ from httpx._models import (
     RequestFiles,
 )
 
+from .decoding import DecodePolicy
+from .events import Event
+
+if TYPE_CHECKING:
+    from .hooks import RequestHooks, RequestTrace
+
 FilterT = Union[None, str, Dict[Any, Any]]
 
+_UNDECODED = object()
+
 
 @unique
 class HttpVerbs(str, Enum):
@@ -111,9 +120,57 @@ class Presence(str, Enum):
     unavailable = "unavailable"
 
 
+@unique
+class OverflowPolicy(str, Enum):
+    """What an ``EventQueue`` does with events once it is full.
+    "block" makes the producer, usually the sync loop, wait for room.
+    "drop_ephemeral" drops typing, receipt and presence events, and blocks
+    for the other ones.
+    "spill" appends events to a log on disk, replayed in order later.
+    """
+
+    block = "block"
+    drop_ephemeral = "drop_ephemeral"
+    spill = "spill"
+
+
+@unique
+class Priority(str, Enum):
+    """Priority class of a request waiting for a slot of a limiter.
+    "interactive" requests, such as replies to a user, go first.
+    "normal" is the default.
+    "bulk" requests, such as exports, go last but keep a minimum share.
+    """
+
+    interactive = "interactive"
+    normal = "normal"
+    bulk = "bulk"
+
+
+@unique
+class CircuitState(str, Enum):
+    """State of a ``CircuitBreaker`` circuit.
+    "closed" lets requests through.
+    "open" fails them right away.
+    "half_open" lets a single probe through to test the upstream.
+    """
+
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
 class MatrixResponse:
-    def __init__(self, response: httpx.Response):
+    def __init__(
+        self,
+        response: httpx.Response,
+        trace: "RequestTrace" = None,
+        hooks: "RequestHooks" = None,
+    ):
         self.response = response
+        self.trace = trace
+        self.hooks = hooks
+        self._json = _UNDECODED
 
     def __repr__(self):
         return self.response.__repr__()
@@ -131,7 +188,39 @@ class MatrixResponse:
         return self.response.status_code
 
     def json(self):
-        return self.response.json()
+        """Decode the JSON body, once."""
+        if self._json is _UNDECODED:
+            if self.trace is None:
+                self._json = self.response.json()
+            else:
+                start = time.perf_counter()
+                self._json = self.response.json()
+                self.trace.phases["decode"] = time.perf_counter() - start
+                self.hooks.response_decoded(self.trace)
+        return self._json
+
+    async def ajson(self, policy: Optional[DecodePolicy] = None):
+        """Decode the JSON body, once, large ones off the event loop.
+
+        Bodies up to ``policy.threshold`` bytes are decoded inline like
+        ``json()``; without a policy this is ``json()``.
+        """
+        if self._json is not _UNDECODED:
+            return self._json
+        content = self.response.content
+        if policy is None or not policy.offloaded(content):
+            return self.json()
+        start = time.perf_counter()
+        self._json = await policy.decode(content)
+        if self.trace is not None:
+            self.trace.phases["decode"] = time.perf_counter() - start
+            self.trace.context["offloaded"] = True
+            self.hooks.response_decoded(self.trace)
+        return self._json
+
+    def event(self) -> Event:
+        """The body as an ``Event``, for ``room_get_event`` responses."""
+        return Event.from_dict(self.json())
 
     def as_json(self):
-        return json.dumps(self.response.json(), indent=4)
+        return json.dumps(self.json(), indent=4)
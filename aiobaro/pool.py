@@ -0,0 +1,282 @@
+import asyncio
+import time
+from typing import Any, Dict, Iterator, Optional
+
+import httpcore
+import httpx
+
+from .core import MatrixClient
+from .exceptions import LoginRequiredException
+from .hooks import RequestHooks
+from .metrics import CLIENT_METRICS, ClientMetrics
+from .models import MatrixResponse
+from .routing import RoutingTable
+from .timeouts import sleep
+
+
+class TokenBucket:
+    """Asyncio token bucket: ``rate`` calls per second, bursts of ``burst``.
+
+    ``pause()`` empties the bucket for a while, which is how a server side
+    ``M_LIMIT_EXCEEDED`` is honoured by every caller of the same account.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated", "paused_until")
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def delay(self) -> float:
+        """Take a token and return how long to wait before using it."""
+        now = time.monotonic()
+        self.tokens = min(
+            self.burst, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+        self.tokens -= 1
+        wait = max(self.paused_until - now, 0.0)
+        if self.tokens < 0:
+            wait = max(wait, -self.tokens / self.rate)
+        return wait
+
+    async def acquire(self) -> float:
+        wait = self.delay()
+        if wait > 0:
+            await sleep(wait)
+        return wait
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class Session:
+    """An account of a ``SessionPool``."""
+
+    __slots__ = ("user", "password", "device_id", "client", "bucket", "lock")
+
+    def __init__(
+        self,
+        user: str,
+        password: Optional[str],
+        device_id: Optional[str],
+        client: MatrixClient,
+        bucket: Optional[TokenBucket],
+    ):
+        self.user = user
+        self.password = password
+        self.device_id = device_id
+        self.client = client
+        self.bucket = bucket
+        # created on first login, inside the running event loop
+        self.lock: Optional[asyncio.Lock] = None
+
+
+def retry_after(response: MatrixResponse) -> float:
+    """Seconds the server asks to wait before retrying a 429 response."""
+    try:
+        return response.json()["retry_after_ms"] / 1000
+    except (ValueError, KeyError, TypeError):
+        pass
+    try:
+        return float(response.response.headers.get("Retry-After", 1))
+    except ValueError:
+        return 1.0
+
+
+class SessionPool:
+    """Many logged-in accounts on a single shared connection pool.
+
+    Each account is a regular ``MatrixClient`` sharing one
+    ``httpx.AsyncClient``, one ``RequestHooks`` and one ``ClientMetrics``,
+    so sockets and memory do not grow with the number of accounts.
+    Accounts log in lazily on first use, log in again when their token is
+    rejected, and are optionally rate limited client side. With a
+    ``router``, the endpoint families it routes use its pools instead. An
+    ``http_client`` passed in is shared as is and left open on close.
+
+        async with SessionPool("http://localhost:8008", rate=2) as pool:
+            pool.add("bot_1", password="ChangeMe")
+            await pool.call("bot_1", "room_send", room_id, ...)
+    """
+
+    def __init__(
+        self,
+        homeserver: str,
+        *,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        rate: Optional[float] = None,
+        burst: int = 1,
+        max_retries: int = 3,
+        transport: httpcore.AsyncHTTPTransport = None,
+        hooks: RequestHooks = None,
+        metrics: ClientMetrics = CLIENT_METRICS,
+        http_client: httpx.AsyncClient = None,
+        router: RoutingTable = None,
+    ):
+        self.homeserver = homeserver
+        self.router = router
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.metrics = metrics
+        self.hooks = hooks or RequestHooks()
+        if metrics is not None:
+            metrics.attach(self.hooks)
+        # a client passed in belongs to the caller, who closes it
+        self.owns_client = http_client is None
+        self.http_client = http_client or httpx.AsyncClient(
+            transport=transport,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+        )
+        self.max_connections = max_connections if self.owns_client else 0
+        self.closed = False
+        self.sessions: Dict[str, Session] = {}
+        self.sessions_gauge = self.connections_gauge = None
+        if metrics is not None:
+            self.sessions_gauge = metrics.registry.gauge(
+                "aiobaro_pool_sessions", "Accounts managed by session pools."
+            )
+            self.connections_gauge = metrics.registry.gauge(
+                "aiobaro_pool_max_connections",
+                "Connection limit of session pools.",
+            )
+            self.connections_gauge.inc(amount=self.max_connections)
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __contains__(self, user: str):
+        return user in self.sessions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.sessions)
+
+    async def __aenter__(self) -> "SessionPool":
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def aclose(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.connections_gauge is not None:
+            self.connections_gauge.dec(amount=self.max_connections)
+        if self.owns_client:
+            await self.http_client.aclose()
+
+    def add(
+        self,
+        user: str,
+        password: Optional[str] = None,
+        access_token: Optional[str] = None,
+        device_id: Optional[str] = None,
+    ) -> Session:
+        """Register an account; it logs in on first use if needed."""
+        if password is None and access_token is None:
+            raise ValueError(f"{user}: a password or access_token is needed")
+        client = MatrixClient(
+            self.homeserver,
+            access_token=access_token,
+            hooks=self.hooks,
+            metrics=None,
+            http_client=self.http_client,
+            router=self.router,
+        )
+        session = Session(
+            user,
+            password,
+            device_id,
+            client,
+            TokenBucket(self.rate, self.burst) if self.rate else None,
+        )
+        if self.sessions_gauge is not None and user not in self.sessions:
+            self.sessions_gauge.inc()
+        self.sessions[user] = session
+        return session
+
+    def remove(self, user: str):
+        if self.sessions.pop(user, None) and self.sessions_gauge is not None:
+            self.sessions_gauge.dec()
+
+    async def login(self, user: str, force: bool = False) -> MatrixClient:
+        """Log ``user`` in unless it already has a valid access token."""
+        session = self.sessions[user]
+        token = session.client.access_token
+        if token and not force:
+            return session.client
+        if session.lock is None:
+            session.lock = asyncio.Lock()
+        async with session.lock:
+            # another task may have logged in while we waited for the lock
+            if session.client.access_token and (
+                not force or session.client.access_token != token
+            ):
+                return session.client
+            if session.password is None:
+                raise LoginRequiredException(
+                    status_code=401,
+                    message=f"{user}: access token rejected, no password",
+                )
+            response = await session.client.login(
+                user,
+                password=session.password,
+                device_id=session.device_id or "",
+            )
+            if not response.ok:
+                raise LoginRequiredException(
+                    status_code=response.status_code,
+                    message=f"{user}: login failed",
+                )
+            session.device_id = response.json().get("device_id")
+        return session.client
+
+    async def client(self, user: str) -> MatrixClient:
+        """The logged-in ``MatrixClient`` of ``user``."""
+        return await self.login(user)
+
+    async def call(
+        self, user: str, method: str, *args: Any, **kwargs: Any
+    ) -> MatrixResponse:
+        """Call ``MatrixClient.<method>`` as ``user``.
+
+        The call waits for the account rate limiter, logs in again once if
+        the access token is rejected, and honours up to ``max_retries``
+        ``M_LIMIT_EXCEEDED`` responses before returning the last one. Under
+        a ``timeouts.deadline()``, waits that would outlast it raise
+        ``DeadlineExceeded`` instead.
+        """
+        session = self.sessions[user]
+        client = await self.login(user)
+        relogged = False
+        retries = 0
+        while True:
+            if session.bucket is not None:
+                waited = await session.bucket.acquire()
+                if waited and self.metrics is not None:
+                    self.metrics.observe_rate_limit_wait("client", waited)
+            response = await getattr(client, method)(*args, **kwargs)
+            if response.status_code == 401 and not relogged:
+                relogged = True
+                client = await self.login(user, force=True)
+                continue
+            if response.status_code == 429 and retries < self.max_retries:
+                retries += 1
+                wait = retry_after(response)
+                if session.bucket is not None:
+                    # hold back the other callers of this account as well
+                    session.bucket.pause(wait)
+                await sleep(wait)
+                if self.metrics is not None:
+                    self.metrics.observe_rate_limit_wait("server", wait)
+                continue
+            return response
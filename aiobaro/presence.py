@@ -0,0 +1,130 @@
+import asyncio
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .cache import TTLCache
+from .core import MatrixClient
+from .models import MatrixResponse, Presence
+
+PresenceContent = Dict[str, Any]
+
+
+class PresenceManager:
+    """Throttled ``set_presence`` and cached ``get_presence`` for a user.
+
+    ``set()`` only calls the server when the presence or status message
+    changed, or when the last update is ``refresh`` seconds old, to renew
+    it before the server lets it lapse (Synapse turns an idle user
+    "unavailable" after five minutes).
+
+    ``get()`` and ``get_many()`` answer from a cache of up to ``maxsize``
+    users fed by the ``presence`` events of sync bodies passed to
+    ``update()``, and query the server only for users missing from it or
+    cached for more than ``ttl`` seconds; ``get_many()`` runs at most
+    ``concurrency`` such queries at once. ``last_active_ago`` is aged by
+    the time spent in the cache.
+
+        presence = PresenceManager(client, "@bot:baro")
+        async for body in SyncLoop(client.sync):
+            presence.update(body)
+            await presence.set(Presence.online)
+    """
+
+    def __init__(
+        self,
+        client: MatrixClient,
+        user_id: str,
+        refresh: float = 240.0,
+        ttl: float = 300.0,
+        maxsize: int = 100_000,
+        concurrency: int = 10,
+    ):
+        self.client = client
+        self.user_id = user_id
+        self.refresh = refresh
+        self.concurrency = concurrency
+        self.cache: TTLCache[Tuple[float, PresenceContent]] = TTLCache(
+            ttl, maxsize
+        )
+        self.last: Optional[Tuple[Presence, Optional[str]]] = None
+        self.last_sent = 0.0
+        self.suppressed = 0
+        self.queries = 0
+
+    async def set(
+        self,
+        presence: Presence = Presence.online,
+        status_msg: Optional[str] = None,
+    ) -> Optional[MatrixResponse]:
+        """Set our presence; ``None`` when the call was not needed."""
+        state = (Presence(presence), status_msg)
+        now = time.monotonic()
+        if state == self.last and now - self.last_sent < self.refresh:
+            self.suppressed += 1
+            return None
+        # recorded before the request, so that concurrent calls with the
+        # same value are suppressed while it is in flight
+        previous = self.last, self.last_sent
+        self.last, self.last_sent = state, now
+        response = None
+        try:
+            response = await self.client.set_presence(
+                self.user_id, state[0], status_msg
+            )
+        finally:
+            failed = response is None or not response.ok
+            if failed and (self.last, self.last_sent) == (state, now):
+                # nothing newer was sent meanwhile
+                self.last, self.last_sent = previous
+        return response
+
+    def update(self, body: Dict[str, Any]):
+        """Cache the ``presence`` events of a sync response body."""
+        for event in body.get("presence", {}).get("events", ()):
+            if event.get("type") == "m.presence" and "sender" in event:
+                self.store(event["sender"], event.get("content", {}))
+
+    def store(self, user_id: str, content: PresenceContent):
+        self.cache.set(user_id, (time.monotonic(), content))
+
+    def cached(self, user_id: str) -> Optional[PresenceContent]:
+        entry = self.cache.get(user_id)
+        if entry is None:
+            return None
+        received, content = entry
+        if "last_active_ago" in content:
+            elapsed = int((time.monotonic() - received) * 1000)
+            content = {
+                **content,
+                "last_active_ago": content["last_active_ago"] + elapsed,
+            }
+        return content
+
+    async def get(self, user_id: str) -> Optional[PresenceContent]:
+        """Presence of ``user_id``, ``None`` if the server will not say."""
+        content = self.cached(user_id)
+        if content is not None:
+            return content
+        self.queries += 1
+        response = await self.client.get_presence(user_id)
+        if not response.ok:
+            return None
+        self.store(user_id, response.json())
+        return self.cached(user_id)
+
+    async def get_many(
+        self, user_ids: Iterable[str]
+    ) -> Dict[str, Optional[PresenceContent]]:
+        """Presence of many users, querying the missing ones concurrently."""
+        found = {user_id: self.cached(user_id) for user_id in user_ids}
+        missing = [
+            user_id for user_id, content in found.items() if content is None
+        ]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(user_id: str):
+            async with semaphore:
+                found[user_id] = await self.get(user_id)
+
+        await asyncio.gather(*(fetch(user_id) for user_id in missing))
+        return found
@@ -0,0 +1,100 @@
+import asyncio
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, Iterator, Optional, Union
+
+from .models import Priority
+
+# priority class of the requests made by the current task
+PRIORITY: ContextVar[Priority] = ContextVar(
+    "aiobaro_priority", default=Priority.normal
+)
+
+
+@contextmanager
+def priority(level: Union[Priority, str]) -> Iterator[Priority]:
+    """Tag the requests made inside the block with a priority class.
+
+    with priority(Priority.bulk):
+        await export(client, room_id)
+
+    Only clients with an ``AdaptiveLimiter`` queue requests, and so serve
+    them by priority; without one, the class has no effect.
+    """
+    token = PRIORITY.set(Priority(level))
+    try:
+        yield PRIORITY.get()
+    finally:
+        PRIORITY.reset(token)
+
+
+class PriorityScheduler:
+    """Requests waiting for a slot of an ``AdaptiveLimiter``, served by
+    priority class: interactive ones first, then normal, then bulk.
+
+    Bulk requests still get at least ``bulk_share`` of the slots freed
+    while some are waiting, so that background jobs slow down under
+    interactive load but never stall.
+    """
+
+    order = (Priority.interactive, Priority.normal, Priority.bulk)
+
+    def __init__(self, bulk_share: float = 0.1):
+        if not 0 < bulk_share <= 1:
+            raise ValueError("bulk_share must be in (0, 1]")
+        self.bulk_share = bulk_share
+        self.queues: Dict[Priority, Deque["asyncio.Future[None]"]] = {
+            level: deque() for level in self.order
+        }
+        # share of the slots owed to bulk requests, served once a whole
+        # slot is owed
+        self.bulk_credit = 0.0
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def __bool__(self) -> bool:
+        self.drop_cancelled()
+        return any(self.queues.values())
+
+    def drop_cancelled(self):
+        """Drop the waiters cancelled at the head of the queues, which
+        ``acquire()`` has not taken out yet.
+        """
+        for queue in self.queues.values():
+            while queue and queue[0].done():
+                queue.popleft()
+
+    def append(
+        self,
+        waiter: "asyncio.Future[None]",
+        level: Optional[Priority] = None,
+    ):
+        self.queues[level or PRIORITY.get()].append(waiter)
+
+    def remove(self, waiter: "asyncio.Future[None]"):
+        """Take ``waiter`` out, if it is still waiting."""
+        for queue in self.queues.values():
+            if waiter in queue:
+                queue.remove(waiter)
+                return
+
+    def popleft(self) -> "asyncio.Future[None]":
+        # cancelled waiters get no slot, and cost bulk none of its share
+        self.drop_cancelled()
+        bulk = self.queues[Priority.bulk]
+        if bulk:
+            self.bulk_credit += self.bulk_share
+            # with some slack for the rounding errors of the sum
+            if self.bulk_credit > 1 - 1e-9:
+                self.bulk_credit -= 1
+                return bulk.popleft()
+        for level in self.order:
+            queue = self.queues[level]
+            if queue:
+                if level is Priority.bulk:
+                    # nothing else is waiting, no share to make up for
+                    self.bulk_credit = 0.0
+                return queue.popleft()
+        raise IndexError("no request waiting")
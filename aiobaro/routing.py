@@ -0,0 +1,166 @@
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import httpcore
+import httpx
+
+from .hooks import endpoint_template
+
+FAMILIES = ("sync", "media", "send", "state", "admin", "client")
+
+# endpoint templates of the "send" family, prefixes of the "state" one
+SEND_TEMPLATES = frozenset(
+    (
+        "rooms/{roomId}/send/{eventType}/{txnId}",
+        "rooms/{roomId}/redact/{eventId}/{txnId}",
+        "sendToDevice/{eventType}/{txnId}",
+    )
+)
+STATE_PREFIX = "rooms/{roomId}/state"
+
+RouteSpec = Union[str, Sequence[Union[str, Tuple[str, int]]]]
+
+
+def endpoint_family(path: str, base_url: str = "") -> str:
+    """Family of a request, from its path and the base URL of its API.
+
+    >>> endpoint_family("rooms/!abc:baro/send/m.room.message/1")
+    'send'
+    >>> endpoint_family("config", "https://baro/_matrix/media/r0/")
+    'media'
+    """
+    if "/_matrix/media/" in base_url:
+        return "media"
+    if "/_synapse/admin/" in base_url:
+        return "admin"
+    template = endpoint_template(path)
+    if template == "sync":
+        return "sync"
+    if template in SEND_TEMPLATES:
+        return "send"
+    if template.startswith(STATE_PREFIX):
+        return "state"
+    return "client"
+
+
+class Upstream:
+    """A base URL of a route, with its own connection pool."""
+
+    __slots__ = ("base_url", "weight", "current", "http_client")
+
+    def __init__(self, base_url: str, weight: int, http_client):
+        self.base_url = base_url.rstrip("/")
+        self.weight = weight
+        # smooth weighted round robin state
+        self.current = 0
+        self.http_client: httpx.AsyncClient = http_client
+
+
+def check_weight(base_url: str, weight: int):
+    if weight < 0:
+        raise ValueError(f"negative weight for {base_url}: {weight}")
+
+
+class Route:
+    """Upstreams of a family, picked by smooth weighted round robin: with
+    weights 3 and 1, every four requests go A, A, B, A. Upstreams with a
+    weight of 0 are drained, they get no requests.
+    """
+
+    def __init__(self, upstreams: List[Upstream]):
+        for upstream in upstreams:
+            check_weight(upstream.base_url, upstream.weight)
+        upstreams = [upstream for upstream in upstreams if upstream.weight]
+        if not upstreams:
+            raise ValueError(
+                "a route needs at least one upstream with a positive weight"
+            )
+        self.upstreams = upstreams
+        self.total = sum(upstream.weight for upstream in upstreams)
+
+    def pick(self) -> Upstream:
+        if len(self.upstreams) == 1:
+            return self.upstreams[0]
+        best = self.upstreams[0]
+        for upstream in self.upstreams:
+            upstream.current += upstream.weight
+            if upstream.current > best.current:
+                best = upstream
+        best.current -= self.total
+        return best
+
+
+class RoutingTable:
+    """Send each family of endpoints to its own base URLs.
+
+    ``routes`` maps families (``"sync"``, ``"media"``, ``"send"``,
+    ``"state"``, ``"admin"`` or ``"client"`` for the rest) to a base URL
+    or a list of base URLs, optionally with weights. Each base URL gets
+    its own connection pool, limited by ``limits[family]`` or
+    ``default_limits``, so that long-polling syncs do not hold the
+    connections sends need. Families without a route use the client's
+    homeserver and connections.
+
+        router = RoutingTable({
+            "sync": "https://sync.baro",
+            "send": [("https://events1.baro", 3), "https://events2.baro"],
+            "media": "https://media.baro",
+        })
+        client = MatrixClient("https://baro", token, router=router)
+    """
+
+    def __init__(
+        self,
+        routes: Mapping[str, RouteSpec],
+        limits: Optional[Mapping[str, httpx.Limits]] = None,
+        default_limits: httpx.Limits = httpx.Limits(
+            max_connections=100, max_keepalive_connections=20
+        ),
+        transport: httpcore.AsyncHTTPTransport = None,
+    ):
+        limits = limits or {}
+        # check every route before opening any connection pool
+        targets: Dict[str, List[Tuple[str, int]]] = {}
+        for family, spec in routes.items():
+            if family not in FAMILIES:
+                raise ValueError(f"unknown endpoint family: {family}")
+            if isinstance(spec, str):
+                spec = [spec]
+            targets[family] = [
+                (target, 1) if isinstance(target, str) else target
+                for target in spec
+            ]
+            for base_url, weight in targets[family]:
+                check_weight(base_url, weight)
+            if not any(weight for _, weight in targets[family]):
+                raise ValueError(
+                    f"the {family} route needs at least one upstream with "
+                    "a positive weight"
+                )
+        self.routes: Dict[str, Route] = {}
+        for family, family_targets in targets.items():
+            upstreams = []
+            for base_url, weight in family_targets:
+                if not weight:
+                    continue
+                http_client = httpx.AsyncClient(
+                    transport=transport,
+                    limits=limits.get(family, default_limits),
+                )
+                upstreams.append(Upstream(base_url, weight, http_client))
+            self.routes[family] = Route(upstreams)
+
+    async def __aenter__(self) -> "RoutingTable":
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def aclose(self):
+        for route in self.routes.values():
+            for upstream in route.upstreams:
+                await upstream.http_client.aclose()
+
+    def pick(self, path: str, base_url: str = "") -> Optional[Upstream]:
+        """Upstream for a request, ``None`` if its family has no route."""
+        route = self.routes.get(endpoint_family(path, base_url))
+        return None if route is None else route.pick()
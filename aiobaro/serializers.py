@@ -0,0 +1,48 @@
+import json
+from typing import Any, Protocol
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+JSON_CONTENT_TYPE = "application/json"
+
+
+class Serializer(Protocol):
+    content_type: str
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode a request body."""
+
+
+class JSONSerializer:
+    """Request bodies as compact JSON, with the standard library."""
+
+    content_type = JSON_CONTENT_TYPE
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(
+            obj, separators=(",", ":"), ensure_ascii=False
+        ).encode()
+
+
+class OrjsonSerializer:
+    """Request bodies as compact JSON, with ``orjson`` if installed."""
+
+    content_type = JSON_CONTENT_TYPE
+
+    def __init__(self):
+        if orjson is None:
+            raise RuntimeError("OrjsonSerializer needs orjson installed")
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+
+def default_serializer() -> Serializer:
+    """``OrjsonSerializer`` if orjson is installed, else ``JSONSerializer``."""
+    return JSONSerializer() if orjson is None else OrjsonSerializer()
+
+
+SERIALIZER = JSONSerializer()
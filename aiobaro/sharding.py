@@ -0,0 +1,272 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import pickle
+import zlib
+from collections import deque
+from multiprocessing.connection import Connection
+from typing import (
+    Any,
+    AsyncIterator,
+    Deque,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import httpcore
+
+from .exceptions import LoginRequiredException
+from .models import FilterT
+from .pool import SessionPool
+from .sync import SyncLoop, iter_events
+
+Credentials = Dict[str, Optional[str]]
+
+
+class ShardEvent(NamedTuple):
+    """A sync event forwarded by a shard, with the account it belongs to."""
+
+    user: str
+    room_id: Optional[str]
+    section: str
+    event: Dict[str, Any]
+
+
+def shard_of(user: str, shards: int) -> int:
+    """Stable shard index of ``user``, the same across processes."""
+    return zlib.crc32(user.encode()) % shards
+
+
+def partition(
+    accounts: Dict[str, Credentials], shards: int
+) -> List[Dict[str, Credentials]]:
+    parts: List[Dict[str, Credentials]] = [{} for _ in range(shards)]
+    for user, credentials in accounts.items():
+        parts[shard_of(user, shards)][user] = credentials
+    return parts
+
+
+async def run_shard(
+    homeserver: str,
+    accounts: Dict[str, Credentials],
+    conn: Connection,
+    options: Dict[str, Any],
+    transport: httpcore.AsyncHTTPTransport = None,
+):
+    """Sync every account of a shard and forward their events to ``conn``.
+
+    Each sync response is sent as one pickled message, so the parent pays
+    for a single read and unpickle per response instead of per event.
+    Sends block while the parent lags behind, which stalls the sync loops
+    of this shard rather than buffering without bound.
+    """
+
+    def send(message: Tuple):
+        conn.send_bytes(pickle.dumps(message, pickle.HIGHEST_PROTOCOL))
+
+    async def sync_account(pool: SessionPool, user: str):
+        loop = SyncLoop(
+            functools.partial(pool.call, user, "sync"),
+            since=accounts[user].get("since"),
+            timeout=options["timeout"],
+            data_filter=options["data_filter"],
+            metrics=None,
+            # the shard process is already off the supervisor event loop
+            decode_policy=None,
+        )
+        try:
+            async for body in loop:
+                events = [tuple(event) for event in iter_events(body)]
+                if events:
+                    send(("events", user, loop.next_batch, events))
+        except LoginRequiredException as error:
+            send(("error", user, error.message))
+        except Exception as error:
+            # such as an undecodable body; the other accounts go on
+            send(("error", user, repr(error)))
+
+    async with SessionPool(
+        homeserver, transport=transport, metrics=None
+    ) as pool:
+        for user, credentials in accounts.items():
+            pool.add(
+                user,
+                password=credentials.get("password"),
+                access_token=credentials.get("access_token"),
+                device_id=credentials.get("device_id"),
+            )
+        await asyncio.gather(*(sync_account(pool, user) for user in pool))
+
+
+def read_message(conn: Connection) -> Tuple:
+    return pickle.loads(conn.recv_bytes())
+
+
+def shard_main(
+    homeserver: str,
+    accounts: Dict[str, Credentials],
+    conn: Connection,
+    options: Dict[str, Any],
+):
+    try:
+        asyncio.run(run_shard(homeserver, accounts, conn, options))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+
+
+class SyncSupervisor:
+    """Run sync loops for many accounts across a pool of processes.
+
+    Accounts are partitioned by a stable hash of their user id; every
+    shard process runs a ``SessionPool`` and one ``SyncLoop`` per account,
+    so JSON decoding of sync responses scales with the number of cores.
+    Decoded events are forwarded to the parent over one pipe per shard,
+    in batches of one sync response.
+
+        supervisor = SyncSupervisor(
+            "http://localhost:8008",
+            {"bot_1": {"password": "ChangeMe"}, ...},
+        )
+        supervisor.start()
+        async for user, room_id, section, event in supervisor.events():
+            ...
+        await supervisor.stop()
+
+    ``accounts`` maps user ids to ``password``, ``access_token``,
+    ``device_id`` and ``since`` credentials. Accounts that cannot log in,
+    or whose sync loop fails, are reported in ``errors`` without stopping
+    the other ones. The
+    ``next_batch`` token of every account is kept in ``positions`` so that
+    a restart can resume from it.
+    """
+
+    def __init__(
+        self,
+        homeserver: str,
+        accounts: Dict[str, Credentials],
+        processes: Optional[int] = None,
+        timeout: int = 30000,
+        data_filter: FilterT = None,
+        max_pending: int = 1000,
+        context: str = "spawn",
+    ):
+        self.homeserver = homeserver
+        self.accounts = accounts
+        self.processes = max(
+            min(processes or os.cpu_count(), len(accounts)), 1
+        )
+        self.options = {"timeout": timeout, "data_filter": data_filter}
+        self.context = multiprocessing.get_context(context)
+        self.workers: List[Tuple[multiprocessing.Process, Connection]] = []
+        # unbounded: the shards are paused once max_pending messages are
+        # queued, a read in progress still lands
+        self.pending: "asyncio.Queue[Any]" = None
+        self.max_pending = max_pending
+        # read the shards again once the queue is half empty
+        self.resume_at = max(max_pending // 2, 1)
+        # pipes with a reader on the event loop, and the ones paused
+        self.watched: Set[Connection] = set()
+        self.paused: List[Connection] = []
+        self.positions: Dict[str, Optional[str]] = {
+            user: credentials.get("since")
+            for user, credentials in accounts.items()
+        }
+        self.errors: Deque[Tuple[str, str]] = deque(maxlen=1000)
+
+    def start(self):
+        """Spawn the shard processes; call from the running event loop."""
+        self.pending = asyncio.Queue()
+        for shard in partition(self.accounts, self.processes):
+            if not shard:
+                continue
+            receiver, sender = self.context.Pipe(duplex=False)
+            process = self.context.Process(
+                target=shard_main,
+                args=(self.homeserver, shard, sender, self.options),
+                daemon=True,
+            )
+            process.start()
+            sender.close()
+            self.workers.append((process, receiver))
+            self.watch(receiver)
+
+    def watch(self, conn: Connection):
+        asyncio.get_event_loop().add_reader(conn.fileno(), self.receive, conn)
+        self.watched.add(conn)
+
+    def unwatch(self, conn: Connection):
+        asyncio.get_event_loop().remove_reader(conn.fileno())
+        self.watched.discard(conn)
+
+    def receive(self, conn: Connection):
+        """Read the next message of ``conn`` in a thread: a large one
+        takes several writes of the shard, which would block the loop.
+        """
+        self.unwatch(conn)
+        future = asyncio.get_event_loop().run_in_executor(
+            None, read_message, conn
+        )
+        future.add_done_callback(functools.partial(self.received, conn))
+
+    def received(self, conn: Connection, future: "asyncio.Future[Tuple]"):
+        try:
+            message = future.result()
+        except Exception:
+            # EOFError or OSError, the shard exited
+            conn.close()
+            message = None
+        self.pending.put_nowait(message)
+        if conn.closed:
+            return
+        if self.pending.qsize() >= self.max_pending:
+            # stop reading until events() catches up, the shards then
+            # block on their pipe
+            for watched in list(self.watched):
+                self.unwatch(watched)
+                self.paused.append(watched)
+            self.paused.append(conn)
+        else:
+            self.watch(conn)
+
+    def resume(self):
+        for receiver in self.paused:
+            if not receiver.closed:
+                self.watch(receiver)
+        self.paused = []
+
+    async def events(self) -> AsyncIterator[ShardEvent]:
+        """Events of every account, until all shard processes exit."""
+        running = len(self.workers)
+        while running:
+            message = await self.pending.get()
+            if self.paused and self.pending.qsize() < self.resume_at:
+                self.resume()
+            if message is None:
+                running -= 1
+                continue
+            kind, user, *payload = message
+            if kind == "error":
+                self.errors.append((user, payload[0]))
+                continue
+            next_batch, events = payload
+            self.positions[user] = next_batch
+            for room_id, section, event in events:
+                yield ShardEvent(user, room_id, section, event)
+
+    async def stop(self, timeout: float = 5.0):
+        loop = asyncio.get_event_loop()
+        for receiver in list(self.watched):
+            self.unwatch(receiver)
+        for process, receiver in self.workers:
+            process.terminate()
+        for process, receiver in self.workers:
+            await loop.run_in_executor(None, process.join, timeout)
+            receiver.close()
+        self.workers = []
@@ -0,0 +1,159 @@
+import codecs
+import json
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+# characters after a decoded number that mean it was cut short
+NUMBER_CONTINUATION = frozenset(".eE+-0123456789")
+
+# what the parser expects next
+START, FIRST_KEY, KEY, COLON, VALUE, NEXT, DONE = range(7)
+
+
+class SyncSection(NamedTuple):
+    """A top level value of a sync body, or a room for ``rooms``.
+
+    ``path`` is ``("next_batch",)``, ``("to_device",)``... or
+    ``("rooms", "join", room_id)`` for rooms.
+    """
+
+    path: Tuple[str, ...]
+    value: Any
+
+
+class StreamingParser:
+    """Incremental parser of a JSON object, fed with chunks of bytes.
+
+    Objects whose key is in ``split`` are walked into ``split[key]`` levels
+    deep instead of decoded at once; every other value is decoded whole,
+    with ``json``, as soon as it is complete. With the default split, a
+    sync body comes out one room at a time, so peak memory is bounded by
+    the largest room rather than the whole body.
+
+    >>> parser = StreamingParser()
+    >>> parser.feed(b'{"next_batch": "s1", "rooms": {"join": {"!a')
+    [SyncSection(path=('next_batch',), value='s1')]
+    >>> [path for path, _ in parser.feed(b':baro": {}, "!b:baro": {}}}}')]
+    [('rooms', 'join', '!a:baro'), ('rooms', 'join', '!b:baro')]
+    >>> parser.close()
+    []
+
+    A value that fails to decode is retried once the pending text has
+    doubled, so the cost stays linear in the size of the body.
+    """
+
+    def __init__(self, split: Dict[str, int] = None):
+        self.split = {"rooms": 2} if split is None else split
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.scanner = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        # text received since the last parse, joined to buffer lazily
+        self.chunks: List[str] = []
+        self.queued = 0
+        self.state = START
+        self.stack: List[Tuple[str, ...]] = []
+        self.key = ""
+        self.needed = 0
+
+    def descend(self, path: Tuple[str, ...]) -> bool:
+        return len(path) <= self.split.get(path[0], 0)
+
+    def feed(self, data: bytes) -> List[SyncSection]:
+        """Parse ``data`` and return the sections it completed."""
+        text = self.decoder.decode(data)
+        self.chunks.append(text)
+        self.queued += len(text)
+        if len(self.buffer) - self.pos + self.queued < self.needed:
+            return []
+        return list(self.parse(final=False))
+
+    def close(self) -> List[SyncSection]:
+        """Parse the end of the body, which must complete the object."""
+        self.chunks.append(self.decoder.decode(b"", final=True))
+        sections = list(self.parse(final=True))
+        if self.state != DONE:
+            self.fail("Unexpected end of JSON body")
+        return sections
+
+    def fail(self, message: str):
+        raise json.JSONDecodeError(message, self.buffer, self.pos)
+
+    def decode(self, final: bool) -> Tuple[bool, Any]:
+        """Decode the value at ``pos``; ``(False, None)`` if incomplete."""
+        pending = len(self.buffer) - self.pos
+        try:
+            value, end = self.scanner.raw_decode(self.buffer, self.pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            self.needed = pending * 2
+            return False, None
+        if not final and (
+            end == len(self.buffer)
+            or (
+                isinstance(value, (int, float))
+                and self.buffer[end] in NUMBER_CONTINUATION
+            )
+        ):
+            # a number may continue in the next chunk, a prefix such as
+            # "1." or "1e" decodes as the integer before it
+            self.needed = pending + 1
+            return False, None
+        self.needed = 0
+        self.pos = end
+        return True, value
+
+    def parse(self, final: bool) -> Iterable[SyncSection]:
+        # drop the parsed text along the way
+        buffer = self.buffer = "".join([self.buffer[self.pos :], *self.chunks])
+        self.pos = 0
+        self.chunks = []
+        self.queued = 0
+        while True:
+            self.pos = WHITESPACE.match(buffer, self.pos).end()
+            if self.pos == len(buffer):
+                break
+            char = buffer[self.pos]
+            if self.state == START:
+                if char != "{":
+                    self.fail("Expecting a JSON object")
+                self.stack.append(())
+                self.pos += 1
+                self.state = FIRST_KEY
+            elif self.state in (FIRST_KEY, NEXT) and char == "}":
+                self.stack.pop()
+                self.pos += 1
+                self.state = NEXT if self.stack else DONE
+            elif self.state == NEXT:
+                if char != ",":
+                    self.fail("Expecting ',' delimiter")
+                self.pos += 1
+                self.state = KEY
+            elif self.state in (FIRST_KEY, KEY):
+                if char != '"':
+                    self.fail("Expecting property name")
+                complete, self.key = self.decode(final)
+                if not complete:
+                    break
+                self.state = COLON
+            elif self.state == COLON:
+                if char != ":":
+                    self.fail("Expecting ':' delimiter")
+                self.pos += 1
+                self.state = VALUE
+            elif self.state == VALUE:
+                path = self.stack[-1] + (self.key,)
+                if char == "{" and self.descend(path):
+                    self.stack.append(path)
+                    self.pos += 1
+                    self.state = FIRST_KEY
+                    continue
+                complete, value = self.decode(final)
+                if not complete:
+                    break
+                self.state = NEXT
+                yield SyncSection(path, value)
+            else:
+                self.fail("Extra data")
@@ -0,0 +1,144 @@
+import asyncio
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Union,
+)
+
+import httpx
+
+from .decoding import DECODE_POLICY, DecodePolicy
+from .events import Event
+from .exceptions import CircuitOpenError, LoginRequiredException
+from .metrics import CLIENT_METRICS, ClientMetrics
+from .models import FilterT, MatrixResponse
+
+ROOM_SECTIONS = {
+    "join": ("state", "timeline", "ephemeral", "account_data"),
+    "invite": ("invite_state",),
+    "leave": ("state", "timeline", "account_data"),
+}
+GLOBAL_SECTIONS = ("presence", "account_data", "to_device")
+
+
+class SyncEvent(NamedTuple):
+    """An event of a sync response, with where it was found.
+
+    ``section`` is ``"<membership>.<section>"`` for room events, such as
+    ``"join.timeline"``, or the top level key such as ``"to_device"``.
+    """
+
+    room_id: Optional[str]
+    section: str
+    event: Union[Dict[str, Any], Event]
+
+
+def iter_events(
+    body: Dict[str, Any], typed: bool = False
+) -> Iterator[SyncEvent]:
+    """Flatten the events of a sync response body.
+
+    With ``typed``, events come as ``Event`` objects instead of dicts.
+    """
+    for section in GLOBAL_SECTIONS:
+        for event in body.get(section, {}).get("events", ()):
+            if typed:
+                event = Event.from_dict(event)
+            yield SyncEvent(None, section, event)
+    rooms = body.get("rooms", {})
+    for membership, sections in ROOM_SECTIONS.items():
+        for room_id, room in rooms.get(membership, {}).items():
+            for section in sections:
+                for event in room.get(section, {}).get("events", ()):
+                    if typed:
+                        event = Event.from_dict(event, room_id)
+                    yield SyncEvent(room_id, f"{membership}.{section}", event)
+
+
+class SyncLoop:
+    """Long-poll ``sync`` forever, following ``next_batch``.
+
+    ``sync`` is a coroutine function with the signature of
+    ``MatrixClient.sync``, usually ``client.sync`` or a
+    ``functools.partial`` of ``SessionPool.call``. Failed requests are
+    retried with an exponential backoff; a rejected access token raises
+    ``LoginRequiredException``. Large bodies, such as an initial sync, are
+    decoded off the event loop according to ``decode_policy``; pass
+    ``None`` to always decode inline.
+
+        async for body in SyncLoop(client.sync):
+            for room_id, section, event in iter_events(body):
+                ...
+    """
+
+    def __init__(
+        self,
+        sync: Callable[..., Awaitable[MatrixResponse]],
+        since: Optional[str] = None,
+        timeout: int = 30000,
+        data_filter: FilterT = None,
+        full_state: Optional[bool] = None,
+        set_presence: Optional[str] = None,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        metrics: Optional[ClientMetrics] = CLIENT_METRICS,
+        decode_policy: Optional[DecodePolicy] = DECODE_POLICY,
+    ):
+        self.sync = sync
+        self.next_batch = since
+        self.timeout = timeout
+        self.data_filter = data_filter
+        self.full_state = full_state
+        self.set_presence = set_presence
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.metrics = metrics
+        self.decode_policy = decode_policy
+        self.stopped = False
+
+    def stop(self):
+        """Stop after the request in flight, if any."""
+        self.stopped = True
+
+    async def request(self) -> MatrixResponse:
+        return await self.sync(
+            since=self.next_batch,
+            timeout=self.timeout,
+            data_filter=self.data_filter,
+            full_state=self.full_state,
+            set_presence=self.set_presence,
+        )
+
+    async def decode(self, response: MatrixResponse) -> Dict[str, Any]:
+        return await response.ajson(self.decode_policy)
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        delay = self.backoff
+        while not self.stopped:
+            try:
+                response = await self.request()
+            except (httpx.HTTPError, CircuitOpenError):
+                response = None
+            if response is not None and response.status_code == 401:
+                raise LoginRequiredException(
+                    status_code=401, message="Invalid access_token"
+                )
+            if response is None or not response.ok:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+                continue
+            delay = self.backoff
+            # full_state is for the request resuming from ``since`` only,
+            # not for every long-poll after it
+            self.full_state = None
+            body = await self.decode(response)
+            self.next_batch = body.get("next_batch", self.next_batch)
+            if self.metrics is not None:
+                self.metrics.observe_sync(body)
+            yield body
@@ -0,0 +1,154 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Iterator, Mapping, Optional, TypeVar
+
+import httpx
+
+from .exceptions import DeadlineExceeded
+from .hooks import endpoint_template
+from .routing import endpoint_family
+
+T = TypeVar("T")
+
+# absolute time.monotonic() by which the current task must be done
+DEADLINE: ContextVar[Optional[float]] = ContextVar(
+    "aiobaro_deadline", default=None
+)
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[float]:
+    """Give the requests made inside the block ``seconds`` in total,
+    retries and rate limit waits included.
+
+    Requests are sent with their timeouts cut to the time left and
+    cancelled when it runs out, raising ``DeadlineExceeded``. A nested
+    deadline cannot extend the one around it.
+
+        with deadline(5):
+            await pool.call("bot", "room_send", room_id, ...)
+    """
+    expires = time.monotonic() + seconds
+    outer = DEADLINE.get()
+    if outer is not None:
+        expires = min(expires, outer)
+    token = DEADLINE.set(expires)
+    try:
+        yield expires
+    finally:
+        DEADLINE.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, ``None`` without one."""
+    expires = DEADLINE.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+def check_deadline() -> Optional[float]:
+    """``remaining()``, raising ``DeadlineExceeded`` when none is left."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"deadline exceeded by {-left:.3f}s")
+    return left
+
+
+def within_deadline(awaitable: Awaitable[T]) -> Awaitable[T]:
+    """``awaitable``, cancelled when the deadline runs out; as is, without
+    a deadline, not to wrap every request in one more coroutine.
+    """
+    left = remaining()
+    if left is None:
+        return awaitable
+    return wait_deadline(awaitable, left)
+
+
+async def wait_deadline(awaitable: Awaitable[T], left: float) -> T:
+    if left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        check_deadline()
+    try:
+        return await asyncio.wait_for(awaitable, left)
+    except (asyncio.TimeoutError, httpx.TimeoutException) as error:
+        if remaining() > 0:
+            raise
+        raise DeadlineExceeded("deadline exceeded") from error
+
+
+async def sleep(seconds: float):
+    """``asyncio.sleep``, failing right away if it would miss the deadline."""
+    left = remaining()
+    if left is not None and left < seconds:
+        raise DeadlineExceeded(f"cannot wait {seconds:.3f}s, {left:.3f}s left")
+    await asyncio.sleep(seconds)
+
+
+class TimeoutPolicy:
+    """httpx timeouts of each request, by endpoint or endpoint family.
+
+    ``endpoints`` maps endpoint templates, such as ``"keys/query"``, and
+    ``families`` endpoint families, such as ``"media"``, to timeouts;
+    other requests get ``default``. The read timeout of a sync is at least
+    its ``timeout`` parameter plus ``sync_margin`` seconds, so that the
+    server can hold the long-poll as long as it was asked to. Under a
+    ``deadline()``, every timeout is cut to the time left.
+    """
+
+    def __init__(
+        self,
+        default: httpx.Timeout = httpx.Timeout(10.0, connect=5.0),
+        families: Optional[Mapping[str, httpx.Timeout]] = None,
+        endpoints: Optional[Mapping[str, httpx.Timeout]] = None,
+        sync_margin: float = 10.0,
+    ):
+        self.default = default
+        self.families = dict(families or {})
+        self.endpoints = dict(endpoints or {})
+        self.sync_margin = sync_margin
+
+    def timeout(
+        self, path: str, base_url: str = "", params: Any = None
+    ) -> httpx.Timeout:
+        template = endpoint_template(path)
+        timeout = self.endpoints.get(template)
+        if timeout is None:
+            timeout = self.families.get(
+                endpoint_family(path, base_url), self.default
+            )
+        if template == "sync" and isinstance(params, Mapping):
+            poll = params.get("timeout")
+            if poll is not None:
+                read = int(poll) / 1000 + self.sync_margin
+                if timeout.read is not None and timeout.read < read:
+                    timeout = httpx.Timeout(
+                        connect=timeout.connect,
+                        read=read,
+                        write=timeout.write,
+                        pool=timeout.pool,
+                    )
+        left = remaining()
+        if left is not None:
+            timeout = httpx.Timeout(
+                connect=cut(timeout.connect, left),
+                read=cut(timeout.read, left),
+                write=cut(timeout.write, left),
+                pool=cut(timeout.pool, left),
+            )
+        return timeout
+
+
+def cut(timeout: Optional[float], left: float) -> float:
+    left = max(left, 0.0)
+    return left if timeout is None else min(timeout, left)
+
+
+TIMEOUTS = TimeoutPolicy(
+    families={"media": httpx.Timeout(60.0, connect=5.0)},
+    endpoints={
+        "keys/query": httpx.Timeout(30.0, connect=5.0),
+        "keys/claim": httpx.Timeout(30.0, connect=5.0),
+    },
+)
@@ -1,20 +1,38 @@
+import functools
 import hashlib
 import hmac
+import json
+import time
 import typing
 from collections import defaultdict
+from contextlib import asynccontextmanager
 from enum import Enum
 from pathlib import PurePath
 from types import GeneratorType
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 import httpx
+from httpx._config import UNSET
+from httpx._types import TimeoutTypes
 from pydantic import BaseModel  # pylint: disable=no-name-in-module
 from pydantic.json import ENCODERS_BY_TYPE  # pylint: disable=no-name-in-module
 
 from .exceptions import LoginRequiredException
+from .hooks import RequestHooks, RequestTrace, endpoint_template
 from .models import (
     ByteStream,
     CookieTypes,
+    FilterT,
     HeaderTypes,
     HttpVerbs,
     MatrixResponse,
@@ -23,6 +41,7 @@ from .models import (
     RequestData,
     RequestFiles,
 )
+from .serializers import SERIALIZER, Serializer
 
 SetIntStr = Set[Union[int, str]]
 DictIntStrAny = Dict[Union[int, str], Any]
@@ -229,6 +248,7 @@ def auth_required(method):
         files: RequestFiles = None,
         json: typing.Any = None,
         stream: ByteStream = None,
+        **kwargs,
     ):
         if isinstance(params, dict):
             params.setdefault("access_token", self.access_token)
@@ -251,11 +271,176 @@ def auth_required(method):
             files=files,
             json=json,
             stream=stream,
+            **kwargs,
         )
 
     return inner
 
 
+def build_request(
+    verb: HttpVerbs,
+    url: str,
+    *,
+    params: QueryParamTypes = None,
+    headers: HeaderTypes = None,
+    cookies: CookieTypes = None,
+    content: RequestContent = None,
+    data: RequestData = None,
+    files: RequestFiles = None,
+    json: typing.Any = None,
+    stream: ByteStream = None,
+    serializer: Serializer = SERIALIZER,
+) -> httpx.Request:
+    if json:
+        content = serializer.dumps(
+            jsonable_encoder(json) if isinstance(json, (dict, list)) else json
+        )
+        if headers is None:
+            headers = {"Content-Type": serializer.content_type}
+        else:
+            headers = httpx.Headers(headers)
+            headers.setdefault("Content-Type", serializer.content_type)
+    client_config = {
+        "params": params,
+        "headers": headers,
+        "cookies": cookies,
+        "content": content,
+        "data": data,
+        "files": files,
+        "stream": stream,
+    }
+    return httpx.Request(
+        verb.upper(),
+        url,
+        **dict(filter(lambda x: x[1], client_config.items())),
+    )
+
+
+async def send_request(
+    client: httpx.AsyncClient,
+    verb: HttpVerbs,
+    base_url: str,
+    path: str,
+    *,
+    hooks: RequestHooks = None,
+    timeout: TimeoutTypes = UNSET,
+    **kwargs: typing.Any,
+) -> MatrixResponse:
+    """Build and send a request with ``client``, reading the whole body.
+
+    When ``hooks`` is set, a ``RequestTrace`` with phase timings is
+    emitted over the request lifecycle. ``timeout`` overrides the timeout
+    of ``client``, ``kwargs`` are the request arguments of
+    ``build_request``.
+    """
+    start = time.perf_counter()
+    url = f"{base_url.strip('/')}/{path.lstrip('/')}"
+    trace = None
+    if hooks is not None:
+        trace = RequestTrace(verb.upper(), endpoint_template(path), url)
+        hooks.request_start(trace)
+    try:
+        request = build_request(verb, url, **kwargs)
+        if trace is not None:
+            sent = time.perf_counter()
+            trace.phases["encode"] = sent - start
+            trace.request_bytes = int(request.headers.get("Content-Length", 0))
+        response: httpx.Response = await client.send(
+            request, stream=True, timeout=timeout
+        )
+        if trace is not None:
+            received = time.perf_counter()
+            trace.phases["wait"] = received - sent
+            trace.status_code = response.status_code
+        try:
+            await response.aread()
+        except BaseException:
+            await response.aclose()
+            raise
+    except BaseException as error:
+        if trace is not None:
+            trace.error = error
+            hooks.request_end(trace)
+        raise
+    if trace is not None:
+        trace.phases["read"] = time.perf_counter() - received
+        trace.response_bytes = response.num_bytes_downloaded
+        hooks.request_end(trace)
+    return MatrixResponse(response, trace=trace, hooks=hooks)
+
+
+@asynccontextmanager
+async def open_request(
+    client: httpx.AsyncClient,
+    verb: HttpVerbs,
+    base_url: str,
+    path: str,
+    *,
+    hooks: RequestHooks = None,
+    timeout: TimeoutTypes = UNSET,
+    **kwargs: typing.Any,
+) -> AsyncIterator[httpx.Response]:
+    """Like ``send_request``, but yield the response before its body is
+    read, and close it on exit; the "read" phase lasts until then.
+    """
+    start = time.perf_counter()
+    url = f"{base_url.strip('/')}/{path.lstrip('/')}"
+    trace = None
+    if hooks is not None:
+        trace = RequestTrace(verb.upper(), endpoint_template(path), url)
+        hooks.request_start(trace)
+    try:
+        request = build_request(verb, url, **kwargs)
+        if trace is not None:
+            sent = time.perf_counter()
+            trace.phases["encode"] = sent - start
+            trace.request_bytes = int(request.headers.get("Content-Length", 0))
+        response: httpx.Response = await client.send(
+            request, stream=True, timeout=timeout
+        )
+        if trace is not None:
+            received = time.perf_counter()
+            trace.phases["wait"] = received - sent
+            trace.status_code = response.status_code
+        try:
+            yield response
+        finally:
+            await response.aclose()
+    except BaseException as error:
+        if trace is not None:
+            trace.error = error
+            hooks.request_end(trace)
+        raise
+    if trace is not None:
+        trace.phases["read"] = time.perf_counter() - received
+        trace.response_bytes = response.num_bytes_downloaded
+        hooks.request_end(trace)
+
+
+def sync_params(
+    since: Optional[str] = None,
+    timeout: Optional[int] = None,
+    data_filter: FilterT = None,
+    full_state: Optional[bool] = None,
+    set_presence: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Query parameters of a ``sync`` request, unset ones left out."""
+    return dict(
+        filter(
+            lambda x: x[1],
+            {
+                "filter": json.dumps(data_filter, separators=(",", ":"))
+                if isinstance(data_filter, dict)
+                else data_filter,
+                "since": since,
+                "full_state": full_state,
+                "set_presence": set_presence,
+                "timeout": timeout,
+            }.items(),
+        )
+    )
+
+
 async def matrix_client(
     homeserver: str,
     verb: HttpVerbs,
@@ -270,6 +455,8 @@ async def matrix_client(
     files: RequestFiles = None,
     json: typing.Any = None,
     stream: ByteStream = None,
+    hooks: RequestHooks = None,
+    http_client: httpx.AsyncClient = None,
 ) -> MatrixResponse:
     """DOC:"""
     if access_token is not None:
@@ -277,26 +464,25 @@ async def matrix_client(
             params.setdefault("access_token", access_token)
         else:
             params = dict(access_token=access_token)
+    send = functools.partial(
+        send_request,
+        verb=verb,
+        base_url=homeserver,
+        path=path,
+        params=params,
+        headers=headers,
+        cookies=cookies,
+        content=content,
+        data=data,
+        files=files,
+        json=json,
+        stream=stream,
+        hooks=hooks,
+    )
+    if http_client is not None:
+        return await send(http_client)
     async with httpx.AsyncClient() as client:
-        client_config = {
-            "params": params,
-            "headers": headers,
-            "cookies": cookies,
-            "content": content,
-            "data": data,
-            "files": files,
-            "json": jsonable_encoder(json)
-            if isinstance(json, (dict, list))
-            else json,
-            "stream": stream,
-        }
-        request = httpx.Request(
-            verb.upper(),
-            f"{homeserver.strip('/')}/{path.lstrip('/')}",
-            **dict(filter(lambda x: x[1], client_config.items())),
-        )
-        response: httpx.Response = await client.send(request)
-    return MatrixResponse(response)
+        return await send(client)
 
 
 def mimetype_to_msgtype(mimetype: str) -> str:
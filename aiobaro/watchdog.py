@@ -0,0 +1,168 @@
+import asyncio
+import collections
+import heapq
+import json
+import time
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .hooks import RequestHooks, RequestTrace
+from .metrics import REGISTRY, MetricsRegistry
+
+
+class LoopLagMonitor:
+    """Measure how late the event loop wakes up a sleeping task.
+
+    A coroutine sleeps for ``interval`` seconds in a loop; any extra delay
+    before it runs again is time the loop spent on other, blocking work,
+    such as decoding a huge sync body. ``start()`` must be called from a
+    running event loop.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        history: int = 600,
+        registry: Optional[MetricsRegistry] = REGISTRY,
+    ):
+        self.interval = interval
+        self.samples: Deque[Tuple[float, float]] = collections.deque(
+            maxlen=history
+        )
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.task: Optional[asyncio.Task] = None
+        self.histogram = None
+        if registry is not None:
+            self.histogram = registry.histogram(
+                "aiobaro_event_loop_lag_seconds",
+                "Delay of the event loop in running a ready task.",
+                buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+            )
+
+    def start(self) -> asyncio.Task:
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+        return self.task
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.record(loop.time() - start - self.interval)
+
+    def record(self, lag: float):
+        lag = max(lag, 0.0)
+        self.lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.samples.append((time.time(), lag))
+        if self.histogram is not None:
+            self.histogram.observe(value=lag)
+
+    def max_lag_since(self, since: float) -> float:
+        """Worst lag observed since the ``since`` wall-clock timestamp."""
+        worst = 0.0
+        for timestamp, lag in reversed(self.samples):
+            # a sample covers the interval that ends at its timestamp
+            if timestamp + self.interval < since:
+                break
+            worst = max(worst, lag)
+        return worst
+
+
+class SlowRequestLog:
+    """Bounded log of the slowest requests.
+
+    Requests whose duration, JSON decoding included, reaches ``threshold``
+    seconds are kept with their phase timings and payload sizes. Past
+    ``capacity`` entries, the fastest one is dropped, so that a burst of
+    slightly slow requests does not push the outliers out. When a
+    ``LoopLagMonitor`` is given, each entry also records the worst event
+    loop lag seen while the request was in flight, telling a slow server
+    apart from a blocked loop.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 100,
+        threshold: float = 1.0,
+        monitor: Optional[LoopLagMonitor] = None,
+    ):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.monitor = monitor
+        # min-heap of (duration, order, trace, loop lag), fastest on top
+        self.entries: List[Tuple[float, int, RequestTrace, float]] = []
+        self.count = 0
+
+    def attach(self, hooks: RequestHooks) -> RequestHooks:
+        for callbacks, callback in (
+            (hooks.on_request_end, self.observe),
+            (hooks.on_response_decoded, self.observe),
+        ):
+            if callback not in callbacks:
+                callbacks.append(callback)
+        return hooks
+
+    def observe(self, trace: RequestTrace):
+        if trace.duration < self.threshold:
+            return
+        if trace.context.get("slow"):
+            # in the log and decoded since, its duration grew
+            for index, entry in enumerate(self.entries):
+                if entry[2] is trace:
+                    self.entries[index] = (trace.duration, *entry[1:])
+                    heapq.heapify(self.entries)
+                    break
+            return
+        loop_lag = 0.0
+        if self.monitor is not None:
+            loop_lag = self.monitor.max_lag_since(trace.started)
+        self.count += 1
+        entry = (trace.duration, self.count, trace, loop_lag)
+        if len(self.entries) < self.capacity:
+            heapq.heappush(self.entries, entry)
+        elif entry[0] > self.entries[0][0]:
+            dropped = heapq.heapreplace(self.entries, entry)
+            # reconsidered if decoding makes it slower
+            dropped[2].context["slow"] = False
+        else:
+            # not slow enough yet, it may be once decoded
+            return
+        trace.context["slow"] = True
+
+    def dump(self) -> List[Dict[str, Any]]:
+        """Logged requests, slowest first."""
+        entries = [
+            {
+                "method": trace.method,
+                "endpoint": trace.endpoint,
+                "url": trace.url,
+                "status_code": trace.status_code,
+                "error": repr(trace.error) if trace.error else None,
+                "started": trace.started,
+                "duration": trace.duration,
+                "phases": dict(trace.phases),
+                "request_bytes": trace.request_bytes,
+                "response_bytes": trace.response_bytes,
+                "loop_lag": loop_lag,
+            }
+            for _, _, trace, loop_lag in self.entries
+        ]
+        entries.sort(key=lambda entry: entry["duration"], reverse=True)
+        return entries
+
+    def dumps(self) -> str:
+        return json.dumps(self.dump(), indent=4)
+
+    def clear(self):
+        self.entries.clear()
@@ -0,0 +1,328 @@
+"""Per-endpoint micro-benchmark of the aiobaro request path.
+
+Every ``MatrixClient`` method is run against an in-memory
+``httpx.MockTransport`` so that the numbers only contain what aiobaro and
+httpx spend on the client side: URL building, parameter cleaning,
+``jsonable_encoder``, ``auth_required`` handling and ``MatrixResponse``
+wrapping.
+
+    python benchmarks/client_overhead.py            # print the report
+    python benchmarks/client_overhead.py --save     # store a new baseline
+    python benchmarks/client_overhead.py --check    # fail on regressions
+"""
+
+import argparse
+import asyncio
+import gc
+import inspect
+import json
+import pathlib
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+import httpx
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from aiobaro.core import MatrixClient  # noqa: E402
+
+BASELINE_PATH = pathlib.Path(__file__).with_name("baseline.json")
+HOMESERVER = "http://bench.local"
+
+RESPONSE_BODY = json.dumps(
+    {
+        "access_token": "bench_token",
+        "user_id": "@bench:bench.local",
+        "room_id": "!room:bench.local",
+        "event_id": "$event:bench.local",
+        "content_uri": "mxc://bench.local/media",
+        "devices": [],
+        "chunk": [],
+    }
+).encode()
+
+ROOM = "!room:bench.local"
+USER = "@bench:bench.local"
+EVENT = "$event:bench.local"
+
+CALLS: Dict[str, Tuple[Tuple[Any, ...], Dict[str, Any]]] = {
+    "versions": ((), {}),
+    "capabilities": ((), {}),
+    "login_info": ((), {}),
+    "login": (("bench",), {"password": "bench"}),
+    "register": (("bench",), {"password": "bench"}),
+    "logout": ((), {}),
+    "sync": (
+        (),
+        {
+            "since": "s72594_4483_1934",
+            "timeout": 30000,
+            "data_filter": {"room": {"timeline": {"limit": 10}}},
+        },
+    ),
+    "room_send": (
+        (ROOM, "m.room.message", {"msgtype": "m.text", "body": "hello"}),
+        {"tx_id": "txn1"},
+    ),
+    "room_get_event": ((ROOM, EVENT), {}),
+    "room_put_state": (
+        (ROOM, "m.room.topic", {"topic": "benchmarks"}),
+        {"state_key": ""},
+    ),
+    "room_get_state_event": ((ROOM, "m.room.topic"), {}),
+    "room_get_state": ((ROOM,), {}),
+    "room_redact": ((ROOM, EVENT, "txn1"), {"reason": "bench"}),
+    "room_kick": ((ROOM, USER), {"reason": "bench"}),
+    "room_ban": ((ROOM, USER), {"reason": "bench"}),
+    "room_unban": ((ROOM, USER), {}),
+    "room_invite": ((ROOM, USER), {}),
+    "room_create": ((), {"name": "bench", "invite": [USER]}),
+    "join": ((ROOM,), {}),
+    "room_leave": ((ROOM,), {}),
+    "room_forget": ((ROOM,), {}),
+    "room_messages": ((ROOM, "t1"), {}),
+    "keys_upload": (({"device_keys": {}},), {}),
+    "keys_query": (({USER},), {}),
+    "keys_claim": (({USER: ["DEVICE"]},), {}),
+    "to_device": (
+        ("m.new_device", {"messages": {USER: {"DEVICE": {"k": "v"}}}}),
+        {"tx_id": "txn1"},
+    ),
+    "devices": ((), {}),
+    "update_device": (("DEVICE", {"display_name": "bench"}), {}),
+    "delete_devices": ((["DEVICE"],), {}),
+    "joined_members": ((ROOM,), {}),
+    "joined_rooms": ((), {}),
+    "room_resolve_alias": (("#bench:bench.local",), {}),
+    "room_typing": ((ROOM, USER), {}),
+    "update_receipt_marker": ((ROOM, EVENT), {}),
+    "room_read_markers": ((ROOM, EVENT), {}),
+    "content_repository_config": ((), {}),
+    "upload": ((), {"filename": "bench.txt"}),
+    "download": (("bench.local", "media"), {}),
+    "thumbnail": (("bench.local", "media", 64, 64), {}),
+    "profile_get": ((USER,), {}),
+    "profile_get_displayname": ((USER,), {}),
+    "profile_set_displayname": ((USER, "bench"), {}),
+    "profile_get_avatar": ((USER,), {}),
+    "profile_set_avatar": ((USER, "mxc://bench.local/avatar"), {}),
+    "get_presence": ((USER,), {}),
+    "set_presence": ((USER, "online"), {}),
+    "whoami": ((), {}),
+    "room_context": ((ROOM, EVENT), {}),
+    "upload_filter": ((USER,), {}),
+}
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(
+        200,
+        content=RESPONSE_BODY,
+        headers={"Content-Type": "application/json"},
+    )
+
+
+def build_client() -> MatrixClient:
+    return MatrixClient(
+        HOMESERVER,
+        access_token="bench_token",
+        transport=httpx.MockTransport(handler),
+    )
+
+
+def endpoints() -> List[str]:
+    """Public coroutine methods of ``MatrixClient``."""
+    return sorted(
+        name
+        for name, member in inspect.getmembers(MatrixClient)
+        if not name.startswith("_")
+        and inspect.iscoroutinefunction(member)
+        and name not in ("client", "auth_client", "guarded")
+    )
+
+
+async def floor_call(client: MatrixClient) -> None:
+    """Bare httpx round-trip against the same mock transport."""
+    async with httpx.AsyncClient(transport=client.transport) as http:
+        await http.get(f"{HOMESERVER}/_matrix/client/r0/login")
+
+
+def call_factory(client: MatrixClient, name: str) -> Callable:
+    if name == "__floor__":
+        return lambda: floor_call(client)
+    args, kwargs = CALLS[name]
+    method = getattr(client, name)
+    return lambda: method(*args, **kwargs)
+
+
+async def sample(call: Callable, iterations: int) -> float:
+    """Mean wall time per call over ``iterations`` calls, in seconds."""
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await call()
+        return (time.perf_counter() - start) / iterations
+    finally:
+        gc.enable()
+
+
+async def measure_time(
+    call: Callable, floor: Callable, iterations: int, repeat: int
+) -> Tuple[float, float]:
+    """Best-of-``repeat`` time per call of ``call`` and ``floor``, in us.
+
+    Both are sampled alternately so that both numbers see the same machine
+    load, which keeps their ratio stable on noisy hosts.
+    """
+    for _ in range(max(iterations // 10, 1)):
+        await call()
+        await floor()
+    call_samples, floor_samples = [], []
+    for _ in range(repeat):
+        call_samples.append(await sample(call, iterations))
+        floor_samples.append(await sample(floor, iterations))
+    return min(call_samples) * 1e6, min(floor_samples) * 1e6
+
+
+async def measure_memory(call: Callable, repeat: int) -> int:
+    """Median peak traced memory of a single call, in bytes."""
+    await call()
+    samples = []
+    for _ in range(repeat):
+        tracemalloc.start()
+        await call()
+        samples.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return int(statistics.median(samples))
+
+
+async def run(
+    names: List[str], iterations: int, repeat: int
+) -> Dict[str, Dict[str, float]]:
+    client = build_client()
+    floor = call_factory(client, "__floor__")
+    results = {}
+    for name in names:
+        call = call_factory(client, name)
+        per_call, floor_per_call = await measure_time(
+            call, floor, iterations, repeat
+        )
+        results[name] = {
+            "per_call_us": round(per_call, 2),
+            "overhead_us": round(per_call - floor_per_call, 2),
+            "relative": round(per_call / floor_per_call, 3),
+            "peak_bytes": await measure_memory(call, repeat),
+        }
+    return results
+
+
+def report(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+) -> None:
+    header = (
+        f"{'endpoint':<28}{'per call us':>12}{'overhead us':>13}"
+        f"{'x floor':>9}{'peak KiB':>10}{'vs baseline':>13}"
+    )
+    print(header)
+    print("-" * len(header))
+    for name, row in results.items():
+        previous = baseline.get(name)
+        delta = (
+            f"{row['relative'] / previous['relative'] - 1:+.1%}"
+            if previous
+            else "-"
+        )
+        print(
+            f"{name:<28}{row['per_call_us']:>12.1f}"
+            f"{row['overhead_us']:>13.1f}{row['relative']:>9.2f}"
+            f"{row['peak_bytes'] / 1024:>10.1f}{delta:>13}"
+        )
+
+
+def regressions(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    time_tolerance: float,
+    memory_tolerance: float,
+) -> List[str]:
+    """Compare against ``baseline``.
+
+    Time is compared relative to the bare httpx floor measured alongside
+    each endpoint, so baselines stay meaningful across machines.
+    """
+    failures = []
+    for name, row in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if row["relative"] > previous["relative"] * (1 + time_tolerance):
+            failures.append(
+                f"{name}: {row['relative']:.2f}x floor per call, "
+                f"baseline {previous['relative']:.2f}x"
+            )
+        if row["peak_bytes"] > previous["peak_bytes"] * (1 + memory_tolerance):
+            failures.append(
+                f"{name}: {row['peak_bytes']} peak bytes, "
+                f"baseline {previous['peak_bytes']}"
+            )
+    return failures
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("endpoints", nargs="*", help="Endpoints to run.")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", type=pathlib.Path, default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true")
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--time-tolerance", type=float, default=0.25)
+    parser.add_argument("--memory-tolerance", type=float, default=0.10)
+    options = parser.parse_args(argv)
+
+    names = options.endpoints or endpoints()
+    missing = [name for name in names if name not in CALLS]
+    if missing:
+        parser.error(f"no benchmark arguments for: {', '.join(missing)}")
+
+    results = asyncio.run(run(names, options.iterations, options.repeat))
+    baseline = {}
+    if options.baseline.exists():
+        baseline = json.loads(options.baseline.read_text())["results"]
+    report(results, baseline)
+
+    if options.save:
+        options.baseline.write_text(
+            json.dumps(
+                {
+                    "python": platform.python_version(),
+                    "httpx": httpx.__version__,
+                    "results": {**baseline, **results},
+                },
+                indent=4,
+                sort_keys=True,
+            )
+            + "\n"
+        )
+    if options.check:
+        failures = regressions(
+            results,
+            baseline,
+            options.time_tolerance,
+            options.memory_tolerance,
+        )
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
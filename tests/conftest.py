@@ -1,3 +1,11 @@
+import inspect
+import json
+
+import httpx
+import pytest
+
+from aiobaro.core import MatrixClient
+
 from .fixtures import (
     docker_compose_file,
     is_responsive,
@@ -5,3 +13,34 @@ from .fixtures import (
     matrix_server_url,
     seed_data,
 )
+
+
+@pytest.fixture
+def requests():
+    """``(method, path, body)`` of the requests of ``mock_client``s."""
+    return []
+
+
+@pytest.fixture
+def mock_client(requests):
+    """Factory of clients answered in process by ``handler``, a function
+    or coroutine function of the request, recording their requests.
+    """
+
+    def make(handler, access_token="token"):
+        async def respond(request):
+            body = json.loads(request.content) if request.content else None
+            requests.append((request.method, request.url.path, body))
+            response = handler(request)
+            if inspect.isawaitable(response):
+                response = await response
+            return response
+
+        return MatrixClient(
+            "http://baro.local",
+            access_token=access_token,
+            transport=httpx.MockTransport(respond),
+            metrics=None,
+        )
+
+    return make
@@ -0,0 +1,90 @@
+import asyncio
+
+import httpx
+import pytest
+
+from aiobaro.aliases import AliasCache
+
+DIRECTORY = {"#ops:baro": "!ops:baro", "#dev:baro": "!dev:baro"}
+
+
+def directory(queries):
+    async def handler(request):
+        alias = request.url.path.rsplit("/", 1)[1]
+        queries.append(alias)
+        await asyncio.sleep(0.01)
+        if alias == "#down:baro":
+            return httpx.Response(502)
+        if alias not in DIRECTORY:
+            return httpx.Response(404, json={"errcode": "M_NOT_FOUND"})
+        return httpx.Response(
+            200, json={"room_id": DIRECTORY[alias], "servers": ["baro"]}
+        )
+
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_resolve_alias_endpoint(mock_client):
+    queries = []
+    client = mock_client(directory(queries), access_token=None)
+    response = await client.room_resolve_alias("#ops:baro")
+    assert response.ok and response.json()["room_id"] == "!ops:baro"
+    assert response.response.url.raw_path.endswith(
+        b"/directory/room/%23ops%3Abaro"
+    )
+
+
+@pytest.mark.asyncio
+async def test_hits_misses_and_failures_are_cached_or_not(mock_client):
+    queries = []
+    aliases = AliasCache(mock_client(directory(queries), access_token=None))
+    results = await asyncio.gather(
+        *(aliases.resolve("#ops:baro") for _ in range(10))
+    )
+    assert results == ["!ops:baro"] * 10
+    assert await aliases.resolve("#nope:baro") is None
+    assert await aliases.resolve("#down:baro") is None
+    assert queries == ["#ops:baro", "#nope:baro", "#down:baro"]
+
+    assert await aliases.resolve_many(
+        ["#ops:baro", "#nope:baro", "#dev:baro", "#down:baro"]
+    ) == {
+        "#ops:baro": "!ops:baro",
+        "#nope:baro": None,
+        "#dev:baro": "!dev:baro",
+        "#down:baro": None,
+    }
+    assert sorted(queries[3:]) == ["#dev:baro", "#down:baro"]
+
+
+@pytest.mark.asyncio
+async def test_canonical_alias_invalidates(mock_client):
+    queries = []
+    aliases = AliasCache(mock_client(directory(queries), access_token=None))
+    await aliases.resolve_many(["#ops:baro", "#dev:baro", "#new:baro"])
+    aliases.update(
+        {
+            "rooms": {
+                "join": {
+                    "!ops:baro": {
+                        "timeline": {
+                            "events": [
+                                {
+                                    "type": "m.room.canonical_alias",
+                                    "state_key": "",
+                                    "content": {
+                                        "alias": "#ops2:baro",
+                                        "alt_aliases": ["#new:baro"],
+                                    },
+                                }
+                            ]
+                        }
+                    }
+                }
+            }
+        }
+    )
+    assert "#ops:baro" not in aliases.cache
+    assert "#new:baro" not in aliases.cache
+    assert "#dev:baro" in aliases.cache
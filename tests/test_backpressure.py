@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from aiobaro.backpressure import EventQueue
+from aiobaro.dispatch import Dispatcher
+from aiobaro.models import OverflowPolicy
+from aiobaro.sync import SyncEvent
+
+
+def message(i):
+    event = {"event_id": f"${i}", "type": "m.room.message"}
+    return SyncEvent("!room:baro", "join.timeline", event)
+
+
+TYPING = SyncEvent("!room:baro", "join.ephemeral", {"type": "m.typing"})
+
+
+@pytest.mark.asyncio
+async def test_block():
+    queue = EventQueue(maxsize=2)
+    await queue.put(message(0))
+    await queue.put(message(1))
+    put = asyncio.ensure_future(queue.put(message(2)))
+    await asyncio.sleep(0)
+    assert not put.done()
+    assert (await queue.get()).event["event_id"] == "$0"
+    await put
+    assert len(queue) == 2
+
+
+@pytest.mark.asyncio
+async def test_drop_ephemeral():
+    queue = EventQueue(maxsize=1, policy=OverflowPolicy.drop_ephemeral)
+    await queue.put(message(0))
+    await queue.put(TYPING)
+    assert queue.dropped == 1 and len(queue) == 1
+
+
+@pytest.mark.asyncio
+async def test_spill(tmp_path):
+    path = str(tmp_path / "events.log")
+    queue = EventQueue(maxsize=2, policy="spill", spill_path=path)
+    for i in range(5):
+        await queue.put(message(i))
+    assert len(queue) == 5 and queue.spilled == 3
+    assert [(await queue.get()).event["event_id"] for _ in range(3)] == [
+        "$0",
+        "$1",
+        "$2",
+    ]
+    await queue.put(message(5))
+    queue.close()
+
+    # the log is replayed by the next queue, from the last time it was
+    # emptied: events read back from it may be seen again
+    queue = EventQueue(maxsize=2, policy="spill", spill_path=path)
+    assert len(queue) == 4
+    ids = [(await queue.get()).event["event_id"] for _ in range(4)]
+    assert ids == ["$2", "$3", "$4", "$5"]
+    assert queue.spilled == 0 and (tmp_path / "events.log").stat().st_size == 0
+
+
+@pytest.mark.asyncio
+async def test_spill_interleaved():
+    queue = EventQueue(maxsize=2, policy="spill", replay_batch=1)
+    ids = []
+    for i in range(6):
+        await queue.put(message(i))
+    for _ in range(3):
+        ids.append((await queue.get()).event["event_id"])
+    # written after a partial replay, behind the events not read back yet
+    for i in range(6, 9):
+        await queue.put(message(i))
+    while len(queue):
+        ids.append((await queue.get()).event["event_id"])
+    assert ids == [f"${i}" for i in range(9)]
+    queue.close()
+
+
+@pytest.mark.asyncio
+async def test_pump():
+    dispatcher = Dispatcher()
+    handled = []
+
+    @dispatcher.on("m.room.message")
+    async def slow(room_id, event):
+        await asyncio.sleep(0)
+        handled.append(event["event_id"])
+
+    queue = EventQueue(maxsize=3)
+    pump = asyncio.ensure_future(queue.pump(dispatcher, max_pending=2))
+    for i in range(10):
+        await queue.put(message(i))
+        assert dispatcher.pending <= 2
+    while len(handled) < 10:
+        await asyncio.sleep(0)
+    pump.cancel()
+    assert handled == [f"${i}" for i in range(10)]
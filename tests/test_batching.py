@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from aiobaro.batching import ToDeviceBatcher
+from aiobaro.core import MatrixClient
+
+
+def client_for(requests, fail_device=None):
+    def handler(request):
+        messages = json.loads(request.content)["messages"]
+        requests.append(messages)
+        if fail_device and any(
+            fail_device in devices for devices in messages.values()
+        ):
+            return httpx.Response(400, json={"errcode": "M_UNKNOWN"})
+        return httpx.Response(200, json={})
+
+    return MatrixClient(
+        "http://baro.local",
+        access_token="token",
+        transport=httpx.MockTransport(handler),
+        metrics=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_coalescing():
+    requests = []
+    batcher = ToDeviceBatcher(client_for(requests), window=0.01)
+    responses = await asyncio.gather(
+        *(
+            batcher.send("m.room_key", {f"@user{i}:baro": {"DEV": {"k": i}}})
+            for i in range(20)
+        ),
+        batcher.send("m.room_key", {"@user0:baro": {"DEV": {"k": "again"}}}),
+    )
+    assert all(response.ok for response in responses)
+    # the second message to the same device goes in a second request
+    assert [len(messages) for messages in requests] == [20, 1]
+    assert requests[1]["@user0:baro"]["DEV"] == {"k": "again"}
+
+
+@pytest.mark.asyncio
+async def test_split_and_fan_out():
+    requests = []
+    batcher = ToDeviceBatcher(
+        client_for(requests, fail_device="BAD"), window=10, max_bytes=200
+    )
+    big = {"k": "x" * 100}
+    sends = [
+        asyncio.ensure_future(
+            batcher.send("m.room_key", {"@a:baro": {"D1": big, "D2": big}})
+        ),
+        asyncio.ensure_future(
+            batcher.send("m.room_key", {"@b:baro": {"BAD": {"k": 1}}})
+        ),
+    ]
+    # max_bytes was reached, the first call did not wait for the window
+    await asyncio.wait_for(sends[0], 1)
+    await batcher.aclose()
+    first, second = [send.result() for send in sends]
+    # one request per big message, then the window flushed on close
+    assert [list(messages["@a:baro"]) for messages in requests[:2]] == [
+        ["D1"],
+        ["D2"],
+    ]
+    assert len(requests) == batcher.requests == 3
+    assert first.ok and not second.ok
+
+
+@pytest.mark.asyncio
+async def test_batches_in_order():
+    requests = []
+
+    async def handler(request):
+        content = json.loads(request.content)["messages"]["@a:baro"]["DEV"]
+        if content["k"] == "x" * 100:
+            # the first batch is slow, the second must still wait for it
+            await asyncio.sleep(0.05)
+        requests.append(content)
+        return httpx.Response(200, json={})
+
+    client = MatrixClient(
+        "http://baro.local",
+        access_token="token",
+        transport=httpx.MockTransport(handler),
+        metrics=None,
+    )
+    batcher = ToDeviceBatcher(client, window=0.01, max_bytes=100)
+    # flushed by max_bytes, then by the window
+    big = batcher.send("m.room_key", {"@a:baro": {"DEV": {"k": "x" * 100}}})
+    small = batcher.send("m.room_key", {"@a:baro": {"DEV": {"k": "y"}}})
+    assert all(response.ok for response in await asyncio.gather(big, small))
+    assert requests == [{"k": "x" * 100}, {"k": "y"}]
+    assert not batcher.latest
+
+    assert await batcher.send("m.room_key", {}) is None
+    assert await batcher.send("m.room_key", {"@a:baro": {}}) is None
+    assert batcher.requests == 2 and not batcher.pending
@@ -0,0 +1,173 @@
+import asyncio
+
+import httpx
+import pytest
+
+from aiobaro.circuit import CircuitBreaker
+from aiobaro.core import MatrixClient
+from aiobaro.exceptions import CircuitOpenError, DeadlineExceeded
+from aiobaro.metrics import ClientMetrics, MetricsRegistry
+from aiobaro.models import CircuitState
+from aiobaro.timeouts import deadline
+
+MEDIA = ("baro.local", "media")
+CLIENT = ("baro.local", "client")
+SYNC = ("baro.local", "sync")
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_probes_and_closes():
+    media_up = False
+    requests = []
+
+    def handler(request):
+        requests.append(request.url.path)
+        if "/_matrix/media/" in request.url.path and not media_up:
+            raise httpx.ConnectError("media worker down", request=request)
+        return httpx.Response(200, json={})
+
+    metrics = ClientMetrics(MetricsRegistry())
+    breaker = CircuitBreaker(
+        failure_threshold=3, reset_timeout=60, metrics=metrics
+    )
+    client = MatrixClient(
+        "http://baro.local",
+        access_token="token",
+        transport=httpx.MockTransport(handler),
+        metrics=None,
+        breaker=breaker,
+    )
+    for _ in range(3):
+        with pytest.raises(httpx.ConnectError):
+            await client.content_repository_config()
+    assert breaker.state(MEDIA) is CircuitState.open
+    with pytest.raises(CircuitOpenError) as error:
+        await client.content_repository_config()
+    assert error.value.family == "media" and error.value.retry_in > 59
+    assert len(requests) == 3
+
+    # other families are not affected
+    assert (await client.joined_rooms()).ok
+    assert breaker.state(CLIENT) is CircuitState.closed
+
+    # a failed probe keeps it open, a successful one closes it
+    breaker.circuits[MEDIA].opened -= 60
+    with pytest.raises(httpx.ConnectError):
+        await client.content_repository_config()
+    assert breaker.state(MEDIA) is CircuitState.open
+    breaker.circuits[MEDIA].opened -= 60
+    media_up = True
+    assert (await client.content_repository_config()).ok
+    assert breaker.state(MEDIA) is CircuitState.closed
+
+    exposition = metrics.registry.render()
+    assert (
+        'aiobaro_circuit_state{host="baro.local",family="media"} 0'
+        in exposition
+    )
+    assert (
+        'aiobaro_circuit_rejected_total{host="baro.local",family="media"} 1'
+        in exposition
+    )
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    circuit, probe = breaker.check(MEDIA)
+    assert not probe
+    breaker.failure(MEDIA, circuit, probe)
+    assert breaker.state(MEDIA) is CircuitState.open
+    circuit, probe = breaker.check(MEDIA)
+    assert probe and breaker.state(MEDIA) is CircuitState.half_open
+    with pytest.raises(CircuitOpenError):
+        breaker.check(MEDIA)
+    breaker.success(MEDIA, circuit, probe)
+    assert breaker.check(MEDIA) == (circuit, False)
+    assert circuit.state is CircuitState.closed
+
+
+def test_only_the_probe_closes_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    circuit, _ = breaker.check(MEDIA)
+    breaker.failure(MEDIA, circuit, False)
+    # a request let through before the circuit opened succeeds late
+    breaker.success(MEDIA, circuit, False)
+    assert breaker.state(MEDIA) is CircuitState.open
+    # nor does a late failure reopen the circuit of a running probe
+    circuit, probe = breaker.check(MEDIA)
+    breaker.failure(MEDIA, circuit, False)
+    assert breaker.state(MEDIA) is CircuitState.half_open
+    breaker.success(MEDIA, circuit, probe)
+    assert breaker.state(MEDIA) is CircuitState.closed
+
+
+@pytest.mark.asyncio
+async def test_probes_are_sent_on_a_timer():
+    media_up = False
+    probes = []
+
+    def handler(request):
+        probes.append(str(request.url))
+        if not media_up:
+            return httpx.Response(502)
+        return httpx.Response(200, json={})
+
+    breaker = CircuitBreaker(
+        failure_threshold=1,
+        reset_timeout=0.01,
+        transport=httpx.MockTransport(handler),
+    )
+    circuit, probe = breaker.check(MEDIA, "https://baro.local/_matrix/media/")
+    breaker.failure(MEDIA, circuit, probe)
+    assert breaker.state(MEDIA) is CircuitState.open
+
+    # without any traffic, failed probes keep it open until one succeeds
+    await asyncio.sleep(0.1)
+    assert breaker.state(MEDIA) is not CircuitState.closed
+    assert len(probes) > 1
+    assert probes[0] == "https://baro.local/_matrix/media/r0/config"
+    media_up = True
+    await asyncio.sleep(0.1)
+    assert breaker.state(MEDIA) is CircuitState.closed
+    sent = len(probes)
+    await asyncio.sleep(0.05)
+    assert len(probes) == sent
+    await breaker.aclose()
+    assert not breaker.probes
+
+
+@pytest.mark.asyncio
+async def test_streams_go_through_the_breaker():
+    requests = []
+
+    def handler(request):
+        requests.append(request.url.path)
+        return httpx.Response(503)
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    client = MatrixClient(
+        "http://baro.local",
+        access_token="token",
+        transport=httpx.MockTransport(handler),
+        metrics=None,
+        breaker=breaker,
+    )
+    with pytest.raises(httpx.HTTPStatusError):
+        async for _ in client.sync_stream(timeout=0):
+            pass
+    assert breaker.state(SYNC) is CircuitState.open
+    with pytest.raises(CircuitOpenError):
+        async for _ in client.sync_stream(timeout=0):
+            pass
+    with pytest.raises(CircuitOpenError):
+        async with client.stream("GET", "sync", access_token="token"):
+            pass
+    assert len(requests) == 1
+
+    breaker.circuits[SYNC].opened -= 60
+    with deadline(0), pytest.raises(DeadlineExceeded):
+        async with client.stream("GET", "sync", access_token="token"):
+            pass
+    assert len(requests) == 1
+    # the probe was not sent, another one may go
+    assert not breaker.circuits[SYNC].probing
@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from aiobaro.coalesce import MarkerCoalescer
+from aiobaro.core import MatrixClient
+
+
+@pytest.fixture
+def client(mock_client):
+    return mock_client(lambda request: httpx.Response(200, json={}))
+
+
+@pytest.mark.asyncio
+async def test_latest_value_wins(client, requests):
+    markers = MarkerCoalescer(client, interval=10)
+    for i in range(100):
+        markers.receipt("!a:baro", f"$event{i}")
+        markers.typing("!a:baro", "@bot:baro", typing_state=i % 2 == 0)
+    markers.receipt("!b:baro", "$other")
+    await markers.aclose()
+    assert sorted(requests) == [
+        (
+            "POST",
+            "/_matrix/client/r0/rooms/!a:baro/receipt/m.read/$event99",
+            {},
+        ),
+        ("POST", "/_matrix/client/r0/rooms/!b:baro/receipt/m.read/$other", {}),
+        (
+            "PUT",
+            "/_matrix/client/r0/rooms/!a:baro/typing/@bot:baro",
+            {"typing": False},
+        ),
+    ]
+    assert markers.updates == 201 and markers.requests == 3
+
+    # unchanged values are not sent again
+    markers.receipt("!b:baro", "$other")
+    await markers.aclose()
+    assert markers.requests == 3
+
+
+@pytest.mark.asyncio
+async def test_receipt_rides_along_read_markers(client, requests):
+    markers = MarkerCoalescer(client, interval=0.01)
+    markers.receipt("!a:baro", "$read")
+    markers.read_markers("!a:baro", "$fully_read")
+    await markers.aclose()
+    assert requests == [
+        (
+            "POST",
+            "/_matrix/client/r0/rooms/!a:baro/read_markers",
+            {"m.fully_read": "$fully_read", "m.read": "$read"},
+        )
+    ]
+
+    # the receipt sent along is not sent again on its own
+    markers.receipt("!a:baro", "$read")
+    await markers.aclose()
+    assert len(requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_updates_of_a_key_are_sent_in_order(mock_client):
+    sent = []
+
+    async def handler(request):
+        if request.url.path.endswith("$1"):
+            # the first request is slow, the second must wait for it
+            await asyncio.sleep(0.05)
+        sent.append(request.url.path.rsplit("/", 1)[1])
+        return httpx.Response(200, json={})
+
+    markers = MarkerCoalescer(mock_client(handler), interval=10)
+    markers.receipt("!a:baro", "$1")
+    markers.flush()
+    markers.receipt("!a:baro", "$2")
+    await markers.aclose()
+    assert sent == ["$1", "$2"]
+    assert markers.sent[("!a:baro", "receipt", "m.read")] == "$2"
+    assert not markers.latest
@@ -0,0 +1,51 @@
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from aiobaro.decoding import DecodePolicy
+from aiobaro.hooks import RequestHooks, RequestTrace
+from aiobaro.models import MatrixResponse
+
+BODY = {
+    "next_batch": "s1",
+    "rooms": {
+        "join": {
+            f"!room{i}:baro": {"timeline": {"events": [{"n": i}]}}
+            for i in range(50)
+        },
+        "leave": {},
+    },
+}
+
+
+@pytest.mark.asyncio
+async def test_decode_policy():
+    content = json.dumps(BODY).encode()
+    with ProcessPoolExecutor(1) as executor:
+        policy = DecodePolicy(threshold=100, executor=executor, slice=0)
+        assert policy.offloaded(content)
+        assert await policy.decode(content) == BODY
+    assert await DecodePolicy().decode(content) == BODY
+    assert await policy.decode(b"[1, 2]") == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_ajson():
+    decoded = []
+    trace = RequestTrace("GET", "sync", "http://baro.local")
+    response = MatrixResponse(
+        httpx.Response(200, json=BODY),
+        trace=trace,
+        hooks=RequestHooks(on_response_decoded=[decoded.append]),
+    )
+    with ThreadPoolExecutor(1) as executor:
+        policy = DecodePolicy(threshold=100, executor=executor)
+        body = await response.ajson(policy)
+    assert body == BODY
+    assert response.json() is body
+    assert decoded == [trace] and trace.context["offloaded"]
+
+    small = MatrixResponse(httpx.Response(200, json={"a": 1}))
+    assert await small.ajson(policy) == {"a": 1}
@@ -0,0 +1,59 @@
+import pytest
+
+from aiobaro.dedup import (
+    BloomFilter,
+    Deduplicator,
+    LRUSet,
+    RotatingBloomFilter,
+    response_events,
+)
+from aiobaro.events import Event
+
+
+def test_lru_set():
+    seen = LRUSet(capacity=2)
+    assert seen.add("$a") and seen.add("$b")
+    assert not seen.add("$a")
+    assert seen.add("$c")
+    assert "$a" in seen and "$b" not in seen and len(seen) == 2
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    # a new key may already collide with others
+    assert sum(bloom.add(f"$event{i}") for i in range(1000)) > 980
+    assert all(f"$event{i}" in bloom for i in range(1000))
+    false_positives = sum(f"$other{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+    assert not bloom.add("$event1")
+
+
+def test_rotating_bloom_filter():
+    bloom = RotatingBloomFilter(capacity=100, error_rate=0.001)
+    for i in range(250):
+        bloom.add(f"$event{i}")
+    assert all(f"$event{i}" in bloom for i in range(200, 250))
+    assert len(bloom.current.bits) == len(BloomFilter(100, 0.001).bits)
+    assert len(bloom) <= 200
+
+
+@pytest.mark.parametrize(
+    "seen", [None, RotatingBloomFilter(capacity=1000, error_rate=1e-6)]
+)
+def test_deduplicator(seen):
+    dedup = Deduplicator(seen)
+    timeline = [{"event_id": "$1"}, {"event_id": "$2"}, {"type": "m.typing"}]
+    context = {
+        "event": {"event_id": "$2"},
+        "events_before": [{"event_id": "$0"}],
+        "events_after": [{"event_id": "$3"}],
+    }
+    assert list(dedup.filter(timeline)) == timeline
+    assert [
+        event["event_id"] for event in dedup.filter(response_events(context))
+    ] == ["$0", "$3"]
+    event = Event.from_dict({"event_id": "$3", "type": "m.room.message"})
+    assert list(dedup.filter([event, {"type": "m.typing"}])) == [
+        {"type": "m.typing"}
+    ]
+    assert dedup.duplicates == 2
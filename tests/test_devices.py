@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from aiobaro.devices import DeviceListCache
+
+
+def keys_query(queries):
+    async def handler(request):
+        body = json.loads(request.content)
+        queries.append(sorted(body["device_keys"]))
+        await asyncio.sleep(0.01)
+        return httpx.Response(
+            200,
+            json={
+                "device_keys": {
+                    user: {
+                        "DEV": {
+                            "keys": {"ed25519:DEV": f"{user}:{len(queries)}"}
+                        }
+                    }
+                    for user in body["device_keys"]
+                    if not user.endswith(":down")
+                },
+                "failures": {"down": {}},
+            },
+        )
+
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_device_list_cache(tmp_path, mock_client):
+    queries = []
+    path = str(tmp_path / "devices.json")
+    cache = DeviceListCache(
+        mock_client(keys_query(queries)), path, batch_size=2
+    )
+    users = ["@a:baro", "@b:baro", "@c:baro", "@d:down"]
+    first, second = await asyncio.gather(cache.get(users), cache.get(users))
+    assert first == second and sorted(first) == users[:3]
+    # two batches, shared by both calls
+    assert queries == [["@a:baro", "@b:baro"], ["@c:baro", "@d:down"]]
+
+    await cache.get(users[:3])
+    assert len(queries) == 2
+
+    cache.update(
+        {
+            "next_batch": "s2",
+            "device_lists": {"changed": ["@a:baro"], "left": ["@c:baro"]},
+        }
+    )
+    assert cache.outdated == {"@a:baro"} and "@c:baro" not in cache
+    cache.save()
+
+    restarted = DeviceListCache(mock_client(keys_query(queries)), path)
+    assert restarted.token == "s2" and restarted.outdated == {"@a:baro"}
+    await restarted.refresh()
+    assert queries[-1] == ["@a:baro"] and not restarted.outdated
+
+
+@pytest.mark.asyncio
+async def test_leave_during_query(mock_client):
+    queries = []
+    cache = DeviceListCache(mock_client(keys_query(queries)))
+    get = asyncio.ensure_future(cache.get(["@a:baro", "@b:baro"]))
+    await asyncio.sleep(0)
+    assert "@a:baro" in cache.inflight
+    cache.update({"device_lists": {"left": ["@a:baro"]}})
+    assert sorted(await get) == ["@b:baro"]
+    assert "@a:baro" not in cache and not cache.left
+
+    # queried again if asked for after leaving
+    assert sorted(await cache.get(["@a:baro"])) == ["@a:baro"]
+
+
+@pytest.mark.asyncio
+async def test_change_during_query(mock_client):
+    queries = []
+    cache = DeviceListCache(mock_client(keys_query(queries)))
+    get = asyncio.ensure_future(cache.get(["@a:baro", "@b:baro"]))
+    await asyncio.sleep(0)
+    cache.update({"device_lists": {"changed": ["@a:baro", "@z:baro"]}})
+    await get
+    # the answer may predate the change
+    assert cache.outdated == {"@a:baro"}
+    # only users being queried are counted, and not past their query
+    assert not cache.changes
+    await cache.refresh()
+    assert queries[-1] == ["@a:baro"] and not cache.outdated
+    assert not cache.changes and not cache.inflight
+
+
+@pytest.mark.asyncio
+async def test_keys_claim(mock_client, requests):
+    client = mock_client(
+        lambda request: httpx.Response(200, content=request.content)
+    )
+    response = await client.keys_claim({"@a:baro": ["DEV"]})
+    assert requests[0][1].endswith("/keys/claim")
+    assert response.json()["one_time_keys"] == {
+        "@a:baro": {"DEV": "signed_curve25519"}
+    }
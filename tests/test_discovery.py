@@ -0,0 +1,85 @@
+import json
+
+import httpx
+import pytest
+
+from aiobaro import discovery
+from aiobaro.discovery import ServerInfo, connect, discover
+
+
+def make_transport(requests, versions=("r0.6.1", "v1.1"), down=False):
+    def handler(request):
+        requests.append(request.url.path)
+        if down:
+            return httpx.Response(503)
+        if request.url.path == "/.well-known/matrix/client":
+            return httpx.Response(
+                200, json={"m.homeserver": {"base_url": "https://hs.baro/"}}
+            )
+        assert request.url.host == "hs.baro"
+        if request.url.path == "/_matrix/client/versions":
+            return httpx.Response(
+                200,
+                json={
+                    "versions": list(versions),
+                    "unstable_features": {"org.matrix.msc2432": True},
+                },
+            )
+        if request.url.path == "/_matrix/client/v3/capabilities":
+            return httpx.Response(
+                200, json={"capabilities": {"m.change_password": {}}}
+            )
+        return httpx.Response(200, json={"user_id": "@bot:baro"})
+
+    return httpx.MockTransport(handler)
+
+
+def test_version_negotiation():
+    def info(*versions):
+        return ServerInfo("https://hs", list(versions), {}, {}, 0.0)
+
+    assert info("r0.5.0", "r0.6.1").version == "r0"
+    assert info("r0.6.1", "v1.1", "v1.2").version == "v3"
+    assert info().version == "r0"
+
+
+@pytest.mark.asyncio
+async def test_discover_and_cache(tmp_path):
+    path = str(tmp_path / "servers.json")
+    requests = []
+    info = await discover(
+        "baro", path, access_token="token", transport=make_transport(requests)
+    )
+    assert info.homeserver == "https://hs.baro"
+    assert info.version == "v3"
+    assert info.supports("org.matrix.msc2432")
+    assert info.capabilities == {"m.change_password": {}}
+    assert requests == [
+        "/.well-known/matrix/client",
+        "/_matrix/client/versions",
+        "/_matrix/client/v3/capabilities",
+    ]
+
+    # a new process reads the cache instead
+    requests.clear()
+    client = await connect(
+        "baro", path, access_token="token", transport=make_transport(requests)
+    )
+    assert requests == []
+    await client.whoami()
+    assert requests == ["/_matrix/client/v3/account/whoami"]
+
+    # expired, discovery failing: the cached entry is still used
+    cached = await discover(
+        "baro", path, ttl=0, transport=make_transport(requests, down=True)
+    )
+    assert cached == info
+    with open(path) as cache:
+        assert list(json.load(cache)["servers"]) == ["baro"]
+
+
+@pytest.mark.asyncio
+async def test_discover_without_cache_raises(tmp_path):
+    with pytest.raises(httpx.HTTPStatusError):
+        await discover("baro", transport=make_transport([], down=True))
+    assert discovery.load(str(tmp_path / "missing.json")) == {}
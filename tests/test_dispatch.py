@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from aiobaro.dedup import Deduplicator
+from aiobaro.dispatch import Dispatcher
+from aiobaro.events import Event
+
+
+def message(event_id, sender="@alice:baro"):
+    return {"event_id": event_id, "type": "m.room.message", "sender": sender}
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_matching():
+    dispatcher = Dispatcher()
+    calls = []
+
+    @dispatcher.on("m.room.message")
+    def any_message(room_id, event):
+        calls.append(("any", room_id, event["event_id"]))
+
+    @dispatcher.on("m.room.message", room_id="!a:baro", sender="@bob:baro")
+    async def bob_in_a(room_id, event):
+        calls.append(("bob", room_id, event["event_id"]))
+
+    dispatcher.add_handler(lambda room_id, event: calls.append(("all",)))
+
+    assert dispatcher.dispatch("!a:baro", message("$1", "@bob:baro"))
+    assert dispatcher.dispatch("!b:baro", message("$2", "@bob:baro"))
+    await dispatcher.join()
+    assert calls == [
+        ("any", "!a:baro", "$1"),
+        ("bob", "!a:baro", "$1"),
+        ("all",),
+        ("any", "!b:baro", "$2"),
+        ("all",),
+    ]
+
+    dispatcher.remove_handler(any_message, "m.room.message")
+    assert dispatcher.match("m.room.message", "!b:baro", "@bob:baro") == [
+        dispatcher.index[(None, None, None)][0][1]
+    ]
+    assert not dispatcher.workers and not dispatcher.queues
+
+
+def test_dispatcher_roomless_events():
+    dispatcher = Dispatcher()
+
+    @dispatcher.on("m.presence")
+    def presence(room_id, event):
+        pass
+
+    @dispatcher.on("m.presence", room_id="!a:baro")
+    def presence_in_a(room_id, event):
+        pass
+
+    @dispatcher.on(sender="@bob:baro")
+    def from_bob(room_id, event):
+        pass
+
+    # a scope on a missing field must not fall back to the unscoped key
+    assert dispatcher.match("m.presence", None, "@bob:baro") == [
+        presence,
+        from_bob,
+    ]
+    assert dispatcher.match("m.presence", None, None) == [presence]
+    assert dispatcher.match("m.presence", "!a:baro", None) == [
+        presence,
+        presence_in_a,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_ordering():
+    dispatcher = Dispatcher(dedup=Deduplicator())
+    handled = []
+
+    @dispatcher.on("m.room.message")
+    async def slow(room_id, event):
+        # later events of the first room are slower
+        await asyncio.sleep(0.01 if room_id == "!a:baro" else 0)
+        handled.append((room_id, event.event_id))
+        if event.event_id == "$a2":
+            raise ValueError("boom")
+
+    body = {
+        "rooms": {
+            "join": {
+                room_id: {
+                    "timeline": {
+                        "events": [
+                            message(f"${room_id[1]}{i}") for i in range(3)
+                        ]
+                    }
+                }
+                for room_id in ("!a:baro", "!b:baro")
+            }
+        }
+    }
+    events = [
+        (room_id, Event.from_dict(event))
+        for room_id, room in body["rooms"]["join"].items()
+        for event in room["timeline"]["events"]
+    ]
+    for room_id, event in events + events:
+        dispatcher.dispatch(room_id, event)
+    await dispatcher.join()
+    assert [e for e in handled if e[0] == "!a:baro"] == [
+        ("!a:baro", "$a0"),
+        ("!a:baro", "$a1"),
+        ("!a:baro", "$a2"),
+    ]
+    # the second room did not wait for the first one
+    assert handled[:3] == [("!b:baro", f"$b{i}") for i in range(3)]
+    assert [str(error) for _, error in dispatcher.errors] == ["boom"]
+    assert dispatcher.feed(body) == 0
@@ -0,0 +1,86 @@
+import sys
+
+import httpx
+import pytest
+
+from aiobaro.core import MatrixClient
+from aiobaro.events import Event
+from aiobaro.sync import iter_events
+
+RAW = {
+    "event_id": "$143273582443PhrSn:baro",
+    "type": "m.room.message",
+    "sender": "@alice:baro",
+    "origin_server_ts": 1432735824653,
+    "content": {"msgtype": "m.text", "body": "Hello"},
+    "unsigned": {"age": 1234},
+}
+
+
+def test_event_from_dict():
+    event = Event.from_dict(RAW, "!room:baro")
+    assert (event.event_id, event.type, event.room_id) == (
+        RAW["event_id"],
+        "m.room.message",
+        "!room:baro",
+    )
+    assert not event.is_state
+    assert event.content is RAW["content"]
+    assert event.compact() is event
+    assert isinstance(event._content, bytes)
+    assert event.content == RAW["content"]
+    assert event.content is event.content
+    assert event.extra == {"unsigned": {"age": 1234}}
+    assert event.to_dict() == {**RAW, "room_id": "!room:baro"}
+    assert not hasattr(event, "__dict__")
+
+
+def test_event_interning():
+    sender = "".join(["@alice", ":baro"])
+    first = Event.from_dict({**RAW, "sender": sender})
+    second = Event.from_dict({**RAW, "sender": sys.intern("@alice:baro")})
+    assert first.sender is second.sender
+
+
+def test_event_init():
+    event = Event(
+        None, "m.room.topic", "@alice:baro", state_key="", content={"t": 1}
+    )
+    assert event.is_state
+    assert event == Event.from_dict(event.to_dict())
+    assert event.to_dict() == {
+        "type": "m.room.topic",
+        "sender": "@alice:baro",
+        "state_key": "",
+        "content": {"t": 1},
+    }
+
+
+def test_typed_sync_events():
+    body = {
+        "to_device": {"events": [{"type": "m.dummy", "sender": "@b:baro"}]},
+        "rooms": {"join": {"!room:baro": {"timeline": {"events": [RAW]}}}},
+    }
+    events = [event for _, _, event in iter_events(body, typed=True)]
+    assert all(isinstance(event, Event) for event in events)
+    assert events[0].room_id is None and events[0].content == {}
+    assert events[1].room_id == "!room:baro"
+    assert events[1].content is RAW["content"]
+
+
+@pytest.mark.asyncio
+async def test_room_get_event():
+    client = MatrixClient(
+        "http://baro.local",
+        access_token="token",
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(
+                200, json={**RAW, "room_id": "!room:baro"}
+            )
+        ),
+        metrics=None,
+    )
+    response = await client.room_get_event("!room:baro", RAW["event_id"])
+    event = response.event()
+    assert event.room_id == "!room:baro"
+    assert event.extra == {"unsigned": {"age": 1234}}
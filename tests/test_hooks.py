@@ -0,0 +1,67 @@
+import httpx
+import pytest
+
+from aiobaro.core import MatrixClient
+from aiobaro.hooks import RequestHooks, endpoint_template
+
+
+def test_endpoint_template():
+    assert (
+        endpoint_template("rooms/!room:baro/send/m.room.message/txn1")
+        == "rooms/{roomId}/send/{eventType}/{txnId}"
+    )
+    assert (
+        endpoint_template("rooms/!room:baro/state/m.room.topic/")
+        == "rooms/{roomId}/state/{eventType}/{stateKey}"
+    )
+    assert endpoint_template("/sync") == "sync"
+    assert endpoint_template("unknown/path") == "other"
+
+
+@pytest.mark.asyncio
+async def test_request_hooks():
+    events = []
+    hooks = RequestHooks(
+        on_request_start=[lambda trace: events.append(("start", trace))],
+        on_request_end=[lambda trace: events.append(("end", trace))],
+        on_response_decoded=[lambda trace: events.append(("decode", trace))],
+    )
+    client = MatrixClient(
+        "http://baro.local",
+        access_token="token",
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, json={"event_id": "$e"})
+        ),
+        hooks=hooks,
+    )
+    response = await client.room_send(
+        "!room:baro", "m.room.message", {"body": "hello"}, "txn1"
+    )
+    assert [name for name, _ in events] == ["start", "end"]
+    trace = events[-1][1]
+    assert trace.endpoint == "rooms/{roomId}/send/{eventType}/{txnId}"
+    assert trace.status_code == 200
+    assert trace.request_bytes > 0
+    assert trace.response_bytes == len(response.response.content)
+    assert set(trace.phases) == {"encode", "wait", "read"}
+
+    assert response.json() == response.json() == {"event_id": "$e"}
+    assert [name for name, _ in events] == ["start", "end", "decode"]
+    assert "decode" in trace.phases
+
+
+@pytest.mark.asyncio
+async def test_request_hooks_on_error():
+    def fail(request):
+        raise httpx.ConnectError("unreachable", request=request)
+
+    ended = []
+    client = MatrixClient(
+        "http://baro.local",
+        transport=httpx.MockTransport(fail),
+        hooks=RequestHooks(on_request_end=[ended.append]),
+    )
+    with pytest.raises(httpx.ConnectError):
+        await client.login_info()
+    assert isinstance(ended[0].error, httpx.ConnectError)
+    assert ended[0].status_code is None
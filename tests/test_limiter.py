@@ -0,0 +1,107 @@
+import asyncio
+
+import httpx
+import pytest
+
+from aiobaro.core import MatrixClient
+from aiobaro.limiter import AdaptiveLimiter
+
+
+def test_aimd():
+    limiter = AdaptiveLimiter(initial=10, window=1000)
+    for _ in range(100):
+        limiter.inflight = 10
+        limiter.release(0.01)
+    assert 10 < limiter.limit < 20
+
+    # a burst of errors within one baseline latency counts once
+    grown = limiter.limit
+    for _ in range(10):
+        limiter.inflight = 1
+        limiter.release(0.01, overloaded=True)
+    assert limiter.limit == pytest.approx(grown * 0.9)
+
+    # latency climbing is backing off too
+    limiter.decreased = 0.0
+    limiter.inflight = 1
+    limiter.release(0.05)
+    assert limiter.limit == pytest.approx(grown * 0.81)
+
+    # an unused limit does not grow
+    limit = limiter.limit
+    limiter.inflight = 1
+    limiter.release(0.01)
+    assert limiter.limit == limit
+
+
+@pytest.mark.asyncio
+async def test_client_is_limited():
+    running = []
+    statuses = iter([200] * 10 + [503] * 10)
+
+    async def handler(request):
+        running.append(len(running) + 1)
+        await asyncio.sleep(0.01)
+        running.pop()
+        if request.url.path.endswith("/sync"):
+            return httpx.Response(200, json={})
+        return httpx.Response(next(statuses), json={})
+
+    seen = []
+
+    async def track():
+        while True:
+            seen.append(len(running))
+            await asyncio.sleep(0.001)
+
+    limiter = AdaptiveLimiter(initial=3, max_limit=3)
+    client = MatrixClient(
+        "http://baro.local",
+        access_token="token",
+        transport=httpx.MockTransport(handler),
+        metrics=None,
+        limiter=limiter,
+    )
+    tracker = asyncio.ensure_future(track())
+    await asyncio.gather(*(client.joined_rooms() for _ in range(20)))
+    tracker.cancel()
+    assert max(seen) == 3
+    assert limiter.inflight == 0 and limiter.limit < 3
+
+    # syncs are not limited
+    limiter.set_limit(1)
+    assert not limiter.applies("sync")
+    await asyncio.gather(*(client.sync(timeout=0) for _ in range(3)))
+    assert limiter.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_frees_its_place():
+    limiter = AdaptiveLimiter(initial=1)
+    await limiter.acquire()
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert not limiter.waiters
+    limiter.release(None)
+    assert limiter.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_during_hand_off():
+    limiter = AdaptiveLimiter(initial=1, min_limit=1, max_limit=1)
+    await limiter.acquire()
+    cancelled = asyncio.ensure_future(limiter.acquire())
+    other = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    # the slot goes past the cancelled waiter, before it runs again
+    limiter.release(None)
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    await other
+    assert limiter.inflight == 1 and not limiter.waiters
+    limiter.release(None)
+    assert limiter.inflight == 0
@@ -0,0 +1,61 @@
+import pytest
+
+from aiobaro import loadtest
+
+
+def test_percentile():
+    ordered = [float(i) for i in range(1, 101)]
+    assert loadtest.percentile(ordered, 50) == 50.0
+    assert loadtest.percentile(ordered, 99) == 99.0
+    assert loadtest.percentile([], 95) == 0.0
+
+
+def test_parse_mix():
+    assert loadtest.parse_mix(["room_send=3", "sync"]) == {
+        "room_send": 3,
+        "sync": 1,
+    }
+    with pytest.raises(ValueError):
+        loadtest.parse_mix(["unknown=1"])
+    with pytest.raises(ValueError):
+        loadtest.parse_mix(["sync=-1"])
+    with pytest.raises(ValueError):
+        loadtest.parse_mix(["sync=0"])
+
+
+@pytest.mark.asyncio
+async def test_run_level_against_local_homeserver():
+    transport = loadtest.local_homeserver(latency=0)
+    accounts = await loadtest.setup_accounts(
+        "http://loadtest.local", 2, "password", transport=transport
+    )
+    assert all(account.room_id for account in accounts)
+
+    stats = await loadtest.run_level(
+        accounts, loadtest.DEFAULT_MIX, concurrency=4, duration=0.2
+    )
+    assert set(stats) == set(loadtest.DEFAULT_MIX)
+    assert sum(row["requests"] for row in stats.values())
+    assert not sum(row["errors"] for row in stats.values())
+
+
+@pytest.mark.asyncio
+async def test_run_level_counts_unexpected_errors(monkeypatch):
+    transport = loadtest.local_homeserver(latency=0)
+    accounts = await loadtest.setup_accounts(
+        "http://loadtest.local", 1, "password", transport=transport
+    )
+
+    async def broken(account):
+        raise KeyError("content_uri")
+
+    monkeypatch.setitem(loadtest.OPERATIONS, "upload", broken)
+    stats = await loadtest.run_level(
+        accounts,
+        {"upload": 1, "sync": 1, "download": 0},
+        concurrency=2,
+        duration=0.1,
+    )
+    assert stats["upload"]["errors"] == stats["upload"]["requests"] > 0
+    assert stats["sync"]["requests"] and not stats["sync"]["errors"]
+    assert "download" not in stats
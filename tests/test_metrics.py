@@ -0,0 +1,71 @@
+import httpx
+import pytest
+
+from aiobaro.core import MatrixClient
+from aiobaro.metrics import ClientMetrics, MetricsRegistry, sync_lag
+
+
+def test_registry_render():
+    registry = MetricsRegistry()
+    counter = registry.counter("sent_total", "Sent.", ["room"])
+    counter.inc("!a:baro")
+    counter.inc("!a:baro", amount=2)
+    histogram = registry.histogram(
+        "latency_seconds", "Latency.", buckets=(0.1, 1.0)
+    )
+    histogram.observe(value=0.1)
+    histogram.observe(value=5)
+
+    text = registry()
+    assert 'sent_total{room="!a:baro"} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+    assert "latency_seconds_sum 5.1" in text
+    assert "latency_seconds_count 2" in text
+    assert registry.counter("sent_total", "Sent.", ["room"]) is counter
+
+
+def test_sync_lag():
+    body = {
+        "rooms": {
+            "join": {
+                "!a:baro": {
+                    "timeline": {"events": [{"origin_server_ts": 1000}]}
+                }
+            }
+        }
+    }
+    assert sync_lag(body, now=3.5) == 2.5
+    assert sync_lag({}, now=3.5) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_client_metrics():
+    registry = MetricsRegistry()
+    statuses = iter([200, 429])
+    client = MatrixClient(
+        "http://baro.local",
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(next(statuses), json={})
+        ),
+        metrics=ClientMetrics(registry),
+    )
+    await client.profile_get("@user:baro")
+    response = await client.profile_get("@user:baro")
+    response.json()
+
+    text = registry.render()
+    for status in ("2xx", "4xx"):
+        assert (
+            'aiobaro_requests_total{endpoint="profile/{userId}",'
+            f'method="GET",status="{status}"}} 1'
+        ) in text
+    assert (
+        'aiobaro_request_duration_seconds_count{endpoint="profile/{userId}",'
+        'status="2xx"} 1'
+    ) in text
+    assert (
+        'aiobaro_response_decode_seconds_count{endpoint="profile/{userId}"} 1'
+    ) in text
+    assert 'aiobaro_requests_in_flight{endpoint="profile/{userId}"} 0' in text
@@ -0,0 +1,108 @@
+import json
+
+import httpx
+import pytest
+
+from aiobaro.metrics import ClientMetrics, MetricsRegistry
+from aiobaro.pool import SessionPool, TokenBucket
+
+
+def homeserver(state):
+    def handler(request):
+        path = request.url.path
+        if path.endswith("/login"):
+            user = json.loads(request.read())["identifier"]["user"]
+            state["logins"].append(user)
+            return httpx.Response(
+                200,
+                json={
+                    "access_token": f"{user}_{len(state['logins'])}",
+                    "device_id": "DEVICE",
+                },
+            )
+        token = httpx.QueryParams(request.url.query)["access_token"]
+        state["tokens"].append(token)
+        if token in state["expired"]:
+            return httpx.Response(401, json={"errcode": "M_UNKNOWN_TOKEN"})
+        if state["limited"]:
+            state["limited"] -= 1
+            return httpx.Response(
+                429, json={"errcode": "M_LIMIT_EXCEEDED", "retry_after_ms": 1}
+            )
+        return httpx.Response(200, json={"user_id": token})
+
+    return httpx.MockTransport(handler)
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.delay() == 0
+    assert bucket.delay() == 0
+    assert 0.09 < bucket.delay() <= 0.1
+    bucket.pause(5)
+    assert bucket.delay() > 4
+
+
+@pytest.mark.asyncio
+async def test_session_pool():
+    state = {"logins": [], "tokens": [], "expired": set(), "limited": 0}
+    registry = MetricsRegistry()
+    async with SessionPool(
+        "http://baro.local",
+        transport=homeserver(state),
+        metrics=ClientMetrics(registry),
+    ) as pool:
+        pool.add("alice", password="secret")
+        pool.add("bob", access_token="bob_token")
+        assert len(pool) == 2
+
+        # lazy login, then the token is reused
+        await pool.call("alice", "whoami")
+        await pool.call("alice", "whoami")
+        assert state["logins"] == ["alice"]
+        assert state["tokens"] == ["alice_1", "alice_1"]
+
+        # accounts share the connection pool, not their tokens
+        clients = [await pool.client(user) for user in pool]
+        assert clients[0].http_client is clients[1].http_client
+        response = await pool.call("bob", "whoami")
+        assert response.json()["user_id"] == "bob_token"
+
+        # rejected tokens trigger a new login
+        state["expired"].add("alice_1")
+        response = await pool.call("alice", "whoami")
+        assert response.ok
+        assert state["logins"] == ["alice", "alice"]
+        assert state["tokens"][-1] == "alice_2"
+
+        # server side rate limiting is retried
+        state["limited"] = 2
+        response = await pool.call("alice", "whoami")
+        assert response.ok
+
+    text = registry.render()
+    assert "aiobaro_pool_sessions 2" in text
+    assert 'aiobaro_rate_limit_wait_seconds_count{source="server"} 2' in text
+    assert "aiobaro_pool_max_connections 0" in text
+
+
+@pytest.mark.asyncio
+async def test_session_pool_leaves_a_shared_client_open():
+    registry = MetricsRegistry()
+    state = {"logins": [], "tokens": [], "expired": set(), "limited": 0}
+    async with httpx.AsyncClient(transport=homeserver(state)) as shared:
+        async with SessionPool(
+            "http://baro.local",
+            http_client=shared,
+            metrics=ClientMetrics(registry),
+        ) as pool:
+            pool.add("bob", access_token="bob_token")
+            assert (await pool.call("bob", "whoami")).ok
+        # still usable by its owner
+        response = await shared.get(
+            "http://baro.local/whoami", params={"access_token": "owner"}
+        )
+        assert response.json() == {"user_id": "owner"}
+        assert not shared.is_closed
+    # the connections of a shared client are not the pool's
+    assert "aiobaro_pool_max_connections 0" in registry.render()
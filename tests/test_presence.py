@@ -0,0 +1,143 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from aiobaro.cache import TTLCache
+from aiobaro.core import MatrixClient
+from aiobaro.models import Presence
+from aiobaro.presence import PresenceManager
+
+
+def presence_handler(request):
+    if request.method == "GET":
+        if "nobody" in request.url.path:
+            return httpx.Response(404, json={"errcode": "M_NOT_FOUND"})
+        return httpx.Response(
+            200, json={"presence": "online", "last_active_ago": 10}
+        )
+    return httpx.Response(200, json={})
+
+
+@pytest.fixture
+def client(mock_client):
+    return mock_client(presence_handler)
+
+
+def test_ttl_cache_expiry_and_eviction():
+    now = [0.0]
+    cache = TTLCache(10, maxsize=2, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    # "b" was the least recently used
+    assert "b" not in cache and "a" in cache and "c" in cache
+    now[0] = 10.0
+    assert cache.get("a") is None and len(cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_set_is_throttled(client, requests):
+    presence = PresenceManager(client, "@bot:baro", refresh=60)
+    assert (await presence.set(Presence.online)).ok
+    for _ in range(10):
+        assert await presence.set(Presence.online) is None
+    assert presence.suppressed == 10
+    await presence.set(Presence.online, "busy")
+    await presence.set("unavailable", "busy")
+    assert requests == [
+        (
+            "PUT",
+            "/_matrix/client/r0/presence/@bot:baro/status",
+            {"presence": "online"},
+        ),
+        (
+            "PUT",
+            "/_matrix/client/r0/presence/@bot:baro/status",
+            {"presence": "online", "status_msg": "busy"},
+        ),
+        (
+            "PUT",
+            "/_matrix/client/r0/presence/@bot:baro/status",
+            {"presence": "unavailable", "status_msg": "busy"},
+        ),
+    ]
+
+    # renewed before the server expires it
+    presence.last_sent -= 60
+    assert await presence.set("unavailable", "busy") is not None
+    assert len(requests) == 4
+
+
+@pytest.mark.asyncio
+async def test_concurrent_sets_are_deduplicated(mock_client, requests):
+    async def handler(request):
+        await asyncio.sleep(0.01)
+        return httpx.Response(500 if failing else 200, json={})
+
+    failing = False
+
+    client = mock_client(handler)
+    presence = PresenceManager(client, "@bot:baro")
+    responses = await asyncio.gather(
+        *(presence.set(Presence.online) for _ in range(5))
+    )
+    assert len(requests) == 1 and presence.suppressed == 4
+    assert responses.count(None) == 4
+
+    # a failed update is not taken for sent
+    failing = True
+    assert not (await presence.set(Presence.unavailable)).ok
+    failing = False
+    assert (await presence.set(Presence.unavailable)).ok
+    assert len(requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_empty_presence_is_cached(client, requests):
+    presence = PresenceManager(client, "@bot:baro")
+    presence.store("@quiet:baro", {})
+    assert await presence.get_many(["@quiet:baro"]) == {"@quiet:baro": {}}
+    assert requests == []
+
+
+@pytest.mark.asyncio
+async def test_get_from_sync_and_bulk(client, requests):
+    presence = PresenceManager(client, "@bot:baro")
+    presence.update(
+        {
+            "presence": {
+                "events": [
+                    {
+                        "type": "m.presence",
+                        "sender": "@alice:baro",
+                        "content": {
+                            "presence": "unavailable",
+                            "last_active_ago": 1000,
+                        },
+                    }
+                ]
+            }
+        }
+    )
+    alice = await presence.get("@alice:baro")
+    assert alice["presence"] == "unavailable"
+    assert alice["last_active_ago"] >= 1000
+    assert requests == []
+
+    found = await presence.get_many(
+        ["@alice:baro", "@bob:baro", "@carol:baro", "@nobody:baro"]
+    )
+    assert found["@alice:baro"]["presence"] == "unavailable"
+    assert found["@bob:baro"]["presence"] == "online"
+    assert found["@nobody:baro"] is None
+    assert sorted(path for _, path, _ in requests) == [
+        "/_matrix/client/r0/presence/@bob:baro/status",
+        "/_matrix/client/r0/presence/@carol:baro/status",
+        "/_matrix/client/r0/presence/@nobody:baro/status",
+    ]
+
+    await presence.get_many(["@bob:baro", "@carol:baro"])
+    assert presence.queries == 3
@@ -0,0 +1,118 @@
+import asyncio
+
+import httpx
+import pytest
+
+from aiobaro.core import MatrixClient
+from aiobaro.limiter import AdaptiveLimiter
+from aiobaro.models import Priority
+from aiobaro.priority import PRIORITY, PriorityScheduler, priority
+
+
+def test_bulk_keeps_its_share():
+    scheduler = PriorityScheduler(bulk_share=0.25)
+    loop = asyncio.new_event_loop()
+    try:
+        waiters = {}
+        for level in (Priority.bulk, Priority.normal, Priority.interactive):
+            for i in range(6):
+                waiter = loop.create_future()
+                waiters[waiter] = f"{level.value[0]}{i}"
+                scheduler.append(waiter, level)
+        served = [waiters[scheduler.popleft()] for _ in range(18)]
+    finally:
+        loop.close()
+    assert served == [
+        "i0", "i1", "i2", "b0",
+        "i3", "i4", "i5", "b1",
+        "n0", "n1", "n2", "b2",
+        "n3", "n4", "n5", "b3",
+        "b4", "b5",
+    ]  # fmt: skip
+    assert not scheduler
+
+
+@pytest.mark.parametrize("share", [0.3, 0.7, 1 / 3])
+def test_bulk_share_not_one_over_n(share):
+    scheduler = PriorityScheduler(bulk_share=share)
+    loop = asyncio.new_event_loop()
+    try:
+        bulk = set()
+        for i in range(100):
+            waiter = loop.create_future()
+            bulk.add(waiter)
+            scheduler.append(waiter, Priority.bulk)
+            scheduler.append(loop.create_future(), Priority.interactive)
+        served = [scheduler.popleft() in bulk for _ in range(100)]
+    finally:
+        loop.close()
+    assert sum(served) == int(100 * share)
+    # spread out, not served in bursts
+    assert sum(served[:10]) == int(10 * share)
+
+
+def test_cancelled_waiters_are_skipped():
+    scheduler = PriorityScheduler(bulk_share=0.5)
+    loop = asyncio.new_event_loop()
+    try:
+        names = {}
+        for name, level in [
+            ("b0", Priority.bulk),
+            ("b1", Priority.bulk),
+            ("i0", Priority.interactive),
+            ("i1", Priority.interactive),
+        ]:
+            waiter = loop.create_future()
+            names[waiter] = name
+            scheduler.append(waiter, level)
+        cancelled = next(iter(names))
+        cancelled.cancel()
+        served = [names[scheduler.popleft()] for _ in range(3)]
+        # taken out by wake() already, as acquire() gets to it
+        scheduler.remove(cancelled)
+    finally:
+        loop.close()
+    assert served == ["i0", "b1", "i1"]
+    assert not scheduler
+
+
+def test_priority_context():
+    assert PRIORITY.get() is Priority.normal
+    with priority("bulk"):
+        assert PRIORITY.get() is Priority.bulk
+        with priority(Priority.interactive):
+            assert PRIORITY.get() is Priority.interactive
+    assert PRIORITY.get() is Priority.normal
+
+
+@pytest.mark.asyncio
+async def test_interactive_requests_skip_the_bulk_queue():
+    order = []
+
+    async def handler(request):
+        await asyncio.sleep(0.005)
+        order.append(httpx.QueryParams(request.url.query).get("tag"))
+        return httpx.Response(200, json={})
+
+    client = MatrixClient(
+        "http://baro.local",
+        access_token="token",
+        transport=httpx.MockTransport(handler),
+        metrics=None,
+        limiter=AdaptiveLimiter(initial=1, min_limit=1, max_limit=1),
+    )
+
+    async def request(tag, level):
+        with priority(level):
+            await client.auth_client(
+                "GET", "joined_rooms", params={"tag": tag}
+            )
+
+    bulk = [
+        asyncio.ensure_future(request(f"bulk{i}", Priority.bulk))
+        for i in range(20)
+    ]
+    await asyncio.sleep(0.02)
+    await request("reply", Priority.interactive)
+    await asyncio.gather(*bulk)
+    assert order.index("reply") < 8
@@ -0,0 +1,99 @@
+import httpx
+import pytest
+
+from aiobaro.admin import MatrixAdminClient
+from aiobaro.core import MatrixClient
+from aiobaro.routing import Route, RoutingTable, Upstream, endpoint_family
+
+
+def test_endpoint_family():
+    assert endpoint_family("sync") == "sync"
+    assert endpoint_family("rooms/!a:baro/send/m.room.message/1") == "send"
+    assert endpoint_family("sendToDevice/m.room_key/1") == "send"
+    assert endpoint_family("rooms/!a:baro/state/m.room.name/") == "state"
+    assert endpoint_family("rooms/!a:baro/state") == "state"
+    assert endpoint_family("joined_rooms") == "client"
+    assert endpoint_family("upload", "https://baro/_matrix/media/r0/") == (
+        "media"
+    )
+    assert endpoint_family("users", "https://baro/_synapse/admin/v2/") == (
+        "admin"
+    )
+
+
+def test_weighted_round_robin():
+    route = Route([Upstream("a", 3, None), Upstream("b", 1, None)])
+    picks = [route.pick().base_url for _ in range(8)]
+    assert picks == ["a", "a", "b", "a"] * 2
+
+
+def test_route_weights():
+    route = Route([Upstream("a", 1, None), Upstream("b", 0, None)])
+    assert {route.pick().base_url for _ in range(4)} == {"a"}
+    with pytest.raises(ValueError):
+        Route([Upstream("a", 0, None)])
+    with pytest.raises(ValueError):
+        Route([Upstream("a", 1, None), Upstream("b", -1, None)])
+    transport = httpx.MockTransport(lambda request: httpx.Response(200))
+    with pytest.raises(ValueError):
+        RoutingTable({"send": [("https://a.baro", 0)]}, transport=transport)
+    table = RoutingTable(
+        {"send": [("https://a.baro", 0), "https://b.baro"]},
+        transport=transport,
+    )
+    assert [u.base_url for u in table.routes["send"].upstreams] == [
+        "https://b.baro"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_client_routes_by_family():
+    hosts = []
+
+    def handler(request):
+        hosts.append((request.url.host, request.url.path))
+        return httpx.Response(200, json={})
+
+    transport = httpx.MockTransport(handler)
+    async with RoutingTable(
+        {
+            "sync": "http://sync.baro",
+            "send": ["http://events1.baro/", "http://events2.baro"],
+            "admin": "http://admin.baro",
+        },
+        transport=transport,
+    ) as router:
+        client = MatrixClient(
+            "http://baro.local",
+            access_token="token",
+            transport=transport,
+            metrics=None,
+            router=router,
+        )
+        await client.sync(timeout=0)
+        async with client.stream("GET", "sync", access_token="token"):
+            pass
+        await client.room_send("!a:baro", "m.room.message", {}, "t1")
+        await client.room_send("!a:baro", "m.room.message", {}, "t2")
+        await client.joined_rooms()
+        admin = MatrixAdminClient(
+            "http://baro.local", access_token="token", router=router
+        )
+        await admin.client("GET", "users")
+
+    assert hosts == [
+        ("sync.baro", "/_matrix/client/r0/sync"),
+        ("sync.baro", "/_matrix/client/r0/sync"),
+        (
+            "events1.baro",
+            "/_matrix/client/r0/rooms/!a:baro/send/m.room.message/t1",
+        ),
+        (
+            "events2.baro",
+            "/_matrix/client/r0/rooms/!a:baro/send/m.room.message/t2",
+        ),
+        ("baro.local", "/_matrix/client/r0/joined_rooms"),
+        ("admin.baro", "/_synapse/admin/v2/users"),
+    ]
+    with pytest.raises(ValueError):
+        RoutingTable({"events": "http://events.baro"})
@@ -0,0 +1,59 @@
+import json
+from uuid import UUID
+
+import httpx
+import pytest
+
+from aiobaro.core import MatrixClient
+from aiobaro.serializers import JSONSerializer, OrjsonSerializer, orjson
+from aiobaro.tools import build_request
+
+
+def test_build_request_encodes_compactly():
+    request = build_request(
+        "PUT",
+        "http://baro.local/x",
+        json={"body": "héllo", "id": UUID(int=1)},
+        headers={"X-Trace": "1"},
+    )
+    expected = '{"body":"héllo","id":"00000000-0000-0000-0000-000000000001"}'
+    assert request.read() == expected.encode()
+    assert request.headers["Content-Type"] == "application/json"
+    assert request.headers["X-Trace"] == "1"
+
+
+@pytest.mark.skipif(orjson is None, reason="orjson is not installed")
+def test_orjson_serializer():
+    body = {"msgtype": "m.text", "body": "héllo", "n": [1, 2.5, None]}
+    assert OrjsonSerializer().dumps(body) == JSONSerializer().dumps(body)
+
+
+@pytest.mark.asyncio
+async def test_pre_encoded_bodies_are_sent_as_is():
+    sent = []
+
+    def handler(request):
+        sent.append(
+            (request.headers["Content-Type"], json.loads(request.content))
+        )
+        return httpx.Response(200, json={"event_id": "$1"})
+
+    client = MatrixClient(
+        "http://baro.local",
+        access_token="token",
+        transport=httpx.MockTransport(handler),
+        metrics=None,
+    )
+    announcement = {"msgtype": "m.notice", "body": "maintenance at 2am"}
+    payload = client.encode(announcement)
+    assert payload == JSONSerializer().dumps(announcement)
+    for room_id in ("!a:baro", "!b:baro"):
+        await client.room_send(room_id, "m.room.message", payload, room_id)
+    await client.room_put_state("!a:baro", "m.room.topic", b'{"topic":"x"}')
+    await client.room_send("!a:baro", "m.room.message", announcement, "t")
+    assert sent == [
+        ("application/json", announcement),
+        ("application/json", announcement),
+        ("application/json", {"topic": "x"}),
+        ("application/json", announcement),
+    ]
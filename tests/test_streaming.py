@@ -0,0 +1,119 @@
+import json
+import random
+
+import httpx
+import pytest
+
+from aiobaro.core import MatrixClient
+from aiobaro.exceptions import LoginRequiredException
+from aiobaro.streaming import StreamingParser
+
+BODY = {
+    "next_batch": "s72594_4483_1934",
+    "presence": {"events": [{"type": "m.presence", "content": {"n": 1.5}}]},
+    "rooms": {
+        "join": {
+            f"!room{i}:baro": {
+                "timeline": {"events": [{"body": "é" * i, "n": -12345}]}
+            }
+            for i in range(20)
+        },
+        "invite": {},
+        "leave": None,
+    },
+    "device_one_time_keys_count": {"signed_curve25519": 50},
+}
+
+
+def rebuild(sections):
+    body = {}
+    for path, value in sections:
+        target = body
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = value
+    return body
+
+
+@pytest.mark.parametrize("size", [1, 7, 64, 65536])
+def test_streaming_parser(size):
+    content = json.dumps(BODY, indent=1).encode()
+    parser = StreamingParser()
+    sections = []
+    for i in range(0, len(content), size):
+        sections += parser.feed(content[i : i + size])
+    sections += parser.close()
+    assert [path for path, _ in sections][:3] == [
+        ("next_batch",),
+        ("presence",),
+        ("rooms", "join", "!room0:baro"),
+    ]
+    body = rebuild(sections)
+    body["rooms"].setdefault("invite", {})
+    assert body == BODY
+
+
+def test_streaming_parser_every_cut():
+    body = {
+        "next_batch": "s1",
+        "rooms": {"join": {"!a:baro": {"n": [-25000000000.0, 1.5e-3, 7]}}},
+        "count": 1.5e30,
+        "flags": [True, False, None],
+    }
+    content = json.dumps(body).encode()
+    for cut in range(1, len(content)):
+        parser = StreamingParser()
+        sections = parser.feed(content[:cut])
+        sections += parser.feed(content[cut:])
+        sections += parser.close()
+        assert rebuild(sections) == body, cut
+
+
+def test_streaming_parser_random_chunks():
+    content = json.dumps(BODY).encode()
+    chunks = random.Random(0)
+    for _ in range(50):
+        parser = StreamingParser()
+        sections = []
+        i = 0
+        while i < len(content):
+            size = chunks.randint(1, 7)
+            sections += parser.feed(content[i : i + size])
+            i += size
+        sections += parser.close()
+        body = rebuild(sections)
+        body["rooms"].setdefault("invite", {})
+        assert body == BODY
+
+
+@pytest.mark.parametrize(
+    "content", [b'{"rooms": {"join": {"!a": {}', b'{"a": 1} 2', b"[]"]
+)
+def test_streaming_parser_errors(content):
+    parser = StreamingParser()
+    with pytest.raises(ValueError):
+        parser.feed(content)
+        parser.close()
+
+
+@pytest.mark.asyncio
+async def test_sync_stream():
+    def handler(request):
+        params = httpx.QueryParams(request.url.query)
+        if params["access_token"] != "token":
+            return httpx.Response(401)
+        assert params["since"] == "s1"
+        return httpx.Response(200, json=BODY)
+
+    transport = httpx.MockTransport(handler)
+    client = MatrixClient(
+        "http://baro.local", access_token="token", transport=transport
+    )
+    sections = [section async for section in client.sync_stream(since="s1")]
+    assert len(sections) == 24
+    assert rebuild(sections)["rooms"]["join"] == BODY["rooms"]["join"]
+
+    client.access_token = "revoked"
+    with pytest.raises(LoginRequiredException):
+        async for _ in client.sync_stream(since="s1"):
+            pass
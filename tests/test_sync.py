@@ -0,0 +1,224 @@
+import asyncio
+import multiprocessing
+import pickle
+
+import httpx
+import pytest
+
+from aiobaro import sharding
+from aiobaro.core import MatrixClient
+from aiobaro.sharding import SyncSupervisor, partition, run_shard, shard_of
+from aiobaro.sync import SyncLoop, iter_events
+
+SYNC_BODY = {
+    "next_batch": "s2",
+    "presence": {"events": [{"type": "m.presence", "sender": "@a:baro"}]},
+    "rooms": {
+        "join": {
+            "!room:baro": {
+                "timeline": {
+                    "events": [{"type": "m.room.message", "event_id": "$1"}]
+                },
+                "state": {"events": []},
+            }
+        },
+        "invite": {
+            "!invite:baro": {
+                "invite_state": {"events": [{"type": "m.room.member"}]}
+            }
+        },
+    },
+}
+
+
+def test_iter_events():
+    events = list(iter_events(SYNC_BODY))
+    assert [(room_id, section) for room_id, section, _ in events] == [
+        (None, "presence"),
+        ("!room:baro", "join.timeline"),
+        ("!invite:baro", "invite.invite_state"),
+    ]
+
+
+def sync_transport(requests):
+    def handler(request):
+        requests.append(httpx.QueryParams(request.url.query))
+        if len(requests) == 1:
+            return httpx.Response(502)
+        return httpx.Response(
+            200, json={**SYNC_BODY, "next_batch": f"s{len(requests)}"}
+        )
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_sync_loop():
+    requests = []
+    client = MatrixClient(
+        "http://baro.local",
+        access_token="token",
+        transport=sync_transport(requests),
+        metrics=None,
+    )
+    loop = SyncLoop(client.sync, timeout=100, backoff=0.01, metrics=None)
+    bodies = []
+    async for body in loop:
+        bodies.append(body)
+        if len(bodies) == 2:
+            loop.stop()
+    assert [body["next_batch"] for body in bodies] == ["s2", "s3"]
+    assert "since" not in requests[1]
+    assert requests[2]["since"] == "s2"
+    assert requests[2]["timeout"] == "100"
+
+
+@pytest.mark.asyncio
+async def test_sync_loop_full_state():
+    requests = []
+    client = MatrixClient(
+        "http://baro.local",
+        access_token="token",
+        transport=sync_transport(requests),
+        metrics=None,
+    )
+    loop = SyncLoop(
+        client.sync,
+        since="s0",
+        full_state=True,
+        backoff=0.01,
+        metrics=None,
+    )
+    async for body in loop:
+        if body["next_batch"] == "s3":
+            loop.stop()
+    # sent until a response resumed from since, then dropped
+    assert [r.get("full_state") for r in requests] == ["true", "true", None]
+    assert requests[1]["since"] == "s0"
+
+
+def test_partition():
+    users = [f"@bot{i}:baro" for i in range(100)]
+    parts = partition({user: {} for user in users}, 4)
+    assert sorted(user for part in parts for user in part) == sorted(users)
+    assert all(
+        shard_of(user, 4) == index
+        for index, part in enumerate(parts)
+        for user in part
+    )
+
+
+@pytest.mark.asyncio
+async def test_run_shard():
+    def handler(request):
+        params = httpx.QueryParams(request.url.query)
+        if params["access_token"] == "revoked" or "since" in params:
+            # the accounts have no password, a rejected token ends a loop
+            return httpx.Response(401)
+        if params["access_token"] == "broken":
+            return httpx.Response(200, content=b"<html>")
+        return httpx.Response(200, json=SYNC_BODY)
+
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    await run_shard(
+        "http://baro.local",
+        {
+            "@bot:baro": {"access_token": "token"},
+            "@gone:baro": {"access_token": "revoked"},
+            "@broken:baro": {"access_token": "broken"},
+        },
+        sender,
+        {"timeout": 0, "data_filter": None},
+        transport=httpx.MockTransport(handler),
+    )
+    messages = []
+    while receiver.poll():
+        messages.append(pickle.loads(receiver.recv_bytes()))
+    errors = [message[:2] for message in messages if message[0] == "error"]
+    # failures of an account are reported, the other accounts go on
+    assert sorted(errors) == [
+        ("error", "@bot:baro"),
+        ("error", "@broken:baro"),
+        ("error", "@gone:baro"),
+    ]
+    kind, user, next_batch, events = messages[0]
+    assert (kind, user, next_batch) == ("events", "@bot:baro", "s2")
+    assert ("!room:baro", "join.timeline") in [e[:2] for e in events]
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+def fake_shard(homeserver, accounts, conn, options):
+    for user in accounts:
+        for batch in range(5):
+            events = [("!room:baro", "join.timeline", {"n": batch})]
+            conn.send_bytes(
+                pickle.dumps(("events", user, f"s{batch}", events))
+            )
+        conn.send_bytes(pickle.dumps(("error", user, "logged out")))
+    conn.close()
+
+
+@pytest.mark.asyncio
+async def test_supervisor_small_queue(monkeypatch):
+    monkeypatch.setattr(sharding, "shard_main", fake_shard)
+    accounts = {"@a:baro": {}, "@b:baro": {"since": "s0"}}
+    # a queue of one is paused after every message and must resume
+    supervisor = SyncSupervisor(
+        "http://baro.local",
+        accounts,
+        processes=2,
+        max_pending=1,
+        context="fork",
+    )
+    supervisor.start()
+    try:
+        events = await asyncio.wait_for(
+            collect(supervisor.events()), timeout=10
+        )
+    finally:
+        await supervisor.stop()
+    assert len(events) == 10
+    for user in accounts:
+        assert [e.event["n"] for e in events if e.user == user] == [
+            0,
+            1,
+            2,
+            3,
+            4,
+        ]
+    assert supervisor.positions == {"@a:baro": "s4", "@b:baro": "s4"}
+    assert sorted(supervisor.errors) == [
+        ("@a:baro", "logged out"),
+        ("@b:baro", "logged out"),
+    ]
+
+
+def large_shard(homeserver, accounts, conn, options):
+    for user in accounts:
+        # much larger than the pipe buffer, sent in several writes
+        events = [("!room:baro", "join.timeline", {"body": "x" * (1 << 20)})]
+        conn.send_bytes(pickle.dumps(("events", user, "s1", events)))
+    conn.close()
+
+
+@pytest.mark.asyncio
+async def test_supervisor_large_messages(monkeypatch):
+    monkeypatch.setattr(sharding, "shard_main", large_shard)
+    supervisor = SyncSupervisor(
+        "http://baro.local",
+        {"@a:baro": {}, "@b:baro": {}},
+        processes=2,
+        context="fork",
+    )
+    supervisor.start()
+    try:
+        events = await asyncio.wait_for(
+            collect(supervisor.events()), timeout=10
+        )
+    finally:
+        await supervisor.stop()
+    assert sorted(event.user for event in events) == ["@a:baro", "@b:baro"]
+    assert all(len(event.event["body"]) == 1 << 20 for event in events)
@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from aiobaro.core import MatrixClient
+from aiobaro.exceptions import DeadlineExceeded
+from aiobaro.pool import SessionPool
+from aiobaro.timeouts import TIMEOUTS, deadline, remaining
+
+
+def test_timeout_policy():
+    assert TIMEOUTS.timeout("joined_rooms").read == 10.0
+    assert TIMEOUTS.timeout("keys/query").read == 30.0
+    assert TIMEOUTS.timeout(
+        "upload", "http://baro/_matrix/media/r0/"
+    ).read == (60.0)
+    sync = TIMEOUTS.timeout("sync", params={"timeout": "30000"})
+    assert sync.read == 40.0 and sync.connect == 5.0
+    assert TIMEOUTS.timeout("sync", params={"timeout": 0}).read == 10.0
+
+    with deadline(2):
+        with deadline(60):
+            assert remaining() <= 2
+            timeout = TIMEOUTS.timeout("sync", params={"timeout": 30000})
+            assert timeout.read <= 2 and timeout.connect <= 2
+    assert remaining() is None
+
+
+@pytest.mark.asyncio
+async def test_deadline_cancels_request():
+    async def handler(request):
+        await asyncio.sleep(1)
+        return httpx.Response(200, json={})
+
+    client = MatrixClient(
+        "http://baro.local",
+        access_token="token",
+        transport=httpx.MockTransport(handler),
+        metrics=None,
+    )
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        with deadline(0.05):
+            await client.joined_rooms()
+    assert time.monotonic() - start < 0.5
+
+    with pytest.raises(DeadlineExceeded):
+        with deadline(0):
+            await client.joined_rooms()
+
+
+@pytest.mark.asyncio
+async def test_deadline_stops_retries():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(
+            429, json={"errcode": "M_LIMIT_EXCEEDED", "retry_after_ms": 5000}
+        )
+
+    async with SessionPool(
+        "http://baro.local",
+        transport=httpx.MockTransport(handler),
+        metrics=None,
+    ) as pool:
+        pool.add("bot", access_token="token")
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            with deadline(1):
+                await pool.call("bot", "joined_rooms")
+    assert time.monotonic() - start < 0.5
+    assert len(calls) == 1
@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from aiobaro.core import MatrixClient
+from aiobaro.hooks import RequestHooks, RequestTrace
+from aiobaro.metrics import MetricsRegistry
+from aiobaro.watchdog import LoopLagMonitor, SlowRequestLog
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_monitor():
+    monitor = LoopLagMonitor(interval=0.01, registry=MetricsRegistry())
+    started = time.time()
+    monitor.start()
+    await asyncio.sleep(0.02)
+    time.sleep(0.1)  # block the loop
+    await asyncio.sleep(0.02)
+    await monitor.stop()
+    assert monitor.max_lag >= 0.05
+    assert monitor.max_lag_since(started) == monitor.max_lag
+
+
+@pytest.mark.asyncio
+async def test_slow_request_log():
+    async def handler(request):
+        if request.url.path.endswith("/sync"):
+            await asyncio.sleep(0.05)
+        return httpx.Response(200, json={})
+
+    log = SlowRequestLog(capacity=2, threshold=0.04)
+    client = MatrixClient(
+        "http://baro.local",
+        access_token="token",
+        transport=httpx.MockTransport(handler),
+        hooks=log.attach(RequestHooks()),
+        metrics=None,
+    )
+    await client.whoami()
+    for _ in range(3):
+        response = await client.sync()
+        response.json()
+
+    entries = log.dump()
+    assert len(entries) == 2
+    assert {entry["endpoint"] for entry in entries} == {"sync"}
+    assert entries[0]["duration"] >= entries[1]["duration"] >= 0.04
+    assert "decode" in entries[0]["phases"]
+
+
+def test_slow_request_log_keeps_the_slowest():
+    log = SlowRequestLog(capacity=3, threshold=0.5)
+    for duration in (5.0, 0.6, 9.0, 0.7, 0.8, 0.9, 0.2):
+        trace = RequestTrace("GET", "sync", "http://baro.local/sync")
+        trace.phases["wait"] = duration
+        log.observe(trace)
+    assert [entry["duration"] for entry in log.dump()] == [9.0, 5.0, 0.9]
+
+
+def test_slow_request_log_reconsiders_decoded_requests():
+    log = SlowRequestLog(capacity=1, threshold=0.5)
+    first = RequestTrace("GET", "sync", "http://baro.local/sync")
+    first.phases["wait"] = 2.0
+    log.observe(first)
+    second = RequestTrace("GET", "sync", "http://baro.local/sync")
+    second.phases["wait"] = 1.0
+    log.observe(second)
+    assert [entry["duration"] for entry in log.dump()] == [2.0]
+    # the body took long to decode, it is now the slowest
+    second.phases["decode"] = 2.0
+    log.observe(second)
+    assert [entry["duration"] for entry in log.dump()] == [3.0]
+    first.phases["decode"] = 0.5
+    log.observe(first)
+    assert [entry["duration"] for entry in log.dump()] == [3.0]